@@ -0,0 +1,131 @@
+"""
+Prefix-cache savings of the chat layout on a recorded workload.
+
+Replays workloads/agents.jsonl with the original single-message layout and
+with the registry chat layout (static system prefix + dynamic user message),
+and simulates provider-side prompt caching: a request reuses the longest
+prefix it shares with an earlier request, in blocks of `--block` tokens, once
+that prefix reaches `--min-prefix` tokens (OpenAI: 1024 / 128). Reports input
+and cached tokens, input cost and the estimated prefill time saved.
+
+With --live the workload is also sent to the model and the `cached_tokens`
+and latencies reported by the provider are summed.
+
+Usage:
+    python benchmarks/bench_prefix_cache.py
+    python benchmarks/bench_prefix_cache.py --min-prefix 0 --block 1
+    python benchmarks/bench_prefix_cache.py --live --model gpt-4o-mini
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from prompt_registry import registry
+from token_budget import count_tokens
+
+WORKLOAD = Path(__file__).parent / "workloads" / "agents.jsonl"
+
+
+def load_workload(path: Path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def build_messages(record, layout: str):
+    if layout == "chat":
+        return registry.get_chat_layout(record["agent"]).render(record["inputs"])
+    return [("user", registry.get_template(record["agent"]).render(record["inputs"]))]
+
+
+def serialize(messages) -> str:
+    # Providers cache the serialized prompt prefix, messages in order
+    return "".join(f"<|{role}|>{content}" for role, content in messages)
+
+
+def common_prefix(a: str, b: str) -> int:
+    size = min(len(a), len(b))
+    for i in range(size):
+        if a[i] != b[i]:
+            return i
+    return size
+
+
+def simulate(workload, layout: str, min_prefix: int, block: int, count=count_tokens):
+    seen = []
+    input_tokens = cached_tokens = 0
+    for record in workload:
+        prompt = serialize(build_messages(record, layout))
+        input_tokens += count(prompt)
+
+        shared = max((common_prefix(prompt, previous) for previous in seen), default=0)
+        shared_tokens = count(prompt[:shared])
+        if shared_tokens >= max(min_prefix, 1):
+            cached_tokens += shared_tokens // block * block
+        seen.append(prompt)
+    return input_tokens, cached_tokens
+
+
+async def run_live(workload, layout: str, model: str, base_url: str):
+    from chat_models import acomplete, get_chat_model
+
+    llm = get_chat_model(model, base_url)
+    input_tokens = cached_tokens = 0
+    latency = 0.0
+    # Sequential on purpose: the cache is only warm for requests after the first
+    for record in workload:
+        completion = await acomplete(llm, build_messages(record, layout))
+        input_tokens += completion.input_tokens
+        cached_tokens += completion.cached_tokens
+        latency += completion.latency
+    return input_tokens, cached_tokens, latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workload", type=Path, default=WORKLOAD)
+    parser.add_argument("--min-prefix", type=int, default=1024, help="Minimum cacheable prefix (tokens)")
+    parser.add_argument("--block", type=int, default=128, help="Cache granularity (tokens)")
+    parser.add_argument("--input-price", type=float, default=0.15, help="USD per 1M input tokens")
+    parser.add_argument("--cached-price", type=float, default=0.075, help="USD per 1M cached input tokens")
+    parser.add_argument("--prefill-tps", type=float, default=5000, help="Prefill throughput for the latency estimate")
+    parser.add_argument("--live", action="store_true")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--base-url", default=os.getenv("OPENAI_BASE_URL"))
+    args = parser.parse_args()
+
+    workload = load_workload(args.workload)
+    print(f"Workload: {len(workload)} requests ({args.workload.name})")
+    print(f"{'LAYOUT':<10} {'INPUT':>9} {'CACHED':>9} {'SHARE':>7} {'COST USD':>10} {'PREFILL SAVED':>14}")
+
+    for layout in ("original", "chat"):
+        input_tokens, cached_tokens = simulate(workload, layout, args.min_prefix, args.block)
+        cost = ((input_tokens - cached_tokens) * args.input_price + cached_tokens * args.cached_price) / 1e6
+        share = cached_tokens / input_tokens * 100 if input_tokens else 0
+        print(
+            f"{layout:<10} {input_tokens:>9} {cached_tokens:>9} {share:>6.1f}% "
+            f"{cost:>10.6f} {cached_tokens / args.prefill_tps:>13.2f}s"
+        )
+
+    static = {
+        agent: count_tokens(registry.get_chat_layout(agent).system)
+        for agent in dict.fromkeys(record["agent"] for record in workload)
+    }
+    print(f"\nStatic system prefix per agent (tokens): {static}")
+    if all(tokens < args.min_prefix for tokens in static.values()):
+        print(f"Note: every static prefix is below the {args.min_prefix}-token caching minimum.")
+
+    if args.live:
+        print(f"\nLive ({args.model}):")
+        for layout in ("original", "chat"):
+            input_tokens, cached_tokens, latency = asyncio.run(run_live(workload, layout, args.model, args.base_url))
+            print(f"{layout:<10} input={input_tokens} cached={cached_tokens} total latency={latency:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
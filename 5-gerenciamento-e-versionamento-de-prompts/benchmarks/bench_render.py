@@ -0,0 +1,71 @@
+"""
+Benchmark: registry.render_many vs load_prompt(...).format per record.
+
+Usage:
+    python benchmarks/bench_render.py --records 20000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from langchain_core.prompts.loading import load_prompt
+from prompt_registry import registry
+
+PROMPT_ID = "agent-pull-request-creator"
+
+
+def make_records(count: int):
+    """Synthetic PullRequestRequest payloads."""
+    return [
+        {
+            "changes_summary": f"Implementation of cache layer #{i} to improve performance",
+            "files_changed": f"src/cache_{i}.py, tests/test_cache_{i}.py, README.md",
+            "issue_number": str(i),
+            "branch_name": f"feature/cache-{i}",
+            "breaking_changes": "No",
+            "testing_done": "Unit tests added with 95% coverage",
+        }
+        for i in range(count)
+    ]
+
+
+def bench_langchain(records) -> float:
+    prompt_template = load_prompt(registry.get_prompt(PROMPT_ID).path)
+    start = time.perf_counter()
+    for record in records:
+        prompt_template.format(**record)
+    return time.perf_counter() - start
+
+
+def bench_render_many(records) -> float:
+    start = time.perf_counter()
+    for _ in registry.render_many(PROMPT_ID, records):
+        pass
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=20000)
+    args = parser.parse_args()
+
+    records = make_records(args.records)
+
+    expected = load_prompt(registry.get_prompt(PROMPT_ID).path).format(**records[0])
+    assert next(registry.render_many(PROMPT_ID, records[:1])) == expected, "Outputs differ"
+
+    langchain_time = bench_langchain(records)
+    render_many_time = bench_render_many(records)
+
+    print(f"Records: {args.records}")
+    print(f"load_prompt(...).format: {langchain_time:.3f}s ({args.records / langchain_time:,.0f} records/s)")
+    print(f"registry.render_many:    {render_many_time:.3f}s ({args.records / render_many_time:,.0f} records/s)")
+    print(f"Speedup: {langchain_time / render_many_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
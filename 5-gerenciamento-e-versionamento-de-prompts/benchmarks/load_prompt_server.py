@@ -0,0 +1,96 @@
+"""
+Load test for the prompt server: requests per second and latency percentiles.
+
+Starts an in-process server and hammers it from several client threads, each
+with its own keep-alive connection.
+
+Usage:
+    python benchmarks/load_prompt_server.py --threads 8 --requests 2000
+    python benchmarks/load_prompt_server.py --mode render-remote
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from prompt_server import PromptServerClient, create_server
+
+PROMPT_ID = "agent-pull-request-creator"
+INPUTS = {
+    "changes_summary": "Implementation of cache system to improve performance",
+    "files_changed": "src/cache.py, tests/test_cache.py, README.md",
+    "issue_number": "42",
+    "branch_name": "feature/add-cache-system",
+    "breaking_changes": "No",
+    "testing_done": "Unit tests added with 95% coverage",
+}
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def worker(address, mode: str, count: int, latencies: list):
+    client = PromptServerClient(**address)
+    operation = {
+        "revalidate": lambda: client.get_prompt(PROMPT_ID),
+        "render": lambda: client.render(PROMPT_ID, INPUTS),
+        "render-remote": lambda: client.render_remote(PROMPT_ID, INPUTS),
+    }[mode]
+
+    local = []
+    for _ in range(count):
+        start = time.perf_counter()
+        operation()
+        local.append(time.perf_counter() - start)
+    client.close()
+    latencies.extend(local)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per thread")
+    parser.add_argument("--mode", choices=["revalidate", "render", "render-remote"], default="revalidate")
+    parser.add_argument("--unix-socket", default=None)
+    args = parser.parse_args()
+
+    if args.unix_socket:
+        server = create_server(unix_socket=args.unix_socket)
+        address = {"unix_socket": args.unix_socket}
+    else:
+        server = create_server(port=0)
+        address = {"port": server.server_address[1]}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    latencies = []
+    threads = [
+        threading.Thread(target=worker, args=(address, args.mode, args.requests, latencies))
+        for _ in range(args.threads)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    server.shutdown()
+    server.server_close()
+
+    total = len(latencies)
+    print(f"Mode: {args.mode} | threads: {args.threads} | requests: {total}")
+    print(f"Throughput: {total / elapsed:,.0f} req/s")
+    print(f"Latency p50: {statistics.median(latencies) * 1000:.3f} ms")
+    print(f"Latency p99: {percentile(latencies, 99) * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+Microbenchmarks for the prompt registry hot paths.
+
+    synthetic.py  generates registries with N agents, several versions each
+    run.py        measures construction, lookup, template load, render and memory
+    compare.py    compares two result files (e.g. base commit vs branch)
+"""
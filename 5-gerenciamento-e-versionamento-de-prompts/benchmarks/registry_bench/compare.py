@@ -0,0 +1,67 @@
+"""
+Compare two registry benchmark result files.
+
+Each metric is printed with the relative change from base to head; a change
+worse than --threshold in the metric's "better" direction is a regression
+and makes the script exit with status 1.
+
+Usage:
+    python benchmarks/registry_bench/compare.py base.json head.json
+    python benchmarks/registry_bench/compare.py base.json head.json --threshold 0.15
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+
+def load_results(path: Path) -> Tuple[str, Dict[str, Dict[str, Any]]]:
+    report = json.loads(Path(path).read_text(encoding='utf-8'))
+    return report.get("commit", "?"), {row["key"]: row for row in report["results"]}
+
+
+def compare(base: Dict[str, Dict[str, Any]], head: Dict[str, Dict[str, Any]], threshold: float) -> List[Dict[str, Any]]:
+    rows = []
+    for key, head_row in head.items():
+        base_row = base.get(key)
+        if base_row is None or not base_row["value"]:
+            continue
+        change = (head_row["value"] - base_row["value"]) / base_row["value"]
+        worse = -change if head_row["better"] == "higher" else change
+        rows.append({
+            "key": key,
+            "unit": head_row["unit"],
+            "base": base_row["value"],
+            "head": head_row["value"],
+            "change": change,
+            "regression": worse > threshold,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare registry benchmark results")
+    parser.add_argument("base", type=Path)
+    parser.add_argument("head", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change treated as a regression")
+    args = parser.parse_args()
+
+    base_commit, base = load_results(args.base)
+    head_commit, head = load_results(args.head)
+    rows = compare(base, head, args.threshold)
+
+    print(f"{'METRIC':<40} {base_commit:>14} {head_commit:>14} {'CHANGE':>8}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['key']:<40} {row['base']:>14,.1f} {row['head']:>14,.1f} {row['change']:>+7.1%}{flag}")
+
+    regressions = [row for row in rows if row["regression"]]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmark the prompt registry hot paths on synthetic registries.
+
+For each registry size it measures:
+    construct      PromptRegistry(...) wall time and allocation peak
+    get_prompt     lookups per second over random agents
+    load_prompt    langchain load_prompt(path) per second
+    get_template   cold (parse YAML) and warm (cached) loads per second
+    templates      memory retained by compiled templates
+and, per template size class, CompiledTemplate.render vs
+PromptTemplate.format throughput.
+
+Results are written as JSON with the commit they were measured on; compare
+two files with compare.py.
+
+Usage:
+    python benchmarks/registry_bench/run.py
+    python benchmarks/registry_bench/run.py --agents 10 100 1000 10000 --output base.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from langchain_core.prompts import PromptTemplate
+from langchain_core.prompts.loading import load_prompt
+from prompt_registry import CompiledTemplate, PromptRegistry
+from synthetic import TEMPLATE_SIZES, make_inputs, make_template, write_registry
+
+TEMPLATE_VARIABLES = {"small": 4, "medium": 12, "large": 40}
+
+
+def ops_per_second(fn: Callable[[Any], Any], args: Sequence[Any], min_time: float) -> float:
+    """Call `fn` over `args` (cycling) for at least `min_time` seconds."""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        for arg in args:
+            fn(arg)
+        calls += len(args)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls / elapsed
+
+
+def allocated_kib(fn: Callable[[], Any]) -> Dict[str, float]:
+    """Peak and retained allocations (KiB) while building the object returned by `fn`."""
+    tracemalloc.start()
+    try:
+        result = fn()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return {"retained": retained / 1024, "peak": peak / 1024}
+
+
+def result(name: str, value: float, unit: str, better: str, **params) -> Dict[str, Any]:
+    key = name + "[" + ",".join(f"{k}={v}" for k, v in params.items()) + "]"
+    return {"key": key, "name": name, "params": params, "value": round(value, 3), "unit": unit, "better": better}
+
+
+def bench_registry(root: Path, agents: int, repeats: int, min_time: float, sample: int) -> List[Dict[str, Any]]:
+    rng = random.Random(agents)
+    construct = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        registry = PromptRegistry(prompts_dir=str(root))
+        construct.append(time.perf_counter() - start)
+    memory = allocated_kib(lambda: PromptRegistry(prompts_dir=str(root)))
+
+    ids = list(registry.registry["agents"])
+    lookups = [rng.choice(ids) for _ in range(1000)]
+    loads = rng.sample(ids, min(sample, len(ids)))
+    paths = [registry.get_prompt(agent_id).path for agent_id in loads]
+
+    cold_start = time.perf_counter()
+    for agent_id in loads:
+        registry.get_template(agent_id)
+    cold = len(loads) / (time.perf_counter() - cold_start)
+
+    def load_templates():
+        fresh = PromptRegistry(prompts_dir=str(root))
+        for agent_id in loads:
+            fresh.get_template(agent_id)
+        return fresh
+
+    templates = allocated_kib(load_templates)["retained"] - memory["retained"]
+
+    return [
+        result("construct", statistics.median(construct) * 1000, "ms", "lower", agents=agents),
+        result("construct_peak", memory["peak"], "KiB", "lower", agents=agents),
+        result("registry_retained", memory["retained"], "KiB", "lower", agents=agents),
+        result("get_prompt", ops_per_second(registry.get_prompt, lookups, min_time), "ops/s", "higher", agents=agents),
+        result("load_prompt", ops_per_second(load_prompt, paths, min_time), "ops/s", "higher", agents=agents),
+        result("get_template_cold", cold, "ops/s", "higher", agents=agents),
+        result("get_template_warm", ops_per_second(registry.get_template, loads, min_time), "ops/s", "higher", agents=agents),
+        result("template_retained", templates / len(loads), "KiB/template", "lower", agents=agents),
+    ]
+
+
+def bench_render(size_class: str, min_time: float) -> List[Dict[str, Any]]:
+    variables = TEMPLATE_VARIABLES[size_class]
+    payload = make_template(TEMPLATE_SIZES[size_class], variables)
+    records = [make_inputs(variables, seed) for seed in range(100)]
+    compiled = CompiledTemplate(payload["template"], payload["input_variables"])
+    langchain = PromptTemplate(template=payload["template"], input_variables=payload["input_variables"])
+    assert compiled.render(records[0]) == langchain.format(**records[0]), "Outputs differ"
+
+    return [
+        result("render_compiled", ops_per_second(compiled.render, records, min_time), "renders/s", "higher", template=size_class),
+        result("render_langchain", ops_per_second(lambda r: langchain.format(**r), records, min_time), "renders/s", "higher", template=size_class),
+    ]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt registry microbenchmarks")
+    parser.add_argument("--agents", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--versions", type=int, default=3)
+    parser.add_argument("--templates", nargs="+", choices=list(TEMPLATE_SIZES), default=list(TEMPLATE_SIZES))
+    parser.add_argument("--repeats", type=int, default=5, help="Constructions timed per registry size")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds per throughput measurement")
+    parser.add_argument("--sample", type=int, default=200, help="Agents whose templates are loaded")
+    parser.add_argument("--output", type=Path, default=Path("registry_bench.json"))
+    args = parser.parse_args()
+
+    results = []
+    for agents in args.agents:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = write_registry(Path(tmp), agents, versions=args.versions)
+            results.extend(bench_registry(root, agents, args.repeats, args.min_time, args.sample))
+        print(f"agents={agents} done", file=sys.stderr)
+    for size_class in args.templates:
+        results.extend(bench_render(size_class, args.min_time))
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {"versions": args.versions, "repeats": args.repeats, "min_time": args.min_time, "sample": args.sample},
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2) + "\n", encoding='utf-8')
+
+    for row in results:
+        print(f"{row['key']:<40} {row['value']:>14,.1f} {row['unit']}")
+    print(f"\nWritten to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Synthetic prompt registries in the same layout as prompts/.
+
+Each agent gets `versions` directories `v1.0.<n>/prompt.yaml`; template size
+classes repeat a Markdown section with a few variables until the target size
+is reached, so rendering cost grows with the class.
+"""
+
+from pathlib import Path
+from typing import Dict, List
+
+import yaml
+
+TEMPLATE_SIZES = {"small": 1_000, "medium": 10_000, "large": 100_000}
+
+
+def make_template(size: int, variables: int) -> Dict[str, object]:
+    """A prompt.yaml payload of about `size` characters using `variables` inputs."""
+    names = [f"var_{i}" for i in range(variables)]
+    sections: List[str] = ["Você é um agente sintético usado em benchmarks.\n"]
+    length = len(sections[0])
+    i = 0
+    while length < size:
+        name = names[i % variables]
+        section = (
+            f"\n## Seção {i}\n"
+            f"Analise o valor de {{{name}}} e responda seguindo as regras abaixo.\n"
+            f"- Regra {i}.1: seja objetivo e cite {{{{exemplos}}}} quando houver.\n"
+            f"- Regra {i}.2: nunca invente informações ausentes.\n"
+        )
+        sections.append(section)
+        length += len(section)
+        i += 1
+    return {"_type": "prompt", "input_variables": names, "template": "".join(sections)}
+
+
+def make_inputs(variables: int, seed: int = 0) -> Dict[str, str]:
+    return {f"var_{i}": f"valor {seed}-{i} com algum texto" for i in range(variables)}
+
+
+def write_registry(
+    root: Path,
+    agents: int,
+    versions: int = 3,
+    template_size: int = TEMPLATE_SIZES["small"],
+    variables: int = 4,
+) -> Path:
+    """Write `agents` agents with `versions` versions each under `root`; returns root."""
+    root = Path(root)
+    payload = yaml.safe_dump(make_template(template_size, variables), allow_unicode=True)
+    entries = {}
+    for a in range(agents):
+        agent_id = f"agent-{a:05d}"
+        for v in range(versions):
+            version_dir = root / agent_id / f"v1.0.{v}"
+            version_dir.mkdir(parents=True)
+            (version_dir / "prompt.yaml").write_text(payload, encoding='utf-8')
+        entries[agent_id] = {
+            "description": f"Synthetic agent {a}",
+            "current_version": f"1.0.{versions - 1}",
+            "path": f"{agent_id}/v1.0.{versions - 1}/prompt.yaml",
+            "model": "gpt-5-nano",
+        }
+    (root / "registry.yaml").write_text(yaml.safe_dump({"agents": entries}), encoding='utf-8')
+    return root
@@ -1,19 +1,47 @@
 """
 Simple code review agent using native LangChain.
+
+Diffs larger than one window are reviewed map-reduce style: the unified diff
+is split into per-file hunks packed into token-budgeted windows, the windows
+are reviewed concurrently and a reduce step merges and deduplicates the
+findings into the usual report format.
+
+Usage:
+    python src/agent_code_reviewer.py
+    python src/agent_code_reviewer.py --stream
+    python src/agent_code_reviewer.py --diff-file changes.diff --window-tokens 6000
 """
 
-from dataclasses import dataclass, asdict
+import argparse
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
 from dotenv import load_dotenv
 from langchain.chat_models import init_chat_model
 from langchain_core.prompts.loading import load_prompt
 from langchain_core.output_parsers import StrOutputParser
 try:
+    from chat_models import acomplete, get_chat_model
+    from diff_chunking import pack_windows, parse_unified_diff
     from prompt_registry import registry
+    from section_stream import CODE_REVIEW_SECTIONS, SectionEvent, print_stream, stream_sections
+    from token_budget import count_tokens
 except ImportError:
+    from .chat_models import acomplete, get_chat_model
+    from .diff_chunking import pack_windows, parse_unified_diff
     from .prompt_registry import registry
+    from .section_stream import CODE_REVIEW_SECTIONS, SectionEvent, print_stream, stream_sections
+    from .token_budget import count_tokens
 
 load_dotenv()
 
+MODEL = "gpt-4o-mini"
+
+
 @dataclass
 class CodeReviewRequest:
     """Request model for code review."""
@@ -23,35 +51,146 @@ class CodeReviewRequest:
     security_level: str = "standard"
     review_focus: str = "general"
 
-request = CodeReviewRequest(
-    code_diff="""
-    + def calculate_total(items):
-    +     total = 0
-    +     for item in items:
-    +         total = total + item['price'] * item['quantity']
-    +     return total
-    """,
-    language="python",
-    repo_rules="Use type hints and docstrings",
-    security_level="standard",
-    review_focus="quality and performance"
-)
-
-# Get prompt path using the registry
-prompt = registry.get_prompt("agent-code-reviewer")
-
-# Load prompt with native LangChain load_prompt
-prompt_template = load_prompt(prompt.path)
-
-# Create the model using init_chat_model (LangChain 1.0 recommended way)
-llm = init_chat_model("gpt-4o-mini")
-
-# Create simple chain: prompt -> llm -> parser
-chain = prompt_template | llm | StrOutputParser()
-
-print("Starting code review...")
-print("-" * 50)
-
-# Execute the chain
-result = chain.invoke(asdict(request))
-print(result)
\ No newline at end of file
+
+@dataclass
+class WindowReport:
+    """Timing and token usage of one step of a map-reduce review."""
+    step: str
+    files: List[str] = field(default_factory=list)
+    diff_tokens: int = 0
+    latency: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+def routing_key(request: CodeReviewRequest) -> str:
+    """Stable canary routing key: the same diff always gets the same prompt version."""
+    return hashlib.sha256(request.code_diff.encode('utf-8')).hexdigest()[:16]
+
+
+def build_chain(routing_key: Optional[str] = None):
+    """Return the resolved prompt and its prompt -> llm chain."""
+    # Get prompt path using the registry
+    prompt = registry.get_prompt("agent-code-reviewer", routing_key)
+
+    # Load prompt with native LangChain load_prompt
+    prompt_template = load_prompt(prompt.path)
+
+    # Create the model using init_chat_model (LangChain 1.0 recommended way)
+    llm = init_chat_model(MODEL)
+
+    return prompt, prompt_template | llm
+
+
+def review(request: CodeReviewRequest, key: Optional[str] = None) -> str:
+    """Review the whole diff in a single call (`key`, e.g. the repository, overrides the routing key)."""
+    prompt, chain = build_chain(key or routing_key(request))
+    with registry.metrics.track(prompt.id, prompt.version, "completion") as observation:
+        message = chain.invoke(asdict(request))
+        observation.output_tokens = (message.usage_metadata or {}).get("output_tokens", 0)
+    return message.content
+
+
+def stream_review(request: CodeReviewRequest, key: Optional[str] = None) -> Iterator[SectionEvent]:
+    """Stream the review, with an event as soon as each report section closes."""
+    _, chain = build_chain(key or routing_key(request))
+    return stream_sections((chain | StrOutputParser()).stream(asdict(request)), CODE_REVIEW_SECTIONS)
+
+
+async def review_large_diff(
+    request: CodeReviewRequest,
+    window_tokens: int = 6000,
+    concurrency: int = 4,
+    key: Optional[str] = None,
+) -> Tuple[str, List[WindowReport]]:
+    """Review a large diff map-reduce style; returns the report and per-step stats."""
+    windows = pack_windows(parse_unified_diff(request.code_diff), window_tokens, count_tokens)
+    key = key or routing_key(request)
+    reviewer_prompt = registry.get_prompt("agent-code-reviewer", key)
+    reducer_prompt = registry.get_prompt("agent-code-review-reducer", key)
+    reviewer = registry.template_for(reviewer_prompt)
+    reducer = registry.template_for(reducer_prompt)
+    llm = get_chat_model(MODEL)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def review_window(window):
+        async with semaphore:
+            inputs = dict(asdict(request), code_diff=window.text)
+            completion = await acomplete(
+                llm, reviewer.render(inputs), agent=reviewer_prompt.id, version=reviewer_prompt.version,
+            )
+        report = WindowReport(
+            step="map", files=window.files, diff_tokens=window.tokens, latency=completion.latency,
+            input_tokens=completion.input_tokens, output_tokens=completion.output_tokens,
+        )
+        return completion.text, report
+
+    results = await asyncio.gather(*(review_window(window) for window in windows))
+    reports = [report for _, report in results]
+
+    files_reviewed = list(dict.fromkeys(path for window in windows for path in window.files))
+    partial_reviews = "\n\n".join(
+        f"### Janela {i} ({', '.join(window.files)})\n{text}"
+        for i, (window, (text, _)) in enumerate(zip(windows, results), 1)
+    )
+    completion = await acomplete(llm, reducer.render({
+        "language": request.language,
+        "review_focus": request.review_focus,
+        "files_reviewed": ", ".join(files_reviewed),
+        "partial_reviews": partial_reviews,
+    }), agent=reducer_prompt.id, version=reducer_prompt.version)
+    reports.append(WindowReport(
+        step="reduce", files=files_reviewed, latency=completion.latency,
+        input_tokens=completion.input_tokens, output_tokens=completion.output_tokens,
+    ))
+    return completion.text, reports
+
+
+def print_window_reports(reports: List[WindowReport], elapsed: float) -> None:
+    print(f"\n{'STEP':<8} {'DIFF TOK':>8} {'LATENCY':>9} {'IN':>7} {'OUT':>7}  FILES")
+    for report in reports:
+        print(
+            f"{report.step:<8} {report.diff_tokens:>8} {report.latency:>8.1f}s "
+            f"{report.input_tokens:>7} {report.output_tokens:>7}  {', '.join(report.files)}"
+        )
+    print(f"Total wall time: {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Code review agent")
+    parser.add_argument("--diff-file", type=Path, default=None, help="Unified diff to review")
+    parser.add_argument("--window-tokens", type=int, default=6000, help="Token budget of each diff window")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--stream", action="store_true", help="Stream tokens and report section timings")
+    args = parser.parse_args()
+
+    request = CodeReviewRequest(
+        code_diff="""
+        + def calculate_total(items):
+        +     total = 0
+        +     for item in items:
+        +         total = total + item['price'] * item['quantity']
+        +     return total
+        """,
+        language="python",
+        repo_rules="Use type hints and docstrings",
+        security_level="standard",
+        review_focus="quality and performance"
+    )
+    if args.diff_file:
+        request.code_diff = args.diff_file.read_text(encoding='utf-8')
+
+    print("Starting code review...")
+    print("-" * 50)
+
+    if count_tokens(request.code_diff) <= args.window_tokens:
+        # Execute the chain
+        if args.stream:
+            print_stream(stream_review(request))
+        else:
+            print(review(request))
+    else:
+        start = time.perf_counter()
+        result, reports = asyncio.run(review_large_diff(request, args.window_tokens, args.concurrency))
+        print(result)
+        print_window_reports(reports, time.perf_counter() - start)
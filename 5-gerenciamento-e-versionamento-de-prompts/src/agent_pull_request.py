@@ -1,16 +1,25 @@
 """
 Simple agent to create pull requests using native LangChain.
+
+Usage:
+    python src/agent_pull_request.py
+    python src/agent_pull_request.py --stream
 """
 
+import argparse
 from dataclasses import dataclass, asdict
+from typing import Iterator, Optional
+
 from dotenv import load_dotenv
 from langchain.chat_models import init_chat_model
 from langchain_core.prompts.loading import load_prompt
 from langchain_core.output_parsers import StrOutputParser
 try:
     from prompt_registry import registry
+    from section_stream import PULL_REQUEST_SECTIONS, SectionEvent, print_stream, stream_sections
 except ImportError:
     from .prompt_registry import registry
+    from .section_stream import PULL_REQUEST_SECTIONS, SectionEvent, print_stream, stream_sections
 
 # Load environment variables
 load_dotenv()
@@ -27,27 +36,55 @@ class PullRequestRequest:
     testing_done: str = ""
 
 
+def routing_key(request: PullRequestRequest) -> str:
+    """Stable canary routing key: the issue, else the branch, else the change summary."""
+    return request.issue_number or request.branch_name or request.changes_summary
+
+
+def build_chain(routing_key: Optional[str] = None):
+    """Return the resolved prompt and its prompt -> llm chain."""
+    prompt = registry.get_prompt("agent-pull-request-creator", routing_key)
+    prompt_template = load_prompt(prompt.path)
+
+    llm = init_chat_model("gpt-4o-mini")
+
+    return prompt, prompt_template | llm
+
+
+def create_pull_request(request: PullRequestRequest) -> str:
+    prompt, chain = build_chain(routing_key(request))
+    with registry.metrics.track(prompt.id, prompt.version, "completion") as observation:
+        message = chain.invoke(asdict(request))
+        observation.output_tokens = (message.usage_metadata or {}).get("output_tokens", 0)
+    return message.content
+
 
-request = PullRequestRequest(
-    changes_summary="Implementation of cache system to improve performance",
-    files_changed="src/cache.py, tests/test_cache.py, README.md",
-    issue_number="42",
-    branch_name="feature/add-cache-system",
-    breaking_changes="No",
-    testing_done="Unit tests added with 95% coverage"
-)
+def stream_pull_request(request: PullRequestRequest) -> Iterator[SectionEvent]:
+    """Stream the PR description, with an event as soon as each section (title, summary...) closes."""
+    _, chain = build_chain(routing_key(request))
+    return stream_sections((chain | StrOutputParser()).stream(asdict(request)), PULL_REQUEST_SECTIONS)
 
-prompt = registry.get_prompt("agent-pull-request-creator")
-prompt_template = load_prompt(prompt.path)
 
-llm = init_chat_model("gpt-4o-mini")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pull request creator agent")
+    parser.add_argument("--stream", action="store_true", help="Stream tokens and report section timings")
+    args = parser.parse_args()
 
-# Create simple chain: prompt -> llm -> parser
-chain = prompt_template | llm | StrOutputParser()
+    request = PullRequestRequest(
+        changes_summary="Implementation of cache system to improve performance",
+        files_changed="src/cache.py, tests/test_cache.py, README.md",
+        issue_number="42",
+        branch_name="feature/add-cache-system",
+        breaking_changes="No",
+        testing_done="Unit tests added with 95% coverage"
+    )
 
-print("Creating Pull Request description...")
-print("=" * 60)
+    print("Creating Pull Request description...")
+    print("=" * 60)
 
-# Execute the chain
-result = chain.invoke(asdict(request))
-print(result)
\ No newline at end of file
+    # Execute the chain
+    if args.stream:
+        print_stream(stream_pull_request(request))
+    else:
+        result = create_pull_request(request)
+        print(result)
@@ -0,0 +1,82 @@
+"""
+Shared chat model instances and usage accounting.
+
+One LangChain chat model (and therefore one HTTP client) is created per
+model/endpoint and reused by every caller in the process. `acomplete` returns
+the text together with latency and token usage from the response; tagged
+calls are also recorded in the per-version metrics store.
+"""
+
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+from langchain.chat_models import init_chat_model
+from langchain_core.language_models import BaseChatModel
+
+try:
+    from prompt_metrics import MetricsStore, metrics
+except ImportError:
+    from .prompt_metrics import MetricsStore, metrics
+
+_models: Dict[tuple, BaseChatModel] = {}
+_lock = threading.Lock()
+
+
+class Completion(NamedTuple):
+    text: str
+    latency: float
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+
+
+def get_chat_model(model: str, base_url: Optional[str] = None, api_key: Optional[str] = None) -> BaseChatModel:
+    """Return the process-wide chat model for `model` (registry names default to OpenAI)."""
+    key = (model, base_url, api_key)
+    with _lock:
+        if key not in _models:
+            kwargs = {"model_provider": "openai"} if ":" not in model else {}
+            if base_url:
+                kwargs["base_url"] = base_url
+            if api_key:
+                kwargs["api_key"] = api_key
+            _models[key] = init_chat_model(model, **kwargs)
+        return _models[key]
+
+
+def completion_from_message(message, latency: float) -> Completion:
+    usage = getattr(message, "usage_metadata", None) or {}
+    return Completion(
+        text=message.content,
+        latency=latency,
+        input_tokens=usage.get("input_tokens", 0),
+        output_tokens=usage.get("output_tokens", 0),
+        cached_tokens=usage.get("input_token_details", {}).get("cache_read", 0),
+    )
+
+
+async def acomplete(
+    chat_model: BaseChatModel,
+    messages,
+    agent: Optional[str] = None,
+    version: Optional[str] = None,
+    metrics_store: MetricsStore = metrics,
+) -> Completion:
+    """
+    Invoke the model asynchronously and return text, latency and token usage.
+
+    When `agent` and `version` are given the call is recorded as a
+    "completion" observation, failures included.
+    """
+    start = time.perf_counter()
+    try:
+        message = await chat_model.ainvoke(messages)
+    except Exception:
+        if agent:
+            metrics_store.record(agent, version, "completion", time.perf_counter() - start, failed=True)
+        raise
+    completion = completion_from_message(message, time.perf_counter() - start)
+    if agent:
+        metrics_store.record(agent, version, "completion", completion.latency, completion.output_tokens)
+    return completion
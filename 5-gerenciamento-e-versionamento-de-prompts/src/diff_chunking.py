@@ -0,0 +1,139 @@
+"""
+Unified diff parsing and token-budgeted packing for large code reviews.
+
+A diff is split into per-file hunks, which are packed in order into windows
+that fit a token budget. Every window repeats the file header of the hunks it
+contains, so each one is a valid diff on its own. Hunks larger than the budget
+are split by lines, and each piece gets its own `@@` header with recomputed
+line ranges.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Callable, List, Tuple
+
+# Without `diff --git`, a `--- ` line only starts a file as part of a `--- / +++ / @@` header;
+# otherwise it is a removed line starting with "-- " (SQL or Lua comments, markdown rules...)
+FILE_HEADER = re.compile(r"^diff --git |^--- (?=[^\n]*\n\+\+\+ [^\n]*\n@@ )", re.MULTILINE)
+HUNK_HEADER = re.compile(r"^@@ ", re.MULTILINE)
+HUNK_RANGE = re.compile(r"^@@ -(\d+)(?:,\d+)? \+(\d+)(?:,\d+)? @@(.*)")
+PATH_LINE = re.compile(r"^\+\+\+ (?:b/)?(.+?)\s*$|^diff --git a/\S+ b/(.+?)\s*$", re.MULTILINE)
+
+
+@dataclass
+class FileDiff:
+    path: str
+    header: str
+    hunks: List[str] = field(default_factory=list)
+
+
+@dataclass
+class DiffWindow:
+    text: str
+    files: List[str]
+    tokens: int
+
+
+def _split_at(text: str, pattern: re.Pattern) -> List[str]:
+    starts = [match.start() for match in pattern.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    return [text[start:end] for start, end in zip(starts, starts[1:] + [len(text)]) if text[start:end].strip()]
+
+
+def parse_unified_diff(diff: str) -> List[FileDiff]:
+    """Split a unified diff into files and hunks (a bare snippet becomes one file)."""
+    files = []
+    for block in _split_at(diff, re.compile(r"^diff --git ", re.MULTILINE)):
+        # Without `diff --git` lines, files are delimited by `--- ` headers
+        sub_blocks = [block] if block.startswith("diff --git ") else _split_at(block, FILE_HEADER)
+        for sub_block in sub_blocks:
+            parts = _split_at(sub_block, HUNK_HEADER)
+            if parts and not parts[0].startswith("@@ ") and HUNK_HEADER.search(sub_block):
+                header, hunks = parts[0], parts[1:]
+            else:
+                header, hunks = "", parts
+
+            match = PATH_LINE.search(header)
+            path = next(group for group in match.groups() if group) if match else "(snippet)"
+            files.append(FileDiff(path=path, header=header, hunks=hunks))
+    return files
+
+
+def _split_hunk(hunk: str, max_tokens: int, count_tokens: Callable[[str], int]) -> List[Tuple[str, int]]:
+    """
+    Pieces of a hunk that fit `max_tokens`, each with its token count.
+
+    A hunk that already fits is returned unchanged. Otherwise every line is
+    counted once and lines are grouped on the running total, so splitting
+    stays linear in the hunk size.
+    """
+    tokens = count_tokens(hunk)
+    if tokens <= max_tokens:
+        return [(hunk, tokens)]
+
+    lines = hunk.splitlines(keepends=True)
+    match = HUNK_RANGE.match(lines[0]) if lines else None
+    header, body = (lines[0], lines[1:]) if match else ("", lines)
+
+    groups, current, total = [], "", count_tokens(header)
+    for line in body:
+        line_tokens = count_tokens(line)
+        if current and total + line_tokens > max_tokens:
+            groups.append(current)
+            current, total = "", count_tokens(header)
+        current += line
+        total += line_tokens
+    if current:
+        groups.append(current)
+    if match is None:
+        return [(group, count_tokens(group)) for group in groups]
+    if len(groups) <= 1:
+        return [(hunk, tokens)]
+
+    # Give every piece a header with the ranges it covers
+    old_line, new_line, trailer = int(match.group(1)), int(match.group(2)), match.group(3)
+    pieces = []
+    for group in groups:
+        group_lines = group.splitlines()
+        old_count = sum(1 for line in group_lines if line[:1] not in ("+", "\\"))
+        new_count = sum(1 for line in group_lines if line[:1] not in ("-", "\\"))
+        piece = f"@@ -{old_line},{old_count} +{new_line},{new_count} @@{trailer}\n{group}"
+        pieces.append((piece, count_tokens(piece)))
+        old_line += old_count
+        new_line += new_count
+    return pieces
+
+
+def pack_windows(files: List[FileDiff], max_tokens: int, count_tokens: Callable[[str], int]) -> List[DiffWindow]:
+    """Pack file hunks, in order, into windows of at most `max_tokens` tokens."""
+    windows: List[DiffWindow] = []
+    parts: List[str] = []
+    paths: List[str] = []
+    tokens = 0
+
+    def flush():
+        nonlocal parts, paths, tokens
+        if parts:
+            windows.append(DiffWindow(text="".join(parts), files=paths, tokens=tokens))
+        parts, paths, tokens = [], [], 0
+
+    for file_diff in files:
+        header_tokens = count_tokens(file_diff.header)
+        for hunk in file_diff.hunks:
+            for piece, piece_tokens in _split_hunk(hunk, max(1, max_tokens - header_tokens), count_tokens):
+                needs_header = not paths or paths[-1] != file_diff.path
+                cost = piece_tokens + (header_tokens if needs_header else 0)
+
+                if parts and tokens + cost > max_tokens:
+                    flush()
+                    needs_header = True
+                    cost = piece_tokens + header_tokens
+
+                if needs_header:
+                    parts.append(file_diff.header)
+                    paths.append(file_diff.path)
+                parts.append(piece)
+                tokens += cost
+    flush()
+    return windows
@@ -0,0 +1,183 @@
+"""
+Federated prompt registry over several team roots.
+
+Each root is a directory (or a directory shipped inside a Python package,
+written `pkg:<package>/<subdir>`) with its own `registry.yaml`, served by a
+`PromptRegistry` of its own. Roots are mounted lazily: a root's index is read
+the first time a lookup needs it, and an agent's prompt.yaml only when its
+template is first requested, so startup and memory follow the agents a
+process actually uses rather than the size of the catalog.
+
+Agent ids may be qualified with the root name (`team-a/agent-code-reviewer`)
+to address a root directly. Bare ids are resolved by the conflict rule:
+
+    error      an id registered by more than one root is an error (all
+               indexes are read on the first bare lookup to detect it)
+    first      the first root that registers the id wins
+    last       the last root that registers the id wins
+    namespace  bare ids are rejected; every id must be qualified
+
+Usage:
+    registry = FederatedRegistry({"team-a": "/srv/prompts/team-a", "shared": "pkg:shared_prompts/prompts"})
+    registry.get_template("team-a/agent-code-reviewer").render(inputs)
+"""
+
+import threading
+from contextlib import ExitStack
+from importlib import resources
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+try:
+    from prompt_metrics import MetricsStore, metrics
+    from prompt_registry import ChatLayout, CompiledTemplate, PromptInfo, PromptRegistry
+except ImportError:
+    from .prompt_metrics import MetricsStore, metrics
+    from .prompt_registry import ChatLayout, CompiledTemplate, PromptInfo, PromptRegistry
+
+CONFLICT_RULES = ("error", "first", "last", "namespace")
+PACKAGE_PREFIX = "pkg:"
+
+
+class FederatedRegistry:
+    def __init__(
+        self,
+        roots: Mapping[str, Union[str, Path]],
+        conflict: str = "error",
+        registry_filename: str = "registry.yaml",
+        metrics_store: MetricsStore = metrics,
+    ):
+        if conflict not in CONFLICT_RULES:
+            raise ValueError(f"Unknown conflict rule '{conflict}'. Expected one of {list(CONFLICT_RULES)}")
+        invalid = [name for name in roots if not name or "/" in name]
+        if invalid:
+            raise ValueError(f"Root names must be non-empty and contain no '/': {invalid}")
+
+        self.roots = dict(roots)
+        self.conflict = conflict
+        self.registry_filename = registry_filename
+        self.metrics = metrics_store
+        self._mounted: Dict[str, PromptRegistry] = {}
+        self._owners: Dict[str, str] = {}
+        self._indexed = False
+        self._resources = ExitStack()
+        self._lock = threading.RLock()
+
+    def _location(self, name: str) -> Path:
+        location = self.roots[name]
+        if isinstance(location, str) and location.startswith(PACKAGE_PREFIX):
+            package, _, subdir = location[len(PACKAGE_PREFIX):].partition("/")
+            traversable = resources.files(package).joinpath(subdir) if subdir else resources.files(package)
+            return Path(self._resources.enter_context(resources.as_file(traversable)))
+        return Path(location).resolve()
+
+    def mount(self, name: str) -> PromptRegistry:
+        """Return the registry of a root, reading its index on first use."""
+        with self._lock:
+            registry = self._mounted.get(name)
+            if registry is None:
+                if name not in self.roots:
+                    raise ValueError(f"Root '{name}' not found. Available: {list(self.roots)}")
+                registry = PromptRegistry(
+                    prompts_dir=str(self._location(name)),
+                    registry_filename=self.registry_filename,
+                    metrics_store=self.metrics,
+                )
+                self._mounted[name] = registry
+            return registry
+
+    def _build_index(self) -> None:
+        """Read every root's index and apply the conflict rule to bare ids."""
+        with self._lock:
+            if self._indexed:
+                return
+            claims: Dict[str, List[str]] = {}
+            for name in self.roots:
+                for agent_id in self.mount(name).registry['agents']:
+                    claims.setdefault(agent_id, []).append(name)
+
+            conflicts = {agent_id: names for agent_id, names in claims.items() if len(names) > 1}
+            if conflicts and self.conflict == "error":
+                raise ValueError(f"Agents registered by more than one root: {conflicts}")
+            pick = -1 if self.conflict == "last" else 0
+            self._owners = {agent_id: names[pick] for agent_id, names in claims.items()}
+            self._indexed = True
+
+    def _find_owner(self, agent_id: str) -> Optional[str]:
+        if self.conflict == "error":
+            self._build_index()
+            return self._owners.get(agent_id)
+        with self._lock:
+            owner = self._owners.get(agent_id)
+            if owner is None and not self._indexed:
+                order = reversed(list(self.roots)) if self.conflict == "last" else self.roots
+                owner = next((name for name in order if agent_id in self.mount(name).registry['agents']), None)
+                if owner is not None:
+                    self._owners[agent_id] = owner
+            return owner
+
+    def locate(self, prompt_id: str) -> Tuple[PromptRegistry, str]:
+        """Return the root registry serving a prompt and the id local to that root."""
+        root, sep, agent_id = prompt_id.partition("/")
+        if sep:
+            return self.mount(root), agent_id
+        if self.conflict == "namespace":
+            raise ValueError(f"Prompt id '{prompt_id}' must be qualified as '<root>/<agent>'")
+        owner = self._find_owner(prompt_id)
+        if owner is None:
+            raise ValueError(f"Prompt '{prompt_id}' not found in roots {list(self.roots)}")
+        return self.mount(owner), prompt_id
+
+    def agents(self) -> List[str]:
+        """Every addressable id: qualified in namespace mode, bare otherwise."""
+        if self.conflict == "namespace":
+            return [f"{name}/{agent_id}" for name in self.roots for agent_id in self.mount(name).registry['agents']]
+        self._build_index()
+        return list(self._owners)
+
+    def get_prompt(self, prompt_id: str, routing_key: Optional[str] = None) -> PromptInfo:
+        registry, agent_id = self.locate(prompt_id)
+        return registry.get_prompt(agent_id, routing_key)._replace(id=prompt_id)
+
+    def list_versions(self, prompt_id: str) -> List[PromptInfo]:
+        registry, agent_id = self.locate(prompt_id)
+        return [info._replace(id=prompt_id) for info in registry.list_versions(agent_id)]
+
+    def template_for(self, prompt: PromptInfo) -> CompiledTemplate:
+        return self.locate(prompt.id)[0].template_for(prompt)
+
+    def chat_layout_for(self, prompt: PromptInfo) -> ChatLayout:
+        return self.locate(prompt.id)[0].chat_layout_for(prompt)
+
+    def get_template(self, prompt_id: str, routing_key: Optional[str] = None) -> CompiledTemplate:
+        return self.template_for(self.get_prompt(prompt_id, routing_key))
+
+    def get_chat_layout(self, prompt_id: str, routing_key: Optional[str] = None) -> ChatLayout:
+        return self.chat_layout_for(self.get_prompt(prompt_id, routing_key))
+
+    def render(self, prompt_id: str, values: Mapping[str, Any], routing_key: Optional[str] = None) -> str:
+        prompt = self.get_prompt(prompt_id, routing_key)
+        with self.metrics.track(prompt_id, prompt.version, "render"):
+            return self.template_for(prompt).render(values)
+
+    def render_many(
+        self,
+        prompt_id: str,
+        records: Iterable[Mapping[str, Any]],
+        routing_key: Optional[str] = None,
+    ) -> Iterator[str]:
+        return self.get_template(prompt_id, routing_key).render_many(records)
+
+    def stats(self) -> Dict[str, Any]:
+        """How much of the catalog this process has actually loaded."""
+        with self._lock:
+            return {
+                "roots": len(self.roots),
+                "roots_mounted": len(self._mounted),
+                "agents_resolved": len(self._owners),
+                "templates_loaded": sum(len(registry._templates) for registry in self._mounted.values()),
+            }
+
+    def close(self) -> None:
+        """Release temporary copies of packaged roots (only created for zipped packages)."""
+        self._resources.close()
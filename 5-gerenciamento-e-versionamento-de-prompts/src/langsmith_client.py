@@ -1,13 +1,36 @@
+import os
+from pathlib import Path
+
 from dotenv import load_dotenv
 from langsmith import Client
 from langchain.chat_models import init_chat_model
+from langchain_core.load import load
+
+from prompt_cache import PromptCache
 
 # Load environment variables from .env file
 load_dotenv()
 
 client = Client()
 
-prompt = client.pull_prompt("agent-pull-request-creator:dev")
+
+def pull_prompt_commit(identifier: str):
+    commit = client.pull_prompt_commit(identifier)
+    return commit.manifest, commit.commit_hash
+
+
+# Serve hub prompts from a local cache: fresh within the TTL, stale copies
+# are revalidated in the background and used as fallback when offline
+prompt_cache = PromptCache(
+    pull_prompt_commit,
+    cache_dir=Path(__file__).parent.parent / ".prompt-cache",
+    ttl=float(os.getenv("PROMPT_CACHE_TTL", "300")),
+)
+
+cached = prompt_cache.get("agent-pull-request-creator:dev")
+prompt = load(cached.manifest)
+print(f"Prompt commit {cached.commit_hash[:8]} ({cached.source})")
+
 model = init_chat_model("gpt-4o-mini")
 chain = prompt | model
 print(chain.invoke({
@@ -17,4 +40,7 @@ print(chain.invoke({
     "branch_name": "feature/add-cache-system",
     "breaking_changes": "No",
     "testing_done": "Unit tests added with 95% coverage",
-}).content)
\ No newline at end of file
+}).content)
+
+prompt_cache.wait(timeout=5)
+print(prompt_cache.metrics())
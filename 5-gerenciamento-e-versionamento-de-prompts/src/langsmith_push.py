@@ -1,22 +1,68 @@
+"""
+Sync local registry prompts to LangSmith.
+
+Only agent versions whose content changed since the last successful push
+(tracked in a local manifest) are pushed, concurrently and with retries.
+
+Usage:
+    python src/langsmith_push.py
+    python src/langsmith_push.py --agent agent-pull-request-creator --workers 16
+    python src/langsmith_push.py --force
+"""
+
+import argparse
+from pathlib import Path
+
 from dotenv import load_dotenv
 from langchain_core.prompts.loading import load_prompt
 from langsmith import Client
 
-from prompt_registry import registry
+from prompt_registry import PromptInfo, registry
+from prompt_sync import PromptSync
 
 load_dotenv()
 
-prompt = registry.get_prompt("agent-pull-request-creator")
-prompt_template = load_prompt(prompt.path)
-
-client = Client()
-url = client.push_prompt(
-    "agent-pull-request-creator", 
-    object=prompt_template, 
-    tags=[
-        f"v{prompt.version}",
-        f"model: {prompt.model}",
-    ], 
-    description=prompt.description,
-)
-print(url)
+MANIFEST_PATH = Path(__file__).parent.parent / ".langsmith-sync.json"
+
+
+def langsmith_pusher(client: Client):
+    def push(prompt: PromptInfo) -> str:
+        return client.push_prompt(
+            prompt.id,
+            object=load_prompt(prompt.path),
+            tags=[
+                f"v{prompt.version}",
+                f"model: {prompt.model}",
+            ],
+            description=prompt.description,
+        )
+    return push
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Push changed prompts to LangSmith")
+    parser.add_argument("--agent", action="append", help="Restrict the sync to this agent (repeatable)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--force", action="store_true", help="Push everything, ignoring the manifest")
+    parser.add_argument("--api-url", default=None, help="LangSmith endpoint (e.g. a local stand-in server)")
+    parser.add_argument("--manifest", type=Path, default=MANIFEST_PATH)
+    args = parser.parse_args()
+
+    sync = PromptSync(
+        registry,
+        langsmith_pusher(Client(api_url=args.api_url)),
+        manifest_path=args.manifest,
+        max_workers=args.workers,
+        retries=args.retries,
+    )
+    report = sync.run(agent_ids=args.agent, force=args.force)
+
+    for key in report.pushed:
+        print(f"pushed     {key}")
+    for key, error in report.failed.items():
+        print(f"FAILED     {key}: {error}")
+    print(
+        f"\n{len(report.pushed)} pushed, {len(report.unchanged)} unchanged, "
+        f"{len(report.failed)} failed, {report.calls} calls in {report.elapsed:.2f}s"
+    )
@@ -0,0 +1,165 @@
+"""
+Pull-through disk cache for hub prompts.
+
+Wraps a fetch function (e.g. LangSmith's pull_prompt_commit) and stores the
+serialized prompt manifest and commit hash on disk. Within the TTL prompts are
+served from cache; stale entries are served immediately while a background
+revalidation refreshes them, and the last good copy is used when the hub is
+unreachable.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Tuple
+
+
+class CachedPrompt(NamedTuple):
+    identifier: str
+    manifest: Dict[str, Any]
+    commit_hash: str
+    fetched_at: float
+    source: str  # "hit", "stale", "miss" or "fallback"
+
+
+class PromptCache:
+    def __init__(
+        self,
+        fetch: Callable[[str], Tuple[Dict[str, Any], str]],
+        cache_dir: Path,
+        ttl: float = 300.0,
+        background: bool = True,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.fetch = fetch
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.background = background
+        self.clock = clock
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._entries: Dict[str, CachedPrompt] = {}
+        self._revalidating: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        self._counters = {"hit": 0, "stale": 0, "miss": 0, "fallback": 0, "errors": 0, "revalidations": 0}
+        self._latencies = {source: deque(maxlen=1000) for source in ("hit", "stale", "miss", "fallback")}
+
+    def _path(self, identifier: str) -> Path:
+        return self.cache_dir / f"{hashlib.sha256(identifier.encode('utf-8')).hexdigest()[:32]}.json"
+
+    def _read(self, identifier: str):
+        with self._lock:
+            entry = self._entries.get(identifier)
+        if entry is not None:
+            return entry
+
+        path = self._path(identifier)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # Older schema or partial write: treat as a miss and fetch again
+            entry = CachedPrompt(identifier, data['manifest'], data['commit_hash'], float(data['fetched_at']), "hit")
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+        with self._lock:
+            # A refresh may have stored a newer entry while the file was being read
+            return self._entries.setdefault(identifier, entry)
+
+    def _refresh(self, identifier: str) -> CachedPrompt:
+        manifest, commit_hash = self.fetch(identifier)
+        entry = CachedPrompt(identifier, manifest, commit_hash, self.clock(), "miss")
+
+        path = self._path(identifier)
+        # One tmp file per writer: foreground and background refreshes of an identifier may overlap
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "identifier": identifier,
+                "commit_hash": commit_hash,
+                "fetched_at": entry.fetched_at,
+                "manifest": manifest,
+            }, f)
+        tmp_path.replace(path)
+
+        with self._lock:
+            self._entries[identifier] = entry
+        return entry
+
+    def _revalidate(self, identifier: str) -> None:
+        try:
+            self._refresh(identifier)
+            self._count("revalidations")
+        except Exception:
+            self._count("errors")
+        finally:
+            with self._lock:
+                self._revalidating.pop(identifier, None)
+
+    def _start_revalidation(self, identifier: str) -> None:
+        with self._lock:
+            if identifier in self._revalidating:
+                return
+            thread = threading.Thread(target=self._revalidate, args=(identifier,), daemon=True)
+            self._revalidating[identifier] = thread
+        thread.start()
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counters[key] += 1
+
+    def _served(self, entry: CachedPrompt, source: str, start: float) -> CachedPrompt:
+        with self._lock:
+            self._counters[source] += 1
+            self._latencies[source].append(time.perf_counter() - start)
+        return entry._replace(source=source)
+
+    def get(self, identifier: str) -> CachedPrompt:
+        start = time.perf_counter()
+        entry = self._read(identifier)
+
+        if entry is not None and self.clock() - entry.fetched_at < self.ttl:
+            return self._served(entry, "hit", start)
+
+        if entry is not None and self.background:
+            self._start_revalidation(identifier)
+            return self._served(entry, "stale", start)
+
+        try:
+            fresh = self._refresh(identifier)
+        except Exception:
+            self._count("errors")
+            if entry is None:
+                raise
+            return self._served(entry, "fallback", start)
+        return self._served(fresh, "miss", start)
+
+    def wait(self, timeout: float = None) -> None:
+        """Wait for pending background revalidations."""
+        with self._lock:
+            threads = list(self._revalidating.values())
+        for thread in threads:
+            thread.join(timeout)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            latencies = {source: sorted(values) for source, values in self._latencies.items()}
+
+        served = sum(counters[source] for source in ("hit", "stale", "miss", "fallback"))
+        metrics = dict(counters)
+        metrics["hit_rate"] = (counters["hit"] + counters["stale"]) / served if served else 0.0
+        metrics["latency_ms"] = {
+            source: {
+                "p50": values[len(values) // 2] * 1000,
+                "p95": values[min(len(values) - 1, int(len(values) * 0.95))] * 1000,
+            }
+            for source, values in latencies.items() if values
+        }
+        return metrics
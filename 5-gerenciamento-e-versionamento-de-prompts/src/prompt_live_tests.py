@@ -0,0 +1,248 @@
+"""
+Live execution of prompt.tests.yaml cases against the agent's model.
+
+Each case is rendered, sent to the registry `model` (bounded concurrency) and
+its output checked. Checks come from the case's optional `live` block, falling
+back to the top-level `expect_contains`:
+
+    live:
+      expect_contains: ["TÍTULO DO PR"]
+      expect_regex: ["(feat|fix|refactor|docs):"]
+      expect_json: false
+
+Responses are cached on disk by (template hash, inputs, model, endpoint), so
+re-runs only pay for cases whose prompt or inputs changed, and answers
+recorded against a stub are never replayed for the real API. Per-case latency and token
+counts are reported.
+
+Usage:
+    python src/prompt_live_tests.py
+    python src/prompt_live_tests.py --base-url http://127.0.0.1:8000/v1 --concurrency 8
+    python src/prompt_live_tests.py --agent agent-code-reviewer --all-versions --no-cache
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import yaml
+from dotenv import load_dotenv
+
+try:
+    from chat_models import Completion, acomplete, get_chat_model
+    from prompt_registry import CompiledTemplate, PromptInfo, PromptRegistry, compile_chat_layout, registry
+except ImportError:
+    from .chat_models import Completion, acomplete, get_chat_model
+    from .prompt_registry import CompiledTemplate, PromptInfo, PromptRegistry, compile_chat_layout, registry
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / ".live-cache"
+
+
+@dataclass
+class LiveCase:
+    prompt: PromptInfo
+    name: str
+    messages: Any
+    template_hash: str
+    inputs: Dict[str, Any]
+    checks: Dict[str, Any]
+
+
+@dataclass
+class LiveCaseResult:
+    prompt: str
+    case: str
+    model: str
+    passed: bool
+    failures: List[str] = field(default_factory=list)
+    latency_ms: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    cached: bool = False
+
+
+def check_output(output: str, checks: Dict[str, Any]) -> List[str]:
+    """Return the list of failed checks for a model output."""
+    failures = [
+        f"missing text: {text!r}" for text in checks.get('expect_contains', []) if text not in output
+    ]
+    failures += [
+        f"no match for regex: {pattern!r}"
+        for pattern in checks.get('expect_regex', []) if not re.search(pattern, output, re.MULTILINE)
+    ]
+
+    expect_json = checks.get('expect_json')
+    if expect_json:
+        body = re.sub(r"^```(?:json)?\s*|\s*```$", "", output.strip())
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            failures.append(f"output is not valid JSON: {e}")
+        else:
+            if isinstance(expect_json, list):
+                missing = [key for key in expect_json if not isinstance(data, dict) or key not in data]
+                if missing:
+                    failures.append(f"JSON output is missing keys: {missing}")
+    return failures
+
+
+class ResponseCache:
+    """Model responses on disk keyed by (template hash, inputs, model, endpoint)."""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(template_hash: str, inputs: Dict[str, Any], model: str, endpoint: str = "") -> str:
+        payload = json.dumps([template_hash, inputs, model, endpoint], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Completion]:
+        path = self.cache_dir / f"{key}.json"
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return Completion(**json.load(f))
+
+    def set(self, key: str, completion: Completion) -> None:
+        with open(self.cache_dir / f"{key}.json", 'w', encoding='utf-8') as f:
+            json.dump(completion._asdict(), f, ensure_ascii=False)
+
+
+class LiveTestRunner:
+    def __init__(
+        self,
+        prompt_registry: PromptRegistry = registry,
+        model: Optional[str] = None,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        concurrency: int = 4,
+        cache: Optional[ResponseCache] = None,
+        chat_layout: bool = False,
+    ):
+        self.registry = prompt_registry
+        self.model = model
+        self.base_url = base_url
+        self.api_key = api_key
+        self.concurrency = concurrency
+        self.cache = cache
+        self.chat_layout = chat_layout
+
+    @property
+    def endpoint(self) -> str:
+        """Where requests go: --base-url, the OpenAI client's environment override, or the provider default"""
+        return self.base_url or os.getenv("OPENAI_BASE_URL") or os.getenv("OPENAI_API_BASE") or "default"
+
+    def collect(self, agent_ids: Optional[List[str]] = None, all_versions: bool = False) -> List[LiveCase]:
+        cases = []
+        for agent_id in agent_ids or list(self.registry.registry['agents']):
+            if all_versions:
+                prompts = self.registry.list_versions(agent_id)
+            else:
+                prompts = [self.registry.get_prompt(agent_id)]
+
+            for prompt in prompts:
+                test_path = prompt.path.parent / "prompt.tests.yaml"
+                if not test_path.exists():
+                    continue
+                with open(test_path, 'r', encoding='utf-8') as f:
+                    test_data = yaml.safe_load(f) or {}
+
+                template = CompiledTemplate.from_file(prompt.path)
+                render = compile_chat_layout(template).render if self.chat_layout else template.render
+                template_hash = hashlib.sha256(prompt.path.read_bytes()).hexdigest()
+                if self.chat_layout:
+                    template_hash += ":chat"
+                for case in test_data.get('cases', []):
+                    inputs = {var: case['inputs'].get(var, '') for var in template.input_variables}
+                    checks = case.get('live') or {'expect_contains': case.get('expect_contains', [])}
+                    cases.append(LiveCase(prompt, case['name'], render(inputs), template_hash, inputs, checks))
+        return cases
+
+    async def _run_case(self, case: LiveCase, semaphore: asyncio.Semaphore) -> LiveCaseResult:
+        model = self.model or case.prompt.model or "gpt-4o-mini"
+        result = LiveCaseResult(prompt=f"{case.prompt.id}@{case.prompt.version}", case=case.name, model=model, passed=False)
+
+        cache_key = ResponseCache.key(case.template_hash, case.inputs, model, self.endpoint)
+        completion = self.cache.get(cache_key) if self.cache else None
+        result.cached = completion is not None
+
+        if completion is None:
+            async with semaphore:
+                try:
+                    chat_model = get_chat_model(model, self.base_url, self.api_key)
+                    completion = await acomplete(chat_model, case.messages)
+                except Exception as e:
+                    result.failures.append(f"model call failed: {e}")
+                    return result
+            if self.cache:
+                self.cache.set(cache_key, completion)
+
+        result.failures = check_output(completion.text, case.checks)
+        result.passed = not result.failures
+        result.latency_ms = completion.latency * 1000
+        result.input_tokens = completion.input_tokens
+        result.output_tokens = completion.output_tokens
+        result.cached_tokens = completion.cached_tokens
+        return result
+
+    async def run(self, cases: List[LiveCase]) -> List[LiveCaseResult]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        return await asyncio.gather(*(self._run_case(case, semaphore) for case in cases))
+
+
+def print_report(results: List[LiveCaseResult]) -> None:
+    print(f"{'STATUS':<6} {'PROMPT':<36} {'CASE':<24} {'LATENCY':>10} {'IN':>7} {'CACHED':>7} {'OUT':>7}")
+    for r in results:
+        status = "PASS" if r.passed else "FAIL"
+        latency = "cached" if r.cached else f"{r.latency_ms:.0f}ms"
+        print(
+            f"{status:<6} {r.prompt:<36} {r.case:<24} {latency:>10} "
+            f"{r.input_tokens:>7} {r.cached_tokens:>7} {r.output_tokens:>7}"
+        )
+        for failure in r.failures:
+            print(f"       - {failure}")
+
+    passed = sum(r.passed for r in results)
+    print(f"\n{passed}/{len(results)} cases passed")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Run prompt.tests.yaml cases against the model")
+    parser.add_argument("--agent", action="append", help="Restrict to this agent (repeatable)")
+    parser.add_argument("--all-versions", action="store_true", help="Run every version, not only the current one")
+    parser.add_argument("--model", default=None, help="Override the registry model")
+    parser.add_argument("--base-url", default=None, help="OpenAI-compatible endpoint (e.g. a local stub)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--chat-layout", action="store_true", help="Send static sections as a cacheable system message")
+    parser.add_argument("--json", type=Path, default=None, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    runner = LiveTestRunner(
+        model=args.model,
+        base_url=args.base_url,
+        concurrency=args.concurrency,
+        cache=None if args.no_cache else ResponseCache(args.cache_dir),
+        chat_layout=args.chat_layout,
+    )
+    results = asyncio.run(runner.run(runner.collect(args.agent, args.all_versions)))
+    print_report(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([asdict(r) for r in results], f, indent=2, ensure_ascii=False)
+
+    sys.exit(0 if all(r.passed for r in results) else 1)
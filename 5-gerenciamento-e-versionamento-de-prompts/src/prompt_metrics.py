@@ -0,0 +1,163 @@
+"""
+In-process latency / token telemetry tagged by agent and prompt version.
+
+Renders and completions record one observation each (latency, output tokens,
+failure) into a process-wide `MetricsStore`. Samples are kept per
+(agent, version, operation) in a bounded window, so p50/p95 reflect recent
+traffic; the store can be exported to JSON and two versions of the same
+agent compared side by side during a canary rollout.
+
+Usage:
+    python src/prompt_metrics.py metrics.json
+    python src/prompt_metrics.py metrics.json --agent agent-code-reviewer --operation completion
+"""
+
+import argparse
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted samples (0.0 when empty)."""
+    if not samples:
+        return 0.0
+    rank = max(1, math.ceil(len(samples) * pct / 100))
+    return samples[rank - 1]
+
+
+class Observation:
+    """Mutable handle yielded by `MetricsStore.track` to attach output tokens."""
+
+    __slots__ = ("output_tokens",)
+
+    def __init__(self):
+        self.output_tokens = 0
+
+
+class _Series:
+    __slots__ = ("latencies", "count", "failures", "output_tokens")
+
+    def __init__(self, max_samples: int):
+        self.latencies: Deque[float] = deque(maxlen=max_samples)
+        self.count = 0
+        self.failures = 0
+        self.output_tokens = 0
+
+
+class MetricsStore:
+    """
+    Thread-safe store of per-version observations.
+
+    Failed calls count towards `failures` but not towards the latency
+    percentiles, which describe successful calls only.
+    """
+
+    def __init__(self, max_samples: int = 10_000):
+        self.max_samples = max_samples
+        self._series: Dict[Tuple[str, str, str], _Series] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        agent: str,
+        version: str,
+        operation: str,
+        latency: float,
+        output_tokens: int = 0,
+        failed: bool = False,
+    ) -> None:
+        key = (agent, version, operation)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(self.max_samples)
+            series.count += 1
+            if failed:
+                series.failures += 1
+            else:
+                series.latencies.append(latency)
+                series.output_tokens += output_tokens
+
+    @contextmanager
+    def track(self, agent: str, version: str, operation: str) -> Iterator[Observation]:
+        """Time the block; an exception is recorded as a failure and re-raised."""
+        observation = Observation()
+        start = time.perf_counter()
+        try:
+            yield observation
+        except BaseException:
+            self.record(agent, version, operation, time.perf_counter() - start, failed=True)
+            raise
+        self.record(agent, version, operation, time.perf_counter() - start, observation.output_tokens)
+
+    def summary(self, agent: Optional[str] = None, operation: Optional[str] = None) -> List[Dict[str, Any]]:
+        """One row per (agent, version, operation), optionally filtered."""
+        with self._lock:
+            snapshot = [
+                (key, sorted(series.latencies), series.count, series.failures, series.output_tokens)
+                for key, series in self._series.items()
+                if (agent is None or key[0] == agent) and (operation is None or key[2] == operation)
+            ]
+
+        rows = []
+        for (row_agent, version, row_operation), latencies, count, failures, output_tokens in sorted(snapshot):
+            succeeded = count - failures
+            rows.append({
+                "agent": row_agent,
+                "version": version,
+                "operation": row_operation,
+                "count": count,
+                "failures": failures,
+                "failure_rate": round(failures / count, 4) if count else 0.0,
+                "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+                "output_tokens": output_tokens,
+                "avg_output_tokens": round(output_tokens / succeeded, 1) if succeeded else 0.0,
+            })
+        return rows
+
+    def export(self, path: Path) -> Path:
+        """Write the summary to a JSON file."""
+        path = Path(path)
+        path.write_text(
+            json.dumps({"exported_at": time.time(), "series": self.summary()}, indent=2) + "\n",
+            encoding='utf-8',
+        )
+        return path
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+metrics = MetricsStore()
+
+
+def print_comparison(rows: List[Dict[str, Any]]) -> None:
+    print(f"{'AGENT':<28} {'VERSION':<9} {'OPERATION':<11} {'COUNT':>7} {'FAIL%':>6} {'P50 ms':>9} {'P95 ms':>9} {'AVG OUT':>8}")
+    for row in rows:
+        print(
+            f"{row['agent']:<28} {row['version']:<9} {row['operation']:<11} {row['count']:>7} "
+            f"{row['failure_rate'] * 100:>5.1f}% {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['avg_output_tokens']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-version metrics from an export")
+    parser.add_argument("export", type=Path, help="JSON file written by MetricsStore.export")
+    parser.add_argument("--agent", default=None)
+    parser.add_argument("--operation", default=None, help="render or completion")
+    args = parser.parse_args()
+
+    series = json.loads(args.export.read_text(encoding='utf-8'))["series"]
+    print_comparison([
+        row for row in series
+        if (args.agent is None or row["agent"] == args.agent)
+        and (args.operation is None or row["operation"] == args.operation)
+    ])
@@ -1,6 +1,17 @@
+import hashlib
+import random
+import re
+import string
 import yaml
 from pathlib import Path
-from typing import NamedTuple, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+try:
+    from prompt_metrics import MetricsStore, metrics
+except ImportError:
+    from .prompt_metrics import MetricsStore, metrics
+
+SECTION_HEADER = re.compile(r"^(#{1,6}) +(.+?)\s*$", re.MULTILINE)
 
 
 class PromptInfo(NamedTuple):
@@ -11,23 +22,191 @@ class PromptInfo(NamedTuple):
     model: Optional[str] = None
 
 
+class CompiledTemplate:
+    """
+    f-string template pre-parsed into literal and field segments.
+
+    Parsing happens once; each render only fills the field slots and joins
+    the segments, skipping the per-call parsing done by PromptTemplate.format.
+    """
+
+    __slots__ = ("template", "input_variables", "_parts", "_slots")
+
+    def __init__(self, template: str, input_variables: Iterable[str]):
+        self.template = template
+        self.input_variables = list(input_variables)
+        self._parts: List[str] = []
+        self._slots: List[tuple] = []
+
+        for literal, field_name, format_spec, conversion in string.Formatter().parse(template):
+            if literal:
+                self._parts.append(literal)
+            if field_name is None:
+                continue
+            if not field_name.isidentifier() or format_spec or conversion:
+                raise ValueError(f"Unsupported template field: {{{field_name}}}")
+            self._slots.append((len(self._parts), field_name))
+            self._parts.append("")
+
+        undeclared = {name for _, name in self._slots} - set(self.input_variables)
+        if undeclared:
+            raise ValueError(f"Template uses undeclared variables: {sorted(undeclared)}")
+
+    @classmethod
+    def from_file(cls, path: Path) -> "CompiledTemplate":
+        with open(path, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f)
+        return cls(data['template'], data.get('input_variables', []))
+
+    def missing_variables(self, values: Mapping[str, Any]) -> List[str]:
+        return [name for name in self.input_variables if name not in values]
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        parts = self._parts.copy()
+        try:
+            for index, name in self._slots:
+                parts[index] = str(values[name])
+        except KeyError:
+            raise ValueError(f"Missing input variables: {self.missing_variables(values)}") from None
+        return "".join(parts)
+
+    def render_many(self, records: Iterable[Mapping[str, Any]]) -> Iterator[str]:
+        required = self.input_variables
+        for position, values in enumerate(records):
+            missing = [name for name in required if name not in values]
+            if missing:
+                raise ValueError(f"Record {position} is missing input variables: {missing}")
+            yield self.render(values)
+
+
+class ChatLayout(NamedTuple):
+    """
+    Template split into a static system message and a dynamic user message.
+
+    The system message is byte-identical across calls, so provider-side prompt
+    caching can reuse it as a prefix.
+    """
+
+    system: str
+    user: CompiledTemplate
+
+    def render(self, values: Mapping[str, Any]) -> List[Tuple[str, str]]:
+        return [("system", self.system), ("user", self.user.render(values))]
+
+
+def split_sections(text: str, max_level: int = 2) -> List[Tuple[str, str]]:
+    """Split text at markdown headers up to `max_level` into (title, text) pairs."""
+    sections = []
+    matches = [match for match in SECTION_HEADER.finditer(text) if len(match.group(1)) <= max_level]
+    if not matches or matches[0].start() > 0:
+        sections.append(("(início)", text[:matches[0].start()] if matches else text))
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        sections.append((match.group(2), text[match.start():end]))
+    return sections
+
+
+def compile_chat_layout(template: CompiledTemplate) -> ChatLayout:
+    """
+    Move every markdown section without variables into the system message.
+
+    Static and dynamic sections keep their relative order; sections are split
+    at every header level so a variable only pulls in its own subsection.
+    """
+    static, dynamic = [], []
+    for _, text in split_sections(template.template, max_level=6):
+        has_fields = any(field is not None for _, field, _, _ in string.Formatter().parse(text))
+        (dynamic if has_fields else static).append(text)
+
+    system = CompiledTemplate("".join(static), []).render({}).strip()
+    user = CompiledTemplate("".join(dynamic).strip() + "\n", template.input_variables)
+    return ChatLayout(system=system, user=user)
+
+
+def _version_key(version: str) -> tuple:
+    return tuple((int(part), "") if part.isdigit() else (-1, part) for part in version.split("."))
+
+
+def route_version(prompt_id: str, rollout: Mapping[str, float], routing_key: Optional[str] = None) -> str:
+    """
+    Pick a version from a `{version: weight}` rollout.
+
+    With a routing key the choice is sticky: the key hashes to a fixed point
+    in [0, 1) and versions take consecutive slices of that range, newest
+    first. Raising the newest version's weight therefore only moves keys onto
+    it, never off it. Without a key the point is drawn at random.
+    """
+    weights = sorted(rollout.items(), key=lambda item: _version_key(str(item[0])), reverse=True)
+    if any(not isinstance(weight, (int, float)) or weight < 0 for _, weight in weights):
+        raise ValueError(f"Rollout weights for '{prompt_id}' must be non-negative numbers: {dict(rollout)}")
+    total = sum(weight for _, weight in weights)
+    if total <= 0:
+        raise ValueError(f"Rollout for '{prompt_id}' has no positive weight: {dict(rollout)}")
+
+    if routing_key is None:
+        point = random.random()
+    else:
+        digest = hashlib.sha256(f"{prompt_id}:{routing_key}".encode('utf-8')).digest()
+        point = int.from_bytes(digest[:8], "big") / 2 ** 64
+
+    point *= total
+    for version, weight in weights:
+        if point < weight:
+            return str(version)
+        point -= weight
+    return str(next(version for version, weight in reversed(weights) if weight > 0))
+
+
 class PromptRegistry:
-    def __init__(self, prompts_dir: str = "prompts", registry_filename: str = "registry.yaml"):
+    def __init__(
+        self,
+        prompts_dir: str = "prompts",
+        registry_filename: str = "registry.yaml",
+        metrics_store: MetricsStore = metrics,
+    ):
         self.prompts_dir = Path(__file__).parent.parent / prompts_dir
         self.registry_path = self.prompts_dir / registry_filename
+        self.metrics = metrics_store
+        self._templates: Dict[Path, CompiledTemplate] = {}
+        self._layouts: Dict[Path, ChatLayout] = {}
+        self._registry_mtime_ns: Optional[int] = None
         self._load_registry()
 
     def _load_registry(self) -> None:
         if not self.registry_path.exists():
             raise FileNotFoundError(f"Registry not found: {self.registry_path}")
 
+        mtime_ns = self.registry_path.stat().st_mtime_ns
         with open(self.registry_path, 'r', encoding='utf-8') as f:
-            self.registry = yaml.safe_load(f)
+            registry = yaml.safe_load(f)
 
-        if 'agents' not in self.registry:
+        if 'agents' not in registry:
             raise ValueError("Registry must contain 'agents' key")
+        self.registry = registry
+        self._registry_mtime_ns = mtime_ns
+
+    def reload_if_changed(self) -> bool:
+        """Re-read the registry file (current_version, rollout...) when its mtime changed."""
+        if self.registry_path.stat().st_mtime_ns == self._registry_mtime_ns:
+            return False
+        self._load_registry()
+        return True
+
+    def get_prompt(self, prompt_id: str, routing_key: Optional[str] = None) -> PromptInfo:
+        """
+        Resolve the version of a prompt to serve.
+
+        Agents with a `rollout: {version: weight}` entry split traffic between
+        versions (see `route_version`); pass the same `routing_key` (request,
+        repository, user...) to keep a caller on the same version.
+        """
+        return self._resolve(prompt_id, routing_key, route=True)
 
-    def get_prompt(self, prompt_id: str) -> PromptInfo:
+    def get_current_prompt(self, prompt_id: str) -> PromptInfo:
+        """Resolve the registry's `current_version`, ignoring any rollout."""
+        return self._resolve(prompt_id, routing_key=None, route=False)
+
+    def _resolve(self, prompt_id: str, routing_key: Optional[str], route: bool) -> PromptInfo:
         agents = self.registry.get('agents', {})
 
         if prompt_id not in agents:
@@ -42,17 +221,83 @@ class PromptRegistry:
             raise ValueError(f"Missing required fields for prompt '{prompt_id}': {missing_fields}")
 
         prompt_path = self.prompts_dir / agent_config['path']
+        version = agent_config['current_version']
+
+        rollout = agent_config.get('rollout')
+        if route and rollout:
+            routed = route_version(prompt_id, rollout, routing_key)
+            if routed != str(version):
+                version = routed
+                prompt_path = prompt_path.parent.parent / f"v{version}" / prompt_path.name
 
         if not prompt_path.exists():
             raise FileNotFoundError(f"Prompt file does not exist: {prompt_path}")
 
         return PromptInfo(
             id=prompt_id,
-            version=agent_config['current_version'],
+            version=version,
             path=prompt_path,
             description=agent_config['description'],
             model=agent_config.get('model')
         )
 
+    def list_versions(self, prompt_id: str) -> List[PromptInfo]:
+        """
+        Return every version on disk for a prompt, oldest first.
+
+        Versions are the `v<version>/prompt.yaml` directories next to the
+        registered one; description and model come from the registry entry.
+        """
+        current = self._resolve(prompt_id, routing_key=None, route=False)
+        versions = []
+        for path in current.path.parent.parent.glob(f"v*/{current.path.name}"):
+            versions.append(current._replace(version=path.parent.name[1:], path=path))
+        return sorted(versions, key=lambda info: _version_key(info.version))
+
+    def template_for(self, prompt: PromptInfo) -> CompiledTemplate:
+        """Return the compiled template of a resolved prompt, parsing its YAML only once."""
+        template = self._templates.get(prompt.path)
+        if template is None:
+            template = CompiledTemplate.from_file(prompt.path)
+            self._templates[prompt.path] = template
+        return template
+
+    def chat_layout_for(self, prompt: PromptInfo) -> ChatLayout:
+        """Return a resolved prompt compiled into a static system prefix and a dynamic user message."""
+        layout = self._layouts.get(prompt.path)
+        if layout is None:
+            layout = compile_chat_layout(self.template_for(prompt))
+            self._layouts[prompt.path] = layout
+        return layout
+
+    def get_template(self, prompt_id: str, routing_key: Optional[str] = None) -> CompiledTemplate:
+        """Return the compiled template of a prompt, parsing its YAML only once."""
+        return self.template_for(self.get_prompt(prompt_id, routing_key))
+
+    def get_chat_layout(self, prompt_id: str, routing_key: Optional[str] = None) -> ChatLayout:
+        """Return the prompt compiled into a static system prefix and a dynamic user message."""
+        return self.chat_layout_for(self.get_prompt(prompt_id, routing_key))
+
+    def render(self, prompt_id: str, values: Mapping[str, Any], routing_key: Optional[str] = None) -> str:
+        """Render one prompt, recording the latency under its agent and version."""
+        prompt = self.get_prompt(prompt_id, routing_key)
+        with self.metrics.track(prompt_id, prompt.version, "render"):
+            return self.template_for(prompt).render(values)
+
+    def render_many(
+        self,
+        prompt_id: str,
+        records: Iterable[Mapping[str, Any]],
+        routing_key: Optional[str] = None,
+    ) -> Iterator[str]:
+        """
+        Render a prompt for each record, lazily.
+
+        The template is resolved and validated when this is called; records
+        are rendered one at a time as the returned generator is consumed.
+        The whole batch uses one version and is not recorded per record.
+        """
+        return self.get_template(prompt_id, routing_key).render_many(records)
+
 
-registry = PromptRegistry()
\ No newline at end of file
+registry = PromptRegistry()
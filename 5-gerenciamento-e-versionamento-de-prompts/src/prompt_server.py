@@ -0,0 +1,362 @@
+"""
+Local prompt-serving daemon shared by worker processes.
+
+Serves resolved templates and rendered prompts from a PromptRegistry over
+localhost HTTP or a Unix socket. Template responses carry an ETag so clients
+keep a local copy and only revalidate it (If-None-Match -> 304).
+
+Agents with a canary rollout serve their `current_version` unless the request
+carries a routing key (`?key=<repository, PR id...>`), which picks a sticky
+version (see `prompt_registry.route_version`).
+
+Usage:
+    python src/prompt_server.py --port 8765
+    python src/prompt_server.py --unix-socket /tmp/prompts.sock
+"""
+
+import argparse
+import hashlib
+import http.client
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+import yaml
+
+try:
+    from prompt_registry import CompiledTemplate, PromptInfo, PromptRegistry, registry
+except ImportError:
+    from .prompt_registry import CompiledTemplate, PromptInfo, PromptRegistry, registry
+
+
+class ServedPrompt(NamedTuple):
+    prompt: PromptInfo
+    mtime_ns: int
+    etag: str
+    body: bytes
+    template: CompiledTemplate
+
+
+class PromptStore:
+    """
+    Resolved prompt payloads, rebuilt only when the prompt file or its
+    registry entry (version, description, model) changes.
+    """
+
+    def __init__(self, prompt_registry: PromptRegistry):
+        self.registry = prompt_registry
+        self._served: Dict[Path, ServedPrompt] = {}
+        self._lock = threading.Lock()
+
+    def get(self, prompt_id: str, routing_key: Optional[str] = None) -> ServedPrompt:
+        """
+        Without a routing key the current version is served, so the payload
+        and its ETag stay stable across requests; with one, the rollout picks
+        a sticky version.
+        """
+        with self._lock:
+            self.registry.reload_if_changed()
+        if routing_key is None:
+            prompt = self.registry.get_current_prompt(prompt_id)
+        else:
+            prompt = self.registry.get_prompt(prompt_id, routing_key)
+        mtime_ns = prompt.path.stat().st_mtime_ns
+
+        served = self._served.get(prompt.path)
+        if served is not None and served.mtime_ns == mtime_ns and served.prompt == prompt:
+            return served
+
+        with open(prompt.path, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f)
+
+        payload = {
+            "id": prompt.id,
+            "version": prompt.version,
+            "description": prompt.description,
+            "model": prompt.model,
+            "template": data['template'],
+            "input_variables": data.get('input_variables', []),
+        }
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        served = ServedPrompt(
+            prompt=prompt,
+            mtime_ns=mtime_ns,
+            etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+            body=body,
+            template=CompiledTemplate(payload['template'], payload['input_variables']),
+        )
+        with self._lock:
+            self._served[prompt.path] = served
+        return served
+
+
+class PromptRequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes:
+        GET  /health
+        GET  /prompts/<id>           -> resolved template (ETag / If-None-Match)
+        POST /prompts/<id>/render    -> {"inputs": {...}} -> {"rendered": "..."}
+
+    Both prompt routes accept `?key=<routing key>` for canary rollouts.
+    """
+
+    protocol_version = "HTTP/1.1"
+    store: PromptStore = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        self._send_body(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'), headers)
+
+    def _send_body(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self) -> Tuple[list, Optional[str]]:
+        url = urlsplit(self.path)
+        keys = parse_qs(url.query).get("key")
+        return [unquote(part) for part in url.path.strip("/").split("/")], keys[0] if keys else None
+
+    def _resolve(self, prompt_id: str, routing_key: Optional[str]) -> Optional[ServedPrompt]:
+        try:
+            return self.store.get(prompt_id, routing_key)
+        except (ValueError, FileNotFoundError) as e:
+            self._send_json(404, {"error": str(e)})
+            return None
+
+    def do_GET(self):
+        parts, routing_key = self._route()
+
+        if parts == ["health"]:
+            self._send_json(200, {"status": "ok"})
+            return
+
+        if len(parts) != 2 or parts[0] != "prompts":
+            self._send_json(404, {"error": f"Unknown route: {self.path}"})
+            return
+
+        served = self._resolve(parts[1], routing_key)
+        if served is None:
+            return
+
+        if self.headers.get("If-None-Match") == served.etag:
+            self.send_response(304)
+            self.send_header("ETag", served.etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self._send_body(200, served.body, {"ETag": served.etag})
+
+    def do_POST(self):
+        parts, routing_key = self._route()
+        length = int(self.headers.get("Content-Length", 0))
+        raw_body = self.rfile.read(length)
+
+        if len(parts) != 3 or parts[0] != "prompts" or parts[2] != "render":
+            self._send_json(404, {"error": f"Unknown route: {self.path}"})
+            return
+
+        served = self._resolve(parts[1], routing_key)
+        if served is None:
+            return
+
+        try:
+            inputs = json.loads(raw_body or b"{}").get("inputs", {})
+            rendered = served.template.render(inputs)
+        except (ValueError, AttributeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        self._send_json(200, {"rendered": rendered}, {"ETag": served.etag})
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+
+def create_server(
+    prompt_registry: PromptRegistry = registry,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    unix_socket: Optional[str] = None,
+) -> socketserver.BaseServer:
+    """Create (without starting) a server bound to localhost or a Unix socket."""
+    handler = type("BoundPromptRequestHandler", (PromptRequestHandler,), {"store": PromptStore(prompt_registry)})
+
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+        return UnixHTTPServer(unix_socket, handler)
+
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float = 10.0):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class PromptServerClient:
+    """
+    Client for the prompt server with a local, revalidated cache.
+
+    Templates are kept locally together with their ETag; each lookup sends a
+    conditional request and only downloads the template when it changed.
+    Rendering happens locally from the cached template. With `max_age`, lookups
+    within that many seconds of the last validation skip the request entirely.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        unix_socket: Optional[str] = None,
+        max_age: float = 0.0,
+        timeout: float = 10.0,
+    ):
+        self.host = host
+        self.port = port
+        self.unix_socket = unix_socket
+        self.max_age = max_age
+        self.timeout = timeout
+        self.stats = {"requests": 0, "not_modified": 0, "downloads": 0, "cache_hits": 0}
+        self._cache: Dict[Tuple[str, Optional[str]], Dict[str, Any]] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.unix_socket:
+                conn = UnixHTTPConnection(self.unix_socket, timeout=self.timeout)
+            else:
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _request(self, method: str, path: str, body: Optional[bytes] = None, headers: Optional[Dict[str, str]] = None):
+        headers = dict(headers or {})
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # Server closed the keep-alive connection; reconnect once
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+
+        with self._lock:
+            self.stats["requests"] += 1
+
+        if response.status == 404:
+            raise ValueError(json.loads(data).get("error", f"Not found: {path}"))
+        if response.status >= 400:
+            raise RuntimeError(f"Prompt server error {response.status}: {data.decode('utf-8', 'replace')}")
+        return response, data
+
+    @staticmethod
+    def _prompt_path(prompt_id: str, routing_key: Optional[str], suffix: str = "") -> str:
+        path = f"/prompts/{quote(prompt_id, safe='')}{suffix}"
+        return f"{path}?key={quote(routing_key, safe='')}" if routing_key is not None else path
+
+    def get_prompt(self, prompt_id: str, routing_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Return the resolved prompt payload (id, version, model, template, input_variables).
+
+        Pass a routing key to get the caller's sticky canary version; without
+        one the registry's current version is returned.
+        """
+        cache_key = (prompt_id, routing_key)
+        cached = self._cache.get(cache_key)
+        if cached is not None and time.monotonic() - cached["validated_at"] < self.max_age:
+            with self._lock:
+                self.stats["cache_hits"] += 1
+            return cached["payload"]
+
+        headers = {"If-None-Match": cached["etag"]} if cached else {}
+        response, data = self._request("GET", self._prompt_path(prompt_id, routing_key), headers=headers)
+
+        if response.status == 304 and cached is not None:
+            cached["validated_at"] = time.monotonic()
+            with self._lock:
+                self.stats["not_modified"] += 1
+            return cached["payload"]
+
+        payload = json.loads(data)
+        self._cache[cache_key] = {
+            "etag": response.getheader("ETag"),
+            "payload": payload,
+            "template": CompiledTemplate(payload["template"], payload["input_variables"]),
+            "validated_at": time.monotonic(),
+        }
+        with self._lock:
+            self.stats["downloads"] += 1
+        return payload
+
+    def render(self, prompt_id: str, inputs: Mapping[str, Any], routing_key: Optional[str] = None) -> str:
+        """Render locally from the revalidated template."""
+        self.get_prompt(prompt_id, routing_key)
+        return self._cache[(prompt_id, routing_key)]["template"].render(inputs)
+
+    def render_remote(self, prompt_id: str, inputs: Mapping[str, Any], routing_key: Optional[str] = None) -> str:
+        """Render on the server (for callers that do not keep templates)."""
+        body = json.dumps({"inputs": dict(inputs)}).encode('utf-8')
+        _, data = self._request("POST", self._prompt_path(prompt_id, routing_key, "/render"), body=body)
+        return json.loads(data)["rendered"]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve registry prompts to local workers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix-socket", default=None)
+    args = parser.parse_args()
+
+    server = create_server(host=args.host, port=args.port, unix_socket=args.unix_socket)
+    print(f"Serving prompts on {args.unix_socket or f'http://{args.host}:{args.port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
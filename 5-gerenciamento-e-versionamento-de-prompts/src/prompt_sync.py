@@ -0,0 +1,146 @@
+"""
+Incremental, parallel sync of local registry prompts to a remote hub.
+
+Every agent/version on disk gets a content hash which is compared with a local
+manifest of what was last pushed; only changed prompts are pushed. Agents are
+pushed concurrently by a bounded worker pool, with retries and exponential
+backoff. Each push becomes the hub head, so an agent's versions are pushed
+oldest first with `current_version` always last, re-pushed if unchanged.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    from prompt_registry import PromptInfo, PromptRegistry
+except ImportError:
+    from .prompt_registry import PromptInfo, PromptRegistry
+
+
+def content_hash(prompt: PromptInfo) -> str:
+    """Hash of everything that ends up in the pushed commit."""
+    digest = hashlib.sha256(prompt.path.read_bytes())
+    digest.update(f"\0{prompt.version}\0{prompt.description}\0{prompt.model}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+@dataclass
+class SyncReport:
+    pushed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    calls: int = 0
+    elapsed: float = 0.0
+
+
+class PromptSync:
+    def __init__(
+        self,
+        registry: PromptRegistry,
+        push: Callable[[PromptInfo], object],
+        manifest_path: Path,
+        max_workers: int = 8,
+        retries: int = 3,
+        backoff: float = 0.5,
+    ):
+        self.registry = registry
+        self.push = push
+        self.manifest_path = Path(manifest_path)
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self._lock = threading.Lock()
+
+    def load_manifest(self) -> Dict[str, str]:
+        if not self.manifest_path.exists():
+            return {}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_manifest(self, manifest: Dict[str, str]) -> None:
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        tmp_path.replace(self.manifest_path)
+
+    def plan(self, manifest: Dict[str, str], agent_ids: Optional[List[str]] = None) -> tuple:
+        """
+        Compare every version on disk with the manifest.
+
+        Returns a dict of agent id -> [(prompt, hash), ...] to push, and the
+        list of `agent:version` keys that are unchanged. When any version of
+        an agent is pushed, its current version closes the list.
+        """
+        changes, unchanged = {}, []
+        for agent_id in agent_ids or list(self.registry.registry['agents']):
+            current = str(self.registry.registry['agents'][agent_id]['current_version'])
+            pending, head = [], None
+            for prompt in self.registry.list_versions(agent_id):
+                digest = content_hash(prompt)
+                key = f"{prompt.id}:{prompt.version}"
+                if prompt.version == current:
+                    head = (prompt, digest)
+                elif manifest.get(key) == digest:
+                    unchanged.append(key)
+                else:
+                    pending.append((prompt, digest))
+            if head is not None:
+                prompt, digest = head
+                if pending or manifest.get(f"{prompt.id}:{prompt.version}") != digest:
+                    pending.append(head)
+                else:
+                    unchanged.append(f"{prompt.id}:{prompt.version}")
+            if pending:
+                changes[agent_id] = pending
+        return changes, unchanged
+
+    def _push_with_retries(self, prompt: PromptInfo, report: SyncReport) -> None:
+        for attempt in range(self.retries + 1):
+            with self._lock:
+                report.calls += 1
+            try:
+                self.push(prompt)
+                return
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def _sync_agent(self, changes: List[tuple], manifest: Dict[str, str], report: SyncReport) -> None:
+        for prompt, digest in changes:
+            key = f"{prompt.id}:{prompt.version}"
+            try:
+                self._push_with_retries(prompt, report)
+            except Exception as e:
+                # Keep going: the current version, pushed last, must still become the head
+                with self._lock:
+                    report.failed[key] = str(e)
+                continue
+            with self._lock:
+                manifest[key] = digest
+                report.pushed.append(key)
+
+    def run(self, agent_ids: Optional[List[str]] = None, force: bool = False) -> SyncReport:
+        start = time.perf_counter()
+        manifest = self.load_manifest()
+        changes, unchanged = self.plan({} if force else manifest, agent_ids)
+        report = SyncReport(unchanged=unchanged)
+
+        if changes:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [
+                    executor.submit(self._sync_agent, agent_changes, manifest, report)
+                    for agent_changes in changes.values()
+                ]
+                for future in futures:
+                    future.result()
+            self.save_manifest(manifest)
+
+        report.elapsed = time.perf_counter() - start
+        return report
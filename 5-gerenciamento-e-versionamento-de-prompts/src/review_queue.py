@@ -0,0 +1,282 @@
+"""
+Concurrent review queue for code-review and PR-creator jobs.
+
+Jobs are JSON objects, one per line:
+
+    {"id": "repo-a#42", "type": "code_review", "request": {"code_diff": "...", "language": "python"}}
+    {"id": "repo-b#7", "type": "pull_request", "request": {"changes_summary": "...", "files_changed": "..."}}
+
+Agents with a canary rollout are routed per job on `routing_key` (default:
+the job id), so retries of a job hit the same prompt version. Render and
+completion latency / tokens are recorded per agent and version and can be
+exported with --metrics-export.
+
+They are read from stdin (JSONL), a directory (*.json / *.jsonl files) or a
+local socket, and processed by a bounded pool of asyncio workers sharing one
+compiled template per agent and one chat model (HTTP client) per model.
+Results are appended to an output JSONL file as soon as each job completes;
+throughput and queue-depth metrics are logged periodically. A line or file that
+is not a JSON job is recorded as a failed result (id `<source>:<line>`) and
+the run goes on.
+
+Usage:
+    cat jobs.jsonl | python src/review_queue.py --stdin --output results.jsonl
+    python src/review_queue.py --directory jobs/ --watch --concurrency 16
+    python src/review_queue.py --socket /tmp/review-queue.sock
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+try:
+    from agent_code_reviewer import CodeReviewRequest
+    from agent_pull_request import PullRequestRequest
+    from chat_models import acomplete, get_chat_model
+    from prompt_registry import PromptRegistry, registry
+except ImportError:
+    from .agent_code_reviewer import CodeReviewRequest
+    from .agent_pull_request import PullRequestRequest
+    from .chat_models import acomplete, get_chat_model
+    from .prompt_registry import PromptRegistry, registry
+
+JOB_TYPES = {
+    "code_review": (CodeReviewRequest, "agent-code-reviewer"),
+    "pull_request": (PullRequestRequest, "agent-pull-request-creator"),
+}
+
+
+class ReviewQueue:
+    def __init__(
+        self,
+        output_path: Path,
+        prompt_registry: PromptRegistry = registry,
+        concurrency: int = 8,
+        max_queue: int = 1000,
+        model: Optional[str] = None,
+        base_url: Optional[str] = None,
+        chat_layout: bool = False,
+    ):
+        self.output_path = Path(output_path)
+        self.registry = prompt_registry
+        self.concurrency = concurrency
+        self.model = model
+        self.base_url = base_url
+        self.chat_layout = chat_layout
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "in_flight": 0}
+        self.latency_total = 0.0
+        self.started_at = time.perf_counter()
+        self._output = None
+
+    async def submit(self, job: Dict[str, Any]) -> None:
+        """Enqueue a job, waiting while the queue is full."""
+        await self.queue.put(job)
+        self.counters["submitted"] += 1
+
+    def reject(self, source: str, error: Exception) -> None:
+        """Record input that could not be parsed into a job as a failed result."""
+        self.counters["submitted"] += 1
+        self.counters["failed"] += 1
+        self._write({"id": source, "type": None, "error": f"{type(error).__name__}: {error}", "latency_s": 0.0})
+
+    def _write(self, result: Dict[str, Any]) -> None:
+        self._output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self._output.flush()
+
+    def metrics(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started_at
+        done = self.counters["completed"] + self.counters["failed"]
+        return {
+            **self.counters,
+            "queue_depth": self.queue.qsize(),
+            "throughput_per_s": round(done / elapsed, 3) if elapsed else 0.0,
+            "avg_latency_s": round(self.latency_total / done, 3) if done else 0.0,
+            "elapsed_s": round(elapsed, 3),
+        }
+
+    async def _process(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        result = {"id": job.get("id"), "type": job.get("type")}
+        start = time.perf_counter()
+        try:
+            request_cls, agent_id = JOB_TYPES[job["type"]]
+            request = request_cls(**job["request"])
+            routing_key = job.get("routing_key") or job.get("id") or uuid.uuid4().hex
+            prompt = self.registry.get_prompt(agent_id, routing_key)
+            model = self.model or prompt.model
+            with self.registry.metrics.track(agent_id, prompt.version, "render"):
+                if self.chat_layout:
+                    messages = self.registry.chat_layout_for(prompt).render(asdict(request))
+                else:
+                    messages = self.registry.template_for(prompt).render(asdict(request))
+
+            completion = await acomplete(
+                get_chat_model(model, self.base_url), messages,
+                agent=agent_id, version=prompt.version, metrics_store=self.registry.metrics,
+            )
+            result.update(
+                agent=agent_id, version=prompt.version, model=model, output=completion.text,
+                input_tokens=completion.input_tokens, cached_tokens=completion.cached_tokens,
+                output_tokens=completion.output_tokens,
+            )
+            self.counters["completed"] += 1
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+            self.counters["failed"] += 1
+
+        result["latency_s"] = round(time.perf_counter() - start, 3)
+        self.latency_total += result["latency_s"]
+        return result
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self.queue.get()
+            self.counters["in_flight"] += 1
+            try:
+                self._write(await self._process(job))
+            finally:
+                self.counters["in_flight"] -= 1
+                self.queue.task_done()
+
+    async def _report(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            print(json.dumps(self.metrics()), file=sys.stderr)
+
+    async def run(self, *sources, metrics_interval: float = 10.0) -> Dict[str, Any]:
+        """Process jobs from the given source coroutines until they are exhausted."""
+        self.started_at = time.perf_counter()
+        with open(self.output_path, 'a', encoding='utf-8') as self._output:
+            workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+            reporter = asyncio.create_task(self._report(metrics_interval))
+            try:
+                await asyncio.gather(*sources)
+                await self.queue.join()
+            finally:
+                for task in workers + [reporter]:
+                    task.cancel()
+                await asyncio.gather(*workers, reporter, return_exceptions=True)
+        return self.metrics()
+
+
+def _parse_job(line: str) -> Optional[Dict[str, Any]]:
+    """Parse one JSON job; raises ValueError for invalid JSON or a non-object."""
+    line = line.strip()
+    if not line:
+        return None
+    job = json.loads(line)
+    if not isinstance(job, dict):
+        raise ValueError(f"Expected a JSON object, got {type(job).__name__}")
+    return job
+
+
+async def _submit_line(queue: ReviewQueue, line: str, source: str) -> None:
+    try:
+        job = _parse_job(line)
+    except ValueError as e:
+        queue.reject(source, e)
+        return
+    if job:
+        await queue.submit(job)
+
+
+async def read_stdin(queue: ReviewQueue) -> None:
+    loop = asyncio.get_running_loop()
+    line_number = 0
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            return
+        line_number += 1
+        await _submit_line(queue, line, f"stdin:{line_number}")
+
+
+async def read_directory(queue: ReviewQueue, directory: Path, watch: bool = False, poll: float = 1.0) -> None:
+    """Submit jobs from *.json / *.jsonl files, renaming each file to *.queued once its jobs are queued."""
+    while True:
+        for path in sorted(directory.glob("*.json")) + sorted(directory.glob("*.jsonl")):
+            try:
+                text = path.read_text(encoding='utf-8')
+            except UnicodeDecodeError as e:
+                queue.reject(path.name, e)
+                text = ""
+            if path.suffix == ".json":
+                await _submit_line(queue, text, path.name)
+            else:
+                for line_number, line in enumerate(text.splitlines(), 1):
+                    await _submit_line(queue, line, f"{path.name}:{line_number}")
+            path.rename(path.with_name(path.name + ".queued"))
+        if not watch:
+            return
+        await asyncio.sleep(poll)
+
+
+async def serve_socket(queue: ReviewQueue, socket_path: str) -> None:
+    """Accept JSONL jobs on a Unix socket; each accepted job is acknowledged with its id."""
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        line_number = 0
+        while line := await reader.readline():
+            line_number += 1
+            try:
+                job = _parse_job(line.decode('utf-8'))
+            except ValueError as e:
+                queue.reject(f"socket:{line_number}", e)
+                writer.write(f"error {e}\n".encode('utf-8'))
+                continue
+            if job:
+                await queue.submit(job)
+                writer.write(f"queued {job.get('id')}\n".encode('utf-8'))
+            await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_unix_server(handle, path=socket_path)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Process code review / PR jobs concurrently")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--stdin", action="store_true", help="Read JSONL jobs from stdin")
+    source.add_argument("--directory", type=Path, help="Read jobs from *.json / *.jsonl files")
+    source.add_argument("--socket", help="Accept JSONL jobs on this Unix socket")
+    parser.add_argument("--watch", action="store_true", help="Keep polling the directory for new files")
+    parser.add_argument("--output", type=Path, default=Path("results.jsonl"))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--model", default=None, help="Override the registry model")
+    parser.add_argument("--base-url", default=None, help="OpenAI-compatible endpoint")
+    parser.add_argument("--chat-layout", action="store_true", help="Send static sections as a cacheable system message")
+    parser.add_argument("--metrics-interval", type=float, default=10.0)
+    parser.add_argument("--metrics-export", type=Path, default=None, help="Write per-version metrics JSON on exit")
+    args = parser.parse_args()
+
+    async def main():
+        queue = ReviewQueue(
+            args.output, concurrency=args.concurrency, model=args.model,
+            base_url=args.base_url, chat_layout=args.chat_layout,
+        )
+        if args.stdin:
+            job_source = read_stdin(queue)
+        elif args.directory:
+            job_source = read_directory(queue, args.directory, watch=args.watch)
+        else:
+            job_source = serve_socket(queue, args.socket)
+        return await queue.run(job_source, metrics_interval=args.metrics_interval)
+
+    try:
+        print(json.dumps(asyncio.run(main())))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.metrics_export:
+            registry.metrics.export(args.metrics_export)
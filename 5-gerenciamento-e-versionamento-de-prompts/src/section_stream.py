@@ -0,0 +1,131 @@
+"""
+Incremental section parsing for streamed agent output.
+
+The agent templates ask for clearly delimited sections ("**RESUMO EXECUTIVO:**",
+"**TÍTULO DO PR:**", ...). While tokens stream in, the parser emits a
+`section_start` event when a header line arrives and a `section_end` event
+with the full section text as soon as the next header (or the end of the
+stream) closes it, so consumers can act on a section before generation ends.
+"""
+
+import re
+import time
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, NamedTuple, Optional
+
+CODE_REVIEW_SECTIONS = [
+    "RESUMO EXECUTIVO",
+    "ISSUES CRÍTICOS",
+    "MELHORIAS RECOMENDADAS",
+    "PONTOS POSITIVOS",
+    "PRÓXIMOS PASSOS",
+]
+
+PULL_REQUEST_SECTIONS = [
+    "TÍTULO DO PR",
+    "DESCRIÇÃO",
+    "Resumo",
+    "Motivação",
+    "Mudanças Realizadas",
+    "Arquivos Afetados",
+]
+
+
+class SectionEvent(NamedTuple):
+    kind: str  # "token", "section_start" or "section_end"
+    section: Optional[str]
+    text: str
+    elapsed: float
+
+
+class SectionStreamParser:
+    def __init__(self, section_names: List[str]):
+        names = "|".join(re.escape(name) for name in sorted(section_names, key=len, reverse=True))
+        # Matches "**NAME:**", "NAME:", "## NAME" and "### **NAME**" with optional inline content
+        self.header = re.compile(
+            rf"^\s*(?:#{{1,6}}\s*)?(?:\*\*)?\s*({names})\s*(?::\s*\*\*|\*\*\s*:?|:|(?=\s*$))\s*(.*)$",
+            re.IGNORECASE,
+        )
+        self.canonical = {name.lower(): name for name in section_names}
+        self.current: Optional[str] = None
+        self.lines: List[str] = []
+        self.buffer = ""
+        self.start = time.perf_counter()
+
+    def _event(self, kind: str, section: Optional[str], text: str) -> SectionEvent:
+        return SectionEvent(kind, section, text, time.perf_counter() - self.start)
+
+    def _close_section(self) -> List[SectionEvent]:
+        if self.current is None:
+            return []
+        event = self._event("section_end", self.current, "\n".join(self.lines).strip())
+        self.current, self.lines = None, []
+        return [event]
+
+    def _line(self, line: str) -> List[SectionEvent]:
+        match = self.header.match(line)
+        if match is None:
+            if self.current is not None:
+                self.lines.append(line)
+            return []
+
+        events = self._close_section()
+        self.current = self.canonical[match.group(1).lower()]
+        self.lines = [match.group(2)] if match.group(2) else []
+        events.append(self._event("section_start", self.current, ""))
+        return events
+
+    def feed(self, chunk: str) -> List[SectionEvent]:
+        """Consume a streamed chunk and return the section events it completes."""
+        self.buffer += chunk
+        *lines, self.buffer = self.buffer.split("\n")
+        events = []
+        for line in lines:
+            events.extend(self._line(line))
+        return events
+
+    def close(self) -> List[SectionEvent]:
+        """Flush the last partial line and close the open section."""
+        events = self._line(self.buffer) if self.buffer else []
+        self.buffer = ""
+        return events + self._close_section()
+
+
+def stream_sections(chunks: Iterable[str], section_names: List[str]) -> Iterator[SectionEvent]:
+    """Interleave token events with section events for a stream of text chunks."""
+    parser = SectionStreamParser(section_names)
+    for chunk in chunks:
+        yield parser._event("token", parser.current, chunk)
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+async def astream_sections(chunks: AsyncIterable[str], section_names: List[str]) -> AsyncIterator[SectionEvent]:
+    """Async variant of `stream_sections`."""
+    parser = SectionStreamParser(section_names)
+    async for chunk in chunks:
+        yield parser._event("token", parser.current, chunk)
+        for event in parser.feed(chunk):
+            yield event
+    for event in parser.close():
+        yield event
+
+
+def print_stream(events: Iterable[SectionEvent]) -> None:
+    """Print tokens as they arrive and report section timings at the end."""
+    first_token = first_section = None
+    timings = []
+    for event in events:
+        if event.kind == "token":
+            first_token = event.elapsed if first_token is None else first_token
+            print(event.text, end="", flush=True)
+        elif event.kind == "section_end":
+            first_section = event.elapsed if first_section is None else first_section
+            timings.append((event.section, event.elapsed))
+
+    print("\n\n=== Streaming timings ===")
+    if first_token is not None:
+        print(f"Time to first token:   {first_token:.2f}s")
+    if first_section is not None:
+        print(f"Time to first section: {first_section:.2f}s")
+    for section, elapsed in timings:
+        print(f"  {elapsed:6.2f}s  {section}")
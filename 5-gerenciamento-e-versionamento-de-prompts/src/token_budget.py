@@ -0,0 +1,149 @@
+"""
+Token-budget regression gate per prompt version.
+
+Renders every test case of every version on disk, counts tokens offline with
+tiktoken and fails when a version exceeds the `token_budget` declared in its
+prompt.tests.yaml, or grows more than `--max-growth` percent over the previous
+version on disk. The report attributes tokens to each markdown section of the
+prompt.
+
+tiktoken downloads its encoding files on first use; set TIKTOKEN_CACHE_DIR to
+a pre-populated directory to run fully offline. When the encoding cannot be
+loaded, counts fall back to an estimate of one token per 4 characters (with a
+warning), so budgets are approximate until the encoding is cached.
+
+Usage:
+    python src/token_budget.py
+    python src/token_budget.py --max-growth 15
+"""
+
+import argparse
+import sys
+import warnings
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+import tiktoken
+import yaml
+
+try:
+    from prompt_registry import CompiledTemplate, PromptRegistry, registry, split_sections
+except ImportError:
+    from .prompt_registry import CompiledTemplate, PromptRegistry, registry, split_sections
+
+DEFAULT_ENCODING = "o200k_base"
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def _encoding(name: str):
+    try:
+        return tiktoken.get_encoding(name)
+    except OSError as e:
+        # Download failed (offline, proxy...); requests errors are OSErrors too
+        warnings.warn(f"tiktoken encoding '{name}' unavailable ({e}); estimating {CHARS_PER_TOKEN} characters per token")
+        return None
+
+
+def count_tokens(text: str, encoding: str = DEFAULT_ENCODING) -> int:
+    loaded = _encoding(encoding)
+    if loaded is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(loaded.encode(text))
+
+
+@dataclass
+class VersionTokens:
+    agent: str
+    version: str
+    budget: Optional[int]
+    max_tokens: int = 0
+    cases: Dict[str, int] = field(default_factory=dict)
+    sections: Dict[str, int] = field(default_factory=dict)
+    failures: List[str] = field(default_factory=list)
+
+
+class TokenBudgetChecker:
+    def __init__(
+        self,
+        prompt_registry: PromptRegistry = registry,
+        count: Callable[[str], int] = count_tokens,
+        max_growth: float = 20.0,
+    ):
+        self.registry = prompt_registry
+        self.count = count
+        self.max_growth = max_growth
+
+    def measure(self, agent_id: str) -> List[VersionTokens]:
+        results = []
+        for prompt in self.registry.list_versions(agent_id):
+            test_path = prompt.path.parent / "prompt.tests.yaml"
+            test_data = {}
+            if test_path.exists():
+                with open(test_path, 'r', encoding='utf-8') as f:
+                    test_data = yaml.safe_load(f) or {}
+
+            template = CompiledTemplate.from_file(prompt.path)
+            result = VersionTokens(agent_id, prompt.version, test_data.get('token_budget'))
+
+            cases = test_data.get('cases') or [{'name': '(vazio)', 'inputs': {}}]
+            for case in cases:
+                inputs = {var: case['inputs'].get(var, '') for var in template.input_variables}
+                rendered = template.render(inputs)
+                tokens = self.count(rendered)
+                result.cases[case['name']] = tokens
+
+                # Attribute the largest case to sections
+                if tokens > result.max_tokens:
+                    result.max_tokens = tokens
+                    result.sections = {title: self.count(text) for title, text in split_sections(rendered)}
+
+            results.append(result)
+        return results
+
+    def check(self, agent_ids: Optional[List[str]] = None) -> List[VersionTokens]:
+        results = []
+        for agent_id in agent_ids or list(self.registry.registry['agents']):
+            previous = None
+            for result in self.measure(agent_id):
+                if result.budget is not None and (isinstance(result.budget, bool) or not isinstance(result.budget, int)):
+                    result.failures.append(f"token_budget must be an integer, got {result.budget!r}")
+                elif result.budget is not None and result.max_tokens > result.budget:
+                    result.failures.append(f"{result.max_tokens} tokens exceeds budget of {result.budget}")
+                if previous is not None and previous.max_tokens:
+                    growth = (result.max_tokens - previous.max_tokens) / previous.max_tokens * 100
+                    if growth > self.max_growth:
+                        result.failures.append(
+                            f"grew {growth:.1f}% over v{previous.version} "
+                            f"({previous.max_tokens} -> {result.max_tokens}, limit {self.max_growth:.0f}%)"
+                        )
+                results.append(result)
+                previous = result
+        return results
+
+
+def print_report(results: List[VersionTokens]) -> None:
+    for result in results:
+        status = "FAIL" if result.failures else "OK"
+        budget = result.budget if result.budget is not None else "-"
+        print(f"\n[{status}] {result.agent}@{result.version}: {result.max_tokens} tokens (budget: {budget})")
+        for title, tokens in sorted(result.sections.items(), key=lambda item: -item[1]):
+            share = tokens / result.max_tokens * 100 if result.max_tokens else 0
+            print(f"    {tokens:>6}  {share:5.1f}%  {title}")
+        for failure in result.failures:
+            print(f"    ! {failure}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check prompt token budgets")
+    parser.add_argument("--agent", action="append", help="Restrict to this agent (repeatable)")
+    parser.add_argument("--max-growth", type=float, default=20.0, help="Allowed growth over the previous version (%%)")
+    parser.add_argument("--encoding", default=DEFAULT_ENCODING)
+    args = parser.parse_args()
+
+    checker = TokenBudgetChecker(count=lambda text: count_tokens(text, args.encoding), max_growth=args.max_growth)
+    results = checker.check(args.agent)
+    print_report(results)
+
+    sys.exit(1 if any(result.failures for result in results) else 0)
@@ -0,0 +1,72 @@
+"""
+Incremental runs for the prompt test suite.
+
+Test items tagged with `@pytest.mark.prompt_hash(<hash>)` are skipped under
+`--incremental` when that same item passed in a previous run with the same
+hash. Green (test id, hash) pairs are stored in pytest's cache
+(`.pytest_cache`) and are recorded from test reports, so it also works on the
+pytest-xdist controller. Only items that ran are updated: a filtered run
+(`-k`, a single file) marks just its own items green and never the tests it
+did not run. Without the cache plugin (`-p no:cacheprovider`) nothing is
+skipped or stored.
+"""
+
+import pytest
+
+GREEN_CACHE_KEY = "prompts/green_items"
+
+
+class IncrementalPrompts:
+    def __init__(self, config):
+        self.config = config
+        self.outcomes = {}
+
+    def pytest_collection_modifyitems(self, items):
+        incremental = self.config.getoption("incremental") and hasattr(self.config, "cache")
+        green = self.config.cache.get(GREEN_CACHE_KEY, {}) if incremental else {}
+        skip_unchanged = pytest.mark.skip(reason="prompt unchanged since last green run")
+
+        for item in items:
+            marker = item.get_closest_marker("prompt_hash")
+            if marker is None:
+                continue
+            content_hash = marker.args[0]
+            item.user_properties.append(("prompt_hash", content_hash))
+            if green.get(item.nodeid) == content_hash:
+                item.add_marker(skip_unchanged)
+
+    def pytest_runtest_logreport(self, report):
+        content_hash = dict(report.user_properties).get("prompt_hash")
+        if content_hash is None:
+            return
+        # Green only when the test body passed and no phase failed; skipped items keep their old status
+        if report.failed:
+            self.outcomes[report.nodeid] = None
+        elif report.when == "call" and report.passed:
+            self.outcomes.setdefault(report.nodeid, content_hash)
+
+    def pytest_sessionfinish(self, session):
+        # Workers forward their reports to the controller, which owns the cache
+        if hasattr(self.config, "workerinput") or not hasattr(self.config, "cache") or not self.outcomes:
+            return
+        green = self.config.cache.get(GREEN_CACHE_KEY, {})
+        for nodeid, content_hash in self.outcomes.items():
+            if content_hash is None:
+                green.pop(nodeid, None)
+            else:
+                green[nodeid] = content_hash
+        self.config.cache.set(GREEN_CACHE_KEY, green)
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--incremental",
+        action="store_true",
+        default=False,
+        help="Skip prompts whose content is unchanged since the last green run",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "prompt_hash(hash): content hash of the prompt under test")
+    config.pluginmanager.register(IncrementalPrompts(config), "incremental-prompts")
@@ -0,0 +1,120 @@
+"""
+Local OpenAI-compatible chat completions stub for tests and CI.
+
+By default it echoes the last user message back, so checks written against
+the rendered prompt pass deterministically. Streaming requests are answered
+with server-sent events in small chunks. Token usage is approximated by
+whitespace-separated words.
+
+Usage:
+    python tests/openai_stub.py --port 8000
+    python src/prompt_live_tests.py --base-url http://127.0.0.1:8000/v1
+"""
+
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Optional
+
+
+def echo_reply(messages: List[dict]) -> str:
+    return messages[-1]["content"] if messages else ""
+
+
+class OpenAIStub:
+    def __init__(self, reply: Callable[[List[dict]], str] = echo_reply, port: int = 0):
+        self.reply = reply
+        self.requests = []
+        self.stream_chunk_size = 8
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                stub.requests.append(body)
+                messages = body.get("messages", [])
+                content = stub.reply(messages)
+                prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+                completion_tokens = len(content.split())
+
+                if body.get("stream"):
+                    self._stream(body, content)
+                    return
+
+                payload = json.dumps({
+                    "id": f"chatcmpl-stub-{len(stub.requests)}",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": body.get("model", "stub"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                }).encode('utf-8')
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, body, content):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for i in range(0, len(content), stub.stream_chunk_size):
+                    chunk = {
+                        "id": f"chatcmpl-stub-{len(stub.requests)}",
+                        "object": "chat.completion.chunk",
+                        "created": 0,
+                        "model": body.get("model", "stub"),
+                        "choices": [{
+                            "index": 0,
+                            "delta": {"content": content[i:i + stub.stream_chunk_size]},
+                            "finish_reason": None,
+                        }],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def start(self) -> "OpenAIStub":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    stub = OpenAIStub(port=args.port)
+    print(f"OpenAI stub listening on {stub.base_url}")
+    stub.server.serve_forever()
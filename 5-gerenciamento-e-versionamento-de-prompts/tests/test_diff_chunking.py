@@ -0,0 +1,118 @@
+"""
+Tests for unified diff parsing and window packing.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from diff_chunking import _split_hunk, pack_windows, parse_unified_diff
+
+DIFF = """diff --git a/src/cache.py b/src/cache.py
+index 1111111..2222222 100644
+--- a/src/cache.py
++++ b/src/cache.py
+@@ -1,3 +1,4 @@
+ import time
++import threading
+ 
+ class Cache:
+@@ -20,2 +21,3 @@ class Cache:
+     def get(self, key):
++        self._lock.acquire()
+         return self._data[key]
+diff --git a/tests/test_cache.py b/tests/test_cache.py
+--- a/tests/test_cache.py
++++ b/tests/test_cache.py
+@@ -0,0 +1,2 @@
++def test_get():
++    assert Cache().get("a") is None
+"""
+
+
+def count_lines(text: str) -> int:
+    return len(text.splitlines())
+
+
+def test_parse_unified_diff_splits_files_and_hunks():
+    files = parse_unified_diff(DIFF)
+
+    assert [f.path for f in files] == ["src/cache.py", "tests/test_cache.py"]
+    assert [len(f.hunks) for f in files] == [2, 1]
+    assert files[0].header.endswith("+++ b/src/cache.py\n")
+    assert files[0].hunks[1].startswith("@@ -20,2")
+
+
+def test_parse_bare_snippet():
+    files = parse_unified_diff("+ def calculate_total(items):\n+     return 0\n")
+
+    assert len(files) == 1
+    assert files[0].path == "(snippet)"
+    assert files[0].header == ""
+
+
+def test_windows_fit_budget_and_repeat_file_headers():
+    windows = pack_windows(parse_unified_diff(DIFF), max_tokens=9, count_tokens=count_lines)
+
+    assert all(count_lines(w.text) <= 9 for w in windows)
+    assert all(w.tokens == count_lines(w.text) for w in windows)
+    assert [w.files for w in windows] == [["src/cache.py"], ["src/cache.py"], ["tests/test_cache.py"]]
+    assert all(w.text.startswith("diff --git") for w in windows)
+    # Every diff line lands in exactly one window
+    body = [line for w in windows for line in w.text.splitlines() if line[:1] in "+- " and not line.startswith(("---", "+++"))]
+    assert len(body) == 9
+
+
+def test_large_budget_keeps_everything_in_one_window():
+    [window] = pack_windows(parse_unified_diff(DIFF), max_tokens=1000, count_tokens=count_lines)
+
+    assert window.text == DIFF
+    assert window.files == ["src/cache.py", "tests/test_cache.py"]
+
+
+def test_removed_line_starting_with_dashes_is_not_a_file_header():
+    diff = (
+        "--- a/schema.sql\n+++ b/schema.sql\n@@ -1,3 +1,3 @@\n"
+        "--- legacy users table\n CREATE TABLE users (id int);\n+-- users table\n"
+        "--- a/seed.sql\n+++ b/seed.sql\n@@ -1 +1 @@\n-x\n+y\n"
+    )
+
+    files = parse_unified_diff(diff)
+
+    assert [f.path for f in files] == ["schema.sql", "seed.sql"]
+    assert "--- legacy users table\n" in files[0].hunks[0]
+
+
+def test_split_hunk_pieces_get_their_own_headers():
+    hunk = "@@ -10,4 +10,5 @@ def f():\n a\n-b\n+c\n+d\n e\n f\n"
+
+    pieces = [piece for piece, _ in _split_hunk(hunk, max_tokens=3, count_tokens=count_lines)]
+
+    assert [piece.splitlines()[0] for piece in pieces] == [
+        "@@ -10,2 +10,1 @@ def f():",
+        "@@ -12,0 +11,2 @@ def f():",
+        "@@ -12,2 +13,2 @@ def f():",
+    ]
+    assert "".join(line for piece in pieces for line in piece.splitlines(keepends=True)[1:]) == hunk.split("\n", 1)[1]
+
+
+def test_split_hunk_counts_each_line_once():
+    hunk = "@@ -1,2000 +1,2000 @@\n" + "".join(f" line {i}\n" for i in range(2000))
+    calls = []
+
+    def counting(text: str) -> int:
+        calls.append(text)
+        return count_lines(text)
+
+    pieces = _split_hunk(hunk, max_tokens=100, count_tokens=counting)
+
+    assert all(tokens == count_lines(piece) <= 100 for piece, tokens in pieces)
+    # The whole hunk, every line and every piece once, plus the header per piece: linear, not quadratic
+    assert len(calls) <= 1 + 2000 + 2 * len(pieces) + 1
+
+
+def test_split_hunk_returns_a_hunk_that_fits_unchanged():
+    hunk = "@@ -1,2 +1,2 @@ def f():\n-a\n+b\n"
+
+    assert _split_hunk(hunk, max_tokens=3, count_tokens=count_lines) == [(hunk, 3)]
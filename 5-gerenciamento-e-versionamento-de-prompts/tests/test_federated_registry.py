@@ -0,0 +1,102 @@
+"""
+Tests for the federated registry: root mounting, conflict rules and lazy loading.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from federated_registry import FederatedRegistry
+
+
+def write_root(root: Path, team: str, agents) -> Path:
+    entries = {}
+    for agent_id in agents:
+        version_dir = root / agent_id / "v1.0.0"
+        version_dir.mkdir(parents=True)
+        (version_dir / "prompt.yaml").write_text(yaml.safe_dump({
+            "_type": "prompt",
+            "input_variables": ["text"],
+            "template": f"{team} {agent_id}: {{text}}",
+        }), encoding='utf-8')
+        entries[agent_id] = {
+            "description": f"{team} {agent_id}",
+            "current_version": "1.0.0",
+            "path": f"{agent_id}/v1.0.0/prompt.yaml",
+        }
+    (root / "registry.yaml").write_text(yaml.safe_dump({"agents": entries}), encoding='utf-8')
+    return root
+
+
+@pytest.fixture
+def roots(tmp_path: Path) -> dict:
+    return {
+        "team-a": write_root(tmp_path / "a", "A", ["reviewer", "shared"]),
+        "team-b": write_root(tmp_path / "b", "B", ["pr-creator", "shared"]),
+    }
+
+
+def test_error_rule_rejects_duplicate_ids(roots: dict):
+    registry = FederatedRegistry(roots, conflict="error")
+
+    with pytest.raises(ValueError, match="more than one root.*shared"):
+        registry.get_prompt("reviewer")
+
+
+@pytest.mark.parametrize("conflict, owner", [("first", "A"), ("last", "B")])
+def test_first_and_last_rules_pick_owner(roots: dict, conflict: str, owner: str):
+    registry = FederatedRegistry(roots, conflict=conflict)
+
+    assert registry.render("shared", {"text": "x"}) == f"{owner} shared: x"
+    assert sorted(registry.agents()) == ["pr-creator", "reviewer", "shared"]
+
+
+def test_namespace_rule_requires_qualified_ids(roots: dict):
+    registry = FederatedRegistry(roots, conflict="namespace")
+
+    assert registry.get_template("team-b/shared").render({"text": "x"}) == "B shared: x"
+    assert registry.get_prompt("team-a/reviewer").id == "team-a/reviewer"
+    assert "team-b/pr-creator" in registry.agents()
+    with pytest.raises(ValueError, match="must be qualified"):
+        registry.get_prompt("reviewer")
+
+
+def test_roots_and_templates_load_lazily(roots: dict):
+    registry = FederatedRegistry(roots, conflict="first")
+    assert registry.stats()["roots_mounted"] == 0
+
+    registry.get_prompt("reviewer")
+    assert registry.stats() == {"roots": 2, "roots_mounted": 1, "agents_resolved": 1, "templates_loaded": 0}
+
+    registry.get_template("pr-creator")
+    registry.get_template("pr-creator")
+    assert registry.stats()["roots_mounted"] == 2
+    assert registry.stats()["templates_loaded"] == 1
+
+
+def test_unknown_prompt_and_root(roots: dict):
+    registry = FederatedRegistry(roots, conflict="first")
+
+    with pytest.raises(ValueError, match="not found in roots"):
+        registry.get_prompt("missing")
+    with pytest.raises(ValueError, match="Root 'team-c' not found"):
+        registry.get_prompt("team-c/reviewer")
+    with pytest.raises(ValueError, match="Unknown conflict rule"):
+        FederatedRegistry(roots, conflict="merge")
+
+
+def test_packaged_root(tmp_path: Path, monkeypatch):
+    package = tmp_path / "site" / "team_prompts"
+    package.mkdir(parents=True)
+    (package / "__init__.py").write_text("", encoding='utf-8')
+    write_root(package / "prompts", "P", ["reviewer"])
+    monkeypatch.syspath_prepend(str(tmp_path / "site"))
+
+    registry = FederatedRegistry({"packaged": "pkg:team_prompts/prompts"})
+
+    assert registry.render("reviewer", {"text": "ok"}) == "P reviewer: ok"
+    registry.close()
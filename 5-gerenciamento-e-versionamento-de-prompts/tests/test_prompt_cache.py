@@ -0,0 +1,146 @@
+"""
+Tests for the pull-through hub prompt cache, with a fake hub and clock.
+"""
+
+import json
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from prompt_cache import PromptCache
+
+
+class FakeHub:
+    def __init__(self):
+        self.online = True
+        self.calls = 0
+        self.commit = "a1b2c3d4"
+
+    def fetch(self, identifier):
+        self.calls += 1
+        if not self.online:
+            raise ConnectionError("hub unreachable")
+        return {"id": ["PromptTemplate"], "kwargs": {"template": f"{identifier}@{self.commit}"}}, self.commit
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def hub() -> FakeHub:
+    return FakeHub()
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+def test_fresh_entries_are_served_from_cache(hub, clock, tmp_path):
+    cache = PromptCache(hub.fetch, tmp_path, ttl=60, clock=clock)
+
+    first = cache.get("agent:dev")
+    second = cache.get("agent:dev")
+
+    assert (first.source, second.source) == ("miss", "hit")
+    assert second.commit_hash == "a1b2c3d4"
+    assert hub.calls == 1
+    assert cache.metrics()["hit_rate"] == 0.5
+
+
+def test_disk_cache_survives_new_process(hub, clock, tmp_path):
+    PromptCache(hub.fetch, tmp_path, ttl=60, clock=clock).get("agent:dev")
+
+    entry = PromptCache(hub.fetch, tmp_path, ttl=60, clock=clock).get("agent:dev")
+
+    assert entry.source == "hit"
+    assert hub.calls == 1
+
+
+def test_stale_entry_is_served_and_revalidated_in_background(hub, clock, tmp_path):
+    cache = PromptCache(hub.fetch, tmp_path, ttl=60, clock=clock)
+    cache.get("agent:dev")
+    clock.now += 120
+    hub.commit = "e5f6a7b8"
+
+    stale = cache.get("agent:dev")
+    cache.wait(timeout=5)
+    fresh = cache.get("agent:dev")
+
+    assert (stale.source, stale.commit_hash) == ("stale", "a1b2c3d4")
+    assert (fresh.source, fresh.commit_hash) == ("hit", "e5f6a7b8")
+    assert cache.metrics()["revalidations"] == 1
+
+
+def test_offline_falls_back_to_last_good_copy(hub, clock, tmp_path):
+    cache = PromptCache(hub.fetch, tmp_path, ttl=60, background=False, clock=clock)
+    cache.get("agent:dev")
+    clock.now += 120
+    hub.online = False
+
+    entry = cache.get("agent:dev")
+
+    assert entry.source == "fallback"
+    assert entry.commit_hash == "a1b2c3d4"
+    assert cache.metrics()["errors"] == 1
+
+
+def test_offline_without_cached_copy_raises(hub, clock, tmp_path):
+    hub.online = False
+    cache = PromptCache(hub.fetch, tmp_path, clock=clock)
+
+    with pytest.raises(ConnectionError):
+        cache.get("agent:dev")
+
+
+@pytest.mark.parametrize("stored", [
+    {"identifier": "agent:dev", "manifest": {}, "commit_hash": "old"},
+    {"identifier": "agent:dev", "commit_hash": "old", "fetched_at": 1000.0},
+    {"identifier": "agent:dev", "manifest": {}, "commit_hash": "old", "fetched_at": "soon"},
+])
+def test_incomplete_disk_entry_is_a_miss(hub, clock, tmp_path, stored):
+    cache = PromptCache(hub.fetch, tmp_path, ttl=60, clock=clock)
+    cache._path("agent:dev").write_text(json.dumps(stored), encoding='utf-8')
+
+    entry = cache.get("agent:dev")
+
+    assert entry.source == "miss"
+    assert entry.commit_hash == "a1b2c3d4"
+    assert hub.calls == 1
+
+
+def test_concurrent_refreshes_write_through_their_own_tmp_files(hub, clock, tmp_path):
+    cache = PromptCache(hub.fetch, tmp_path, ttl=60, clock=clock)
+    barrier = threading.Barrier(8)
+
+    def fetch(identifier):
+        barrier.wait()  # every writer reaches the disk write together
+        return hub.fetch(identifier)
+
+    cache.fetch = fetch
+    errors = []
+
+    def refresh():
+        try:
+            cache._refresh("agent:dev")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=refresh) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert [path.name for path in tmp_path.iterdir()] == [cache._path("agent:dev").name]
+    assert PromptCache(hub.fetch, tmp_path, ttl=60, clock=clock).get("agent:dev").source == "hit"
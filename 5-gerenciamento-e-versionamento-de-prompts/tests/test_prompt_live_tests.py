@@ -0,0 +1,92 @@
+"""
+Tests for the live prompt test runner against the local OpenAI stub.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from openai_stub import OpenAIStub
+from prompt_live_tests import LiveTestRunner, ResponseCache, check_output
+from prompt_registry import PromptRegistry
+
+
+@pytest.fixture
+def stub():
+    stub = OpenAIStub().start()
+    yield stub
+    stub.stop()
+
+
+def make_runner(stub: OpenAIStub, tmp_path: Path) -> LiveTestRunner:
+    return LiveTestRunner(
+        PromptRegistry(),
+        base_url=stub.base_url,
+        api_key="stub",
+        concurrency=2,
+        cache=ResponseCache(tmp_path / "cache"),
+    )
+
+
+def test_check_output_supports_contains_regex_and_json():
+    checks = {"expect_contains": ["ok"], "expect_regex": [r"^\{"], "expect_json": ["status"]}
+
+    assert check_output('{"status": "ok"}', checks) == []
+    assert check_output("```json\n{\"status\": \"ok\"}\n```", {"expect_json": True}) == []
+    assert check_output('{"other": 1}', checks) == [
+        "missing text: 'ok'",
+        "JSON output is missing keys: ['status']",
+    ]
+
+
+def test_runner_executes_cases_and_reports_usage(stub: OpenAIStub, tmp_path: Path):
+    runner = make_runner(stub, tmp_path)
+    cases = runner.collect(["agent-pull-request-creator"])
+
+    results = asyncio.run(runner.run(cases))
+
+    assert len(results) == len(cases) == 4
+    assert all(r.passed for r in results), [r.failures for r in results]
+    assert all(r.output_tokens > 0 and r.latency_ms > 0 for r in results)
+    assert {request["model"] for request in stub.requests} == {"gpt-5-nano"}
+
+
+def test_runner_caches_responses(stub: OpenAIStub, tmp_path: Path):
+    runner = make_runner(stub, tmp_path)
+    cases = runner.collect(["agent-code-reviewer"])
+
+    asyncio.run(runner.run(cases))
+    results = asyncio.run(runner.run(cases))
+
+    assert len(stub.requests) == len(cases)
+    assert all(r.cached for r in results)
+
+
+def test_cached_responses_are_not_shared_across_endpoints(stub: OpenAIStub, tmp_path: Path):
+    other = OpenAIStub().start()
+    try:
+        cases = make_runner(stub, tmp_path).collect(["agent-code-reviewer"])
+        asyncio.run(make_runner(stub, tmp_path).run(cases))
+        results = asyncio.run(make_runner(other, tmp_path).run(cases))
+    finally:
+        other.stop()
+
+    assert not any(r.cached for r in results)
+    assert len(other.requests) == len(cases)
+
+
+def test_runner_reports_failed_checks(tmp_path: Path):
+    stub = OpenAIStub(reply=lambda messages: "Sem estrutura").start()
+    try:
+        runner = make_runner(stub, tmp_path)
+        results = asyncio.run(runner.run(runner.collect(["agent-code-reviewer"])))
+    finally:
+        stub.stop()
+
+    assert not results[0].passed
+    assert any("RESUMO EXECUTIVO" in failure for failure in results[0].failures)
@@ -0,0 +1,60 @@
+"""
+Tests for the per-version metrics store.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from prompt_metrics import MetricsStore, percentile
+
+
+def test_percentile_uses_nearest_rank():
+    samples = [float(i) for i in range(1, 101)]
+
+    assert percentile(samples, 50) == 50.0
+    assert percentile(samples, 95) == 95.0
+    assert percentile([], 95) == 0.0
+
+
+def test_summary_separates_versions_and_failures():
+    store = MetricsStore()
+    for i in range(20):
+        store.record("agent", "1.0.0", "completion", 0.1 + i / 1000, output_tokens=100)
+        store.record("agent", "1.1.0", "completion", 0.3, output_tokens=50, failed=i % 4 == 0)
+
+    old, new = store.summary(agent="agent")
+
+    assert (old["version"], old["count"], old["failures"], old["avg_output_tokens"]) == ("1.0.0", 20, 0, 100.0)
+    assert (new["version"], new["failures"], new["failure_rate"]) == ("1.1.0", 5, 0.25)
+    assert new["output_tokens"] == 15 * 50
+    assert new["p95_ms"] > old["p95_ms"]
+
+
+def test_track_records_failures_and_reraises():
+    store = MetricsStore()
+
+    with store.track("agent", "1.0.0", "completion") as observation:
+        observation.output_tokens = 7
+    with pytest.raises(RuntimeError):
+        with store.track("agent", "1.0.0", "completion"):
+            raise RuntimeError("boom")
+
+    (row,) = store.summary()
+    assert (row["count"], row["failures"], row["output_tokens"]) == (2, 1, 7)
+
+
+def test_samples_are_bounded_and_exportable(tmp_path: Path):
+    store = MetricsStore(max_samples=10)
+    for i in range(100):
+        store.record("agent", "1.0.0", "render", float(i))
+
+    exported = json.loads(store.export(tmp_path / "metrics.json").read_text(encoding='utf-8'))
+
+    (row,) = exported["series"]
+    assert row["count"] == 100
+    assert row["p50_ms"] == 94_000.0
@@ -0,0 +1,183 @@
+"""
+Tests for the local prompt registry.
+Covers template compilation, batch rendering and canary routing without using LLM.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import agent_pull_request
+from openai_stub import OpenAIStub
+from prompt_metrics import MetricsStore
+from prompt_registry import CompiledTemplate, PromptRegistry, compile_chat_layout, route_version
+
+
+@pytest.fixture(scope="module")
+def registry() -> PromptRegistry:
+    return PromptRegistry()
+
+
+@pytest.fixture
+def canary_registry() -> PromptRegistry:
+    canary = PromptRegistry(metrics_store=MetricsStore())
+    canary.registry["agents"]["agent-pull-request-creator"]["rollout"] = {"1.0.0": 80, "1.0.1": 20}
+    return canary
+
+
+@pytest.fixture
+def pr_request() -> dict:
+    return {
+        "changes_summary": "Implementation of cache system to improve performance",
+        "files_changed": "src/cache.py, tests/test_cache.py, README.md",
+        "issue_number": "42",
+        "branch_name": "feature/add-cache-system",
+        "breaking_changes": "No",
+        "testing_done": "Unit tests added with 95% coverage",
+    }
+
+
+def test_compiled_template_matches_str_format():
+    template = "Hello {name}, {{literal}} braces and {name} again: {count}"
+    compiled = CompiledTemplate(template, ["name", "count"])
+
+    assert compiled.render({"name": "Ana", "count": 3}) == template.format(name="Ana", count=3)
+
+
+def test_compiled_template_rejects_undeclared_variables():
+    with pytest.raises(ValueError, match="undeclared"):
+        CompiledTemplate("{a} {b}", ["a"])
+
+
+def test_compiled_template_rejects_complex_fields():
+    with pytest.raises(ValueError, match="Unsupported"):
+        CompiledTemplate("{value:>10}", ["value"])
+
+
+def test_render_many_matches_template_format(registry: PromptRegistry, pr_request: dict):
+    prompt = registry.get_prompt("agent-pull-request-creator")
+    template = CompiledTemplate.from_file(prompt.path)
+    records = [dict(pr_request, issue_number=str(i)) for i in range(3)]
+
+    rendered = list(registry.render_many("agent-pull-request-creator", records))
+
+    assert len(rendered) == 3
+    assert "**Issue Relacionada:** 2" in rendered[2]
+    assert rendered[0] == template.render(records[0])
+
+
+def test_render_many_is_lazy(registry: PromptRegistry, pr_request: dict):
+    def records():
+        yield pr_request
+        raise AssertionError("Second record should not be requested")
+
+    rendered = registry.render_many("agent-pull-request-creator", records())
+
+    assert "feature/add-cache-system" in next(rendered)
+
+
+def test_render_many_validates_records(registry: PromptRegistry, pr_request: dict):
+    del pr_request["testing_done"]
+
+    with pytest.raises(ValueError, match="Record 0 is missing input variables: \\['testing_done'\\]"):
+        list(registry.render_many("agent-pull-request-creator", [pr_request]))
+
+
+def test_render_many_unknown_prompt_fails_immediately(registry: PromptRegistry):
+    with pytest.raises(ValueError, match="not found"):
+        registry.render_many("unknown-agent", [])
+
+
+def test_chat_layout_moves_static_sections_to_system(registry: PromptRegistry, pr_request: dict):
+    layout = registry.get_chat_layout("agent-pull-request-creator")
+    other_request = dict(pr_request, changes_summary="Something else", files_changed="other.py")
+
+    first = layout.render(pr_request)
+    second = layout.render(other_request)
+
+    assert first[0] == second[0]
+    assert first[0][0] == "system"
+    assert "## Formato da Resposta" in layout.system
+    assert "{" not in layout.system
+    assert layout.user.template.startswith("## Informações do Pull Request")
+    assert "### Arquivos Afetados" in layout.user.template
+    assert set(layout.user.input_variables) == set(pr_request)
+
+
+def test_chat_layout_unescapes_static_braces():
+    template = CompiledTemplate("Intro\n\n## Formato\nUse {{json}}\n\n## Dados\n{value}\n", ["value"])
+
+    layout = compile_chat_layout(template)
+
+    assert layout.system == "Intro\n\n## Formato\nUse {json}"
+    assert layout.user.render({"value": 1}) == "## Dados\n1\n"
+
+
+def test_rollout_is_sticky_per_routing_key(canary_registry: PromptRegistry):
+    versions = {
+        key: canary_registry.get_prompt("agent-pull-request-creator", routing_key=key).version
+        for key in map(str, range(2000))
+    }
+
+    assert all(
+        canary_registry.get_prompt("agent-pull-request-creator", routing_key=key).version == version
+        for key, version in list(versions.items())[:100]
+    )
+    assert 300 < list(versions.values()).count("1.0.1") < 500
+
+
+def test_rollout_resolves_the_routed_version_file(canary_registry: PromptRegistry):
+    canary_registry.registry["agents"]["agent-pull-request-creator"]["rollout"] = {"1.0.0": 1, "1.0.1": 0}
+
+    prompt = canary_registry.get_prompt("agent-pull-request-creator", routing_key="repo#1")
+
+    assert prompt.version == "1.0.0"
+    assert prompt.path.parent.name == "v1.0.0"
+    assert [info.version for info in canary_registry.list_versions("agent-pull-request-creator")] == ["1.0.0", "1.0.1"]
+
+
+def test_raising_canary_weight_only_moves_keys_onto_it():
+    keys = [f"user-{i}" for i in range(1000)]
+    before = {key for key in keys if route_version("agent", {"1.0.0": 90, "1.1.0": 10}, key) == "1.1.0"}
+    after = {key for key in keys if route_version("agent", {"1.0.0": 50, "1.1.0": 50}, key) == "1.1.0"}
+
+    assert before < after
+
+
+def test_rollout_rejects_invalid_weights():
+    with pytest.raises(ValueError, match="no positive weight"):
+        route_version("agent", {"1.0.0": 0})
+    with pytest.raises(ValueError, match="non-negative"):
+        route_version("agent", {"1.0.0": -1, "1.0.1": 2})
+
+
+def test_render_records_latency_per_version(canary_registry: PromptRegistry, pr_request: dict):
+    for key in map(str, range(50)):
+        canary_registry.render("agent-pull-request-creator", pr_request, routing_key=key)
+
+    rows = canary_registry.metrics.summary(agent="agent-pull-request-creator", operation="render")
+
+    assert {row["version"] for row in rows} == {"1.0.0", "1.0.1"}
+    assert sum(row["count"] for row in rows) == 50
+    assert all(row["failures"] == 0 and row["p95_ms"] >= row["p50_ms"] for row in rows)
+
+
+def test_agent_routes_on_a_stable_key_and_records_completions(canary_registry: PromptRegistry, pr_request: dict, monkeypatch):
+    stub = OpenAIStub().start()
+    monkeypatch.setenv("OPENAI_API_KEY", "stub")
+    monkeypatch.setenv("OPENAI_BASE_URL", stub.base_url)
+    monkeypatch.setattr(agent_pull_request, "registry", canary_registry)
+    try:
+        for _ in range(3):
+            agent_pull_request.create_pull_request(agent_pull_request.PullRequestRequest(**pr_request))
+    finally:
+        stub.stop()
+
+    [row] = canary_registry.metrics.summary(agent="agent-pull-request-creator", operation="completion")
+    expected = canary_registry.get_prompt("agent-pull-request-creator", pr_request["issue_number"]).version
+    assert row["version"] == expected
+    assert row["count"] == 3
@@ -0,0 +1,178 @@
+"""
+Tests for the local prompt server and its caching client.
+"""
+
+import json
+import os
+import shutil
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from prompt_metrics import MetricsStore
+from prompt_registry import PromptRegistry
+from prompt_server import PromptServerClient, PromptStore, create_server
+
+
+PR_INPUTS = {
+    "changes_summary": "Correção de bug na validação de email",
+    "files_changed": "utils/validators.py",
+    "issue_number": "7",
+    "branch_name": "fix/email-validation",
+    "breaking_changes": "Não",
+    "testing_done": "Testes unitários",
+}
+
+
+@pytest.fixture(scope="module")
+def registry() -> PromptRegistry:
+    return PromptRegistry()
+
+
+@pytest.fixture(scope="module", params=["tcp", "unix"])
+def server_address(request, registry: PromptRegistry, tmp_path_factory):
+    if request.param == "unix":
+        socket_path = str(tmp_path_factory.mktemp("server") / "prompts.sock")
+        server = create_server(registry, unix_socket=socket_path)
+        address = {"unix_socket": socket_path}
+    else:
+        server = create_server(registry, port=0)
+        address = {"port": server.server_address[1]}
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield address
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_revalidates_with_etag(server_address):
+    client = PromptServerClient(**server_address)
+
+    first = client.get_prompt("agent-pull-request-creator")
+    second = client.get_prompt("agent-pull-request-creator")
+
+    assert first == second
+    assert first["version"] == "1.0.1"
+    assert client.stats["downloads"] == 1
+    assert client.stats["not_modified"] == 1
+
+
+def test_client_max_age_skips_revalidation(server_address):
+    client = PromptServerClient(max_age=60, **server_address)
+
+    client.get_prompt("agent-code-reviewer")
+    client.get_prompt("agent-code-reviewer")
+
+    assert client.stats["requests"] == 1
+    assert client.stats["cache_hits"] == 1
+
+
+def test_local_and_remote_render_match_registry(server_address, registry: PromptRegistry):
+    client = PromptServerClient(**server_address)
+    expected = registry.get_template("agent-pull-request-creator").render(PR_INPUTS)
+
+    assert client.render("agent-pull-request-creator", PR_INPUTS) == expected
+    assert client.render_remote("agent-pull-request-creator", PR_INPUTS) == expected
+
+
+def test_unknown_prompt_raises(server_address):
+    client = PromptServerClient(**server_address)
+
+    with pytest.raises(ValueError, match="not found"):
+        client.get_prompt("unknown-agent")
+
+
+def test_remote_render_with_missing_inputs_fails(server_address):
+    client = PromptServerClient(**server_address)
+
+    with pytest.raises(RuntimeError, match="400"):
+        client.render_remote("agent-pull-request-creator", {"changes_summary": "x"})
+
+
+def test_store_rereads_registry_when_it_changes(tmp_path):
+    prompts_dir = tmp_path / "prompts"
+    shutil.copytree(Path(__file__).parent.parent / "prompts", prompts_dir)
+    store = PromptStore(PromptRegistry(prompts_dir=str(prompts_dir)))
+    first = store.get("agent-pull-request-creator")
+
+    registry_path = prompts_dir / "registry.yaml"
+    text = registry_path.read_text(encoding="utf-8")
+    registry_path.write_text(
+        text.replace('current_version: "1.0.1"', 'current_version: "1.0.0"')
+            .replace("agent-pull-request-creator/v1.0.1", "agent-pull-request-creator/v1.0.0"),
+        encoding="utf-8",
+    )
+    stat = registry_path.stat()
+    os.utime(registry_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    second = store.get("agent-pull-request-creator")
+    assert b'"version": "1.0.1"' in first.body
+    assert b'"version": "1.0.0"' in second.body
+    assert second.etag != first.etag
+
+
+def test_store_rebuilds_payload_when_only_the_registry_entry_changes(tmp_path):
+    prompts_dir = tmp_path / "prompts"
+    shutil.copytree(Path(__file__).parent.parent / "prompts", prompts_dir)
+    store = PromptStore(PromptRegistry(prompts_dir=str(prompts_dir)))
+    first = store.get("agent-pull-request-creator")
+
+    registry_path = prompts_dir / "registry.yaml"
+    text = registry_path.read_text(encoding="utf-8")
+    registry_path.write_text(text.replace("pull requests profissionais", "PRs"), encoding="utf-8")
+    stat = registry_path.stat()
+    os.utime(registry_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    second = store.get("agent-pull-request-creator")
+    assert json.loads(first.body)["description"].endswith("pull requests profissionais")
+    assert json.loads(second.body)["description"].endswith("PRs")
+    assert second.etag != first.etag
+
+
+@pytest.mark.parametrize("prompt_id", ["agent pull/request", "agent?key=x", "../registry", "agent#1"])
+def test_prompt_ids_are_quoted_in_the_path(server_address, prompt_id):
+    client = PromptServerClient(**server_address)
+
+    with pytest.raises(ValueError, match="not found"):
+        client.get_prompt(prompt_id)
+    with pytest.raises(ValueError, match="not found"):
+        client.render_remote(prompt_id, {})
+
+
+@pytest.fixture
+def canary_address():
+    canary = PromptRegistry(metrics_store=MetricsStore())
+    canary.registry["agents"]["agent-pull-request-creator"]["rollout"] = {"1.0.0": 50, "1.0.1": 50}
+    server = create_server(canary, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield {"port": server.server_address[1]}
+    server.shutdown()
+    server.server_close()
+
+
+def test_rollout_without_key_serves_current_version(canary_address):
+    client = PromptServerClient(**canary_address)
+
+    versions = {client.get_prompt("agent-pull-request-creator")["version"] for _ in range(20)}
+
+    assert versions == {"1.0.1"}
+    assert client.stats["downloads"] == 1
+    assert client.stats["not_modified"] == 19
+
+
+def test_rollout_with_key_is_sticky_and_revalidates(canary_address):
+    client = PromptServerClient(**canary_address)
+    keys = [f"acme/repo-{i}" for i in range(20)]
+
+    first = {key: client.get_prompt("agent-pull-request-creator", key)["version"] for key in keys}
+    second = {key: client.get_prompt("agent-pull-request-creator", key)["version"] for key in keys}
+
+    assert first == second
+    assert set(first.values()) == {"1.0.0", "1.0.1"}
+    assert client.stats["not_modified"] == 20
@@ -0,0 +1,155 @@
+"""
+Tests for the incremental prompt sync, using an in-process stand-in hub.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+import yaml
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from prompt_registry import PromptRegistry
+from prompt_sync import PromptSync
+
+
+class StandInHub:
+    """Records pushes like the hub would; can fail the first N calls per prompt."""
+
+    def __init__(self, latency: float = 0.0, failures_per_prompt: int = 0):
+        self.latency = latency
+        self.failures_per_prompt = failures_per_prompt
+        self.pushed = []
+        self.attempts = {}
+        self._lock = threading.Lock()
+
+    def push(self, prompt):
+        key = f"{prompt.id}:{prompt.version}"
+        with self._lock:
+            self.attempts[key] = self.attempts.get(key, 0) + 1
+            attempt = self.attempts[key]
+        time.sleep(self.latency)
+        if attempt <= self.failures_per_prompt:
+            raise ConnectionError("hub unavailable")
+        with self._lock:
+            self.pushed.append(key)
+        return f"https://hub.local/{key}"
+
+
+def write_registry(root: Path, agents: int, versions: int = 2) -> Path:
+    entries = {}
+    for a in range(agents):
+        agent_id = f"agent-{a}"
+        for v in range(versions):
+            version_dir = root / agent_id / f"v1.0.{v}"
+            version_dir.mkdir(parents=True)
+            (version_dir / "prompt.yaml").write_text(yaml.safe_dump({
+                "_type": "prompt",
+                "id": agent_id,
+                "version": f"1.0.{v}",
+                "input_variables": ["text"],
+                "template": f"Agent {a} v{v}: {{text}}",
+            }), encoding='utf-8')
+        entries[agent_id] = {
+            "description": f"Agent {a}",
+            "current_version": f"1.0.{versions - 1}",
+            "path": f"{agent_id}/v1.0.{versions - 1}/prompt.yaml",
+            "model": "gpt-5-nano",
+        }
+    (root / "registry.yaml").write_text(yaml.safe_dump({"agents": entries}), encoding='utf-8')
+    return root
+
+
+@pytest.fixture
+def registry(tmp_path: Path) -> PromptRegistry:
+    return PromptRegistry(prompts_dir=str(write_registry(tmp_path / "prompts", agents=10)))
+
+
+def test_sync_pushes_everything_then_nothing(tmp_path: Path):
+    registry = PromptRegistry(prompts_dir=str(write_registry(tmp_path / "prompts", agents=300)))
+    hub = StandInHub(latency=0.002)
+    sync = PromptSync(registry, hub.push, tmp_path / "manifest.json", max_workers=32)
+
+    first = sync.run()
+    second = sync.run()
+
+    assert len(first.pushed) == 600
+    assert first.elapsed < 5
+    assert second.calls == 0
+    assert len(second.unchanged) == 600
+
+
+def test_sync_pushes_only_changed_versions_in_order(registry: PromptRegistry, tmp_path: Path):
+    hub = StandInHub()
+    sync = PromptSync(registry, hub.push, tmp_path / "manifest.json")
+    sync.run()
+    hub.pushed.clear()
+
+    for version in ("1.0.0", "1.0.1"):
+        path = registry.prompts_dir / "agent-7" / f"v{version}" / "prompt.yaml"
+        path.write_text(path.read_text(encoding='utf-8') + "# edited\n", encoding='utf-8')
+
+    report = sync.run()
+
+    assert hub.pushed == ["agent-7:1.0.0", "agent-7:1.0.1"]
+    assert report.calls == 2
+
+
+def test_sync_retries_transient_failures(registry: PromptRegistry, tmp_path: Path):
+    hub = StandInHub(failures_per_prompt=2)
+    sync = PromptSync(registry, hub.push, tmp_path / "manifest.json", retries=3, backoff=0)
+
+    report = sync.run(agent_ids=["agent-1"])
+
+    assert report.pushed == ["agent-1:1.0.0", "agent-1:1.0.1"]
+    assert report.calls == 6
+
+
+def test_failed_push_is_retried_on_next_sync(registry: PromptRegistry, tmp_path: Path):
+    hub = StandInHub(failures_per_prompt=2)
+    sync = PromptSync(registry, hub.push, tmp_path / "manifest.json", retries=1, backoff=0)
+
+    failed = sync.run(agent_ids=["agent-1"])
+    hub.failures_per_prompt = 0
+    recovered = sync.run(agent_ids=["agent-1"])
+
+    assert list(failed.failed) == ["agent-1:1.0.0", "agent-1:1.0.1"]
+    assert failed.pushed == []
+    assert recovered.pushed == ["agent-1:1.0.0", "agent-1:1.0.1"]
+
+
+def test_current_version_is_pushed_last(registry: PromptRegistry, tmp_path: Path):
+    registry.registry["agents"]["agent-3"]["current_version"] = "1.0.0"
+    hub = StandInHub()
+    sync = PromptSync(registry, hub.push, tmp_path / "manifest.json")
+
+    sync.run(agent_ids=["agent-3"])
+    first = list(hub.pushed)
+    hub.pushed.clear()
+
+    path = registry.prompts_dir / "agent-3" / "v1.0.1" / "prompt.yaml"
+    path.write_text(path.read_text(encoding='utf-8') + "# edited\n", encoding='utf-8')
+    report = sync.run(agent_ids=["agent-3"])
+
+    assert first == ["agent-3:1.0.1", "agent-3:1.0.0"]
+    # Only the newer version changed, but the head must end on current_version
+    assert hub.pushed == ["agent-3:1.0.1", "agent-3:1.0.0"]
+    assert report.unchanged == []
+
+
+def test_current_version_is_pushed_after_a_failed_older_version(registry: PromptRegistry, tmp_path: Path):
+    hub = StandInHub()
+    failing = {"agent-2:1.0.0"}
+
+    def push(prompt):
+        if f"{prompt.id}:{prompt.version}" in failing:
+            raise ConnectionError("hub unavailable")
+        return hub.push(prompt)
+
+    report = PromptSync(registry, push, tmp_path / "manifest.json", retries=0).run(agent_ids=["agent-2"])
+
+    assert list(report.failed) == ["agent-2:1.0.0"]
+    assert hub.pushed[-1] == "agent-2:1.0.1"
@@ -1,209 +1,261 @@
 """
 Static validation tests for all system prompts.
 Validates structure, syntax and rendering without using LLM.
+
+Every registered prompt version and every test case is its own test item, so
+the suite parallelizes with pytest-xdist (`pytest -n auto`). Parsed YAML files
+are cached for the whole session, and with `--incremental` prompts unchanged
+since the last green run are skipped (see conftest.py).
 """
 
-import yaml
-import pytest
+import hashlib
 import re
 import string
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Any, Tuple
-
-
-@pytest.fixture(scope="session")
-def prompts_dir() -> Path:
-    """Return the prompts directory."""
-    return Path(__file__).parent.parent / "prompts"
+from typing import Any, Dict, List, NamedTuple, Optional
 
+import pytest
+import yaml
 
-@pytest.fixture(scope="session")
-def registry_data(prompts_dir: Path) -> Dict[str, Any]:
-    """Load and return registry.yaml data."""
-    registry_path = prompts_dir / "registry.yaml"
-    with open(registry_path, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+PROMPTS_DIR = Path(__file__).parent.parent / "prompts"
+REGISTRY_PATH = PROMPTS_DIR / "registry.yaml"
 
 
+@lru_cache(maxsize=None)
 def load_yaml_file(filepath: Path) -> Dict[str, Any]:
-    """Load and return the contents of a YAML file."""
+    """Load and return the contents of a YAML file (parsed once per session)."""
     with open(filepath, 'r', encoding='utf-8') as f:
         return yaml.safe_load(f)
 
 
-def test_registry_yaml_syntax(registry_data: Dict[str, Any]):
-    """Test if registry.yaml has valid syntax."""
-    assert registry_data is not None, "Registry.yaml is empty"
-    assert 'agents' in registry_data, "Registry must contain 'agents' key"
+@lru_cache(maxsize=None)
+def file_hash(filepath: Path) -> str:
+    """Content hash of a file, used to skip prompts unchanged since the last green run."""
+    return hashlib.sha256(filepath.read_bytes()).hexdigest()
 
 
-def test_all_yaml_files_valid(prompts_dir: Path):
-    """Test if all YAML files in prompts folder are valid."""
-    yaml_files = prompts_dir.glob("**/*.yaml")
+class PromptVersion(NamedTuple):
+    id: str
+    version: str
+    path: Path
+    test_path: Optional[Path]
 
-    errors = []
-    for yaml_file in yaml_files:
-        try:
-            load_yaml_file(yaml_file)
-        except yaml.YAMLError as e:
-            relative_path = yaml_file.relative_to(prompts_dir)
-            errors.append(f"{relative_path}: {e}")
+    @property
+    def name(self) -> str:
+        return f"{self.id}@{self.version}"
 
-    if errors:
-        error_msg = "YAML files with syntax errors:\n" + "\n".join(errors)
-        pytest.fail(error_msg)
+    @property
+    def content_hash(self) -> str:
+        # The checks themselves (this file and the incremental plugin) are part of the hash
+        digest = hashlib.sha256(file_hash(Path(__file__)).encode())
+        digest.update(file_hash(Path(__file__).parent / "conftest.py").encode())
+        for path in (self.path, self.test_path):
+            if path is not None:
+                digest.update(file_hash(path).encode())
+        return digest.hexdigest()
 
 
-def test_registry_files_exist(prompts_dir: Path, registry_data: Dict[str, Any]):
-    """Test if all prompts in registry physically exist."""
-    missing_files = []
-    for agent_id, agent_data in registry_data.get('agents', {}).items():
-        prompt_path = prompts_dir / agent_data['path']
-        if not prompt_path.exists():
-            missing_files.append(f"{agent_id}: {agent_data['path']}")
+def discover_prompts() -> List[PromptVersion]:
+    """Every version directory of every agent in the registry."""
+    try:
+        agents = load_yaml_file(REGISTRY_PATH).get('agents', {})
+    except (OSError, yaml.YAMLError, AttributeError):
+        return []
 
-    if missing_files:
-        error_msg = "Missing prompt files:\n" + "\n".join(missing_files)
-        pytest.fail(error_msg)
-
-
-@pytest.fixture(scope="session")
-def all_prompts(prompts_dir: Path, registry_data: Dict[str, Any]) -> List[Tuple[str, Path]]:
-    """Return list of all prompt paths from registry."""
     prompts = []
-    for agent_id, agent_data in registry_data.get('agents', {}).items():
-        prompt_path = prompts_dir / agent_data['path']
-        if prompt_path.exists():
-            prompts.append((agent_id, prompt_path))
+    for agent_id, agent_data in agents.items():
+        registered_path = PROMPTS_DIR / agent_data.get('path', '')
+        for prompt_path in sorted(registered_path.parent.parent.glob(f"v*/{registered_path.name}")):
+            test_path = prompt_path.parent / "prompt.tests.yaml"
+            prompts.append(PromptVersion(
+                id=agent_id,
+                version=prompt_path.parent.name[1:],
+                path=prompt_path,
+                test_path=test_path if test_path.exists() else None,
+            ))
     return prompts
 
 
-def test_prompt_structure(all_prompts):
-    """Test the structure of each prompt.yaml."""
-    for prompt_id, prompt_path in all_prompts:
-        prompt_data = load_yaml_file(prompt_path)
+def discover_cases(prompts: List[PromptVersion]) -> List[tuple]:
+    cases = []
+    for prompt in prompts:
+        if prompt.test_path is None:
+            continue
+        try:
+            test_data = load_yaml_file(prompt.test_path)
+        except yaml.YAMLError:
+            continue
+        if not isinstance(test_data, dict) or not isinstance(test_data.get('cases'), list):
+            continue
+        for i, case in enumerate(test_data['cases']):
+            case_name = case.get('name', f'case_{i}') if isinstance(case, dict) else f'case_{i}'
+            cases.append((prompt, case, f"{prompt.name}::{case_name}"))
+    return cases
 
-        required_fields = ['id', 'version', 'template', 'input_variables']
-        missing_fields = [field for field in required_fields if field not in prompt_data]
 
-        if missing_fields:
-            pytest.fail(f"Prompt {prompt_id} missing fields: {missing_fields}")
+def prompt_param(prompt: PromptVersion, *values, id: str = None):
+    """pytest.param tagged with the prompt's content hash for incremental runs."""
+    return pytest.param(
+        prompt, *values,
+        id=id or prompt.name,
+        marks=pytest.mark.prompt_hash(prompt.content_hash),
+    )
 
-        assert isinstance(prompt_data['input_variables'], list), \
-            f"Prompt {prompt_id}: input_variables must be a list"
-        assert isinstance(prompt_data['template'], str), \
-            f"Prompt {prompt_id}: template must be a string"
-        assert prompt_data['template'].strip(), \
-            f"Prompt {prompt_id}: template cannot be empty"
 
+ALL_PROMPTS = discover_prompts()
+PROMPTS_WITH_TESTS = [prompt for prompt in ALL_PROMPTS if prompt.test_path is not None]
+ALL_CASES = discover_cases(ALL_PROMPTS)
+YAML_FILES = sorted(PROMPTS_DIR.glob("**/*.yaml"))
 
-def test_template_variables_consistency(all_prompts):
-    """Test if template variables match input_variables."""
-    for prompt_id, prompt_path in all_prompts:
-        prompt_data = load_yaml_file(prompt_path)
 
-        template = prompt_data['template']
-        declared_vars = set(prompt_data['input_variables'])
-        template_vars = set(re.findall(r'\{(\w+)\}', template))
+@pytest.fixture(scope="session")
+def prompts_dir() -> Path:
+    """Return the prompts directory."""
+    return PROMPTS_DIR
 
-        undeclared = template_vars - declared_vars
-        if undeclared:
-            pytest.fail(f"Prompt {prompt_id} uses undeclared variables: {undeclared}")
 
-        unused = declared_vars - template_vars
-        if unused:
-            print(f"\nWarning: Prompt {prompt_id} has unused variables: {unused}")
+@pytest.fixture(scope="session")
+def registry_data() -> Dict[str, Any]:
+    """Load and return registry.yaml data."""
+    return load_yaml_file(REGISTRY_PATH)
 
 
-def test_fstring_syntax(all_prompts):
-    """Test if template has valid f-string format syntax."""
-    for prompt_id, prompt_path in all_prompts:
-        prompt_data = load_yaml_file(prompt_path)
-        template_str = prompt_data['template']
+def test_registry_yaml_syntax(registry_data: Dict[str, Any]):
+    """Test if registry.yaml has valid syntax."""
+    assert registry_data is not None, "Registry.yaml is empty"
+    assert 'agents' in registry_data, "Registry must contain 'agents' key"
 
-        try:
-            formatter = string.Formatter()
-            list(formatter.parse(template_str))
-        except ValueError as e:
-            pytest.fail(f"Prompt {prompt_id} has f-string format syntax error: {e}")
 
+@pytest.mark.parametrize("yaml_file", YAML_FILES, ids=lambda path: str(path.relative_to(PROMPTS_DIR)))
+def test_yaml_file_valid(yaml_file: Path):
+    """Test if each YAML file in prompts folder is valid."""
+    try:
+        load_yaml_file(yaml_file)
+    except yaml.YAMLError as e:
+        pytest.fail(f"{yaml_file.relative_to(PROMPTS_DIR)}: {e}")
 
-@pytest.fixture(scope="session")
-def prompts_with_tests(prompts_dir: Path, registry_data: Dict[str, Any]) -> List[Tuple[str, Path, Path]]:
-    """Return prompts that have test files."""
-    prompts_with_tests = []
+
+def test_registry_files_exist(prompts_dir: Path, registry_data: Dict[str, Any]):
+    """Test if all prompts in registry physically exist."""
+    missing_files = []
     for agent_id, agent_data in registry_data.get('agents', {}).items():
         prompt_path = prompts_dir / agent_data['path']
-        test_path = prompt_path.parent / "prompt.tests.yaml"
-
-        if prompt_path.exists() and test_path.exists():
-            prompts_with_tests.append((agent_id, prompt_path, test_path))
+        if not prompt_path.exists():
+            missing_files.append(f"{agent_id}: {agent_data['path']}")
 
-    return prompts_with_tests
+    if missing_files:
+        error_msg = "Missing prompt files:\n" + "\n".join(missing_files)
+        pytest.fail(error_msg)
 
 
-@pytest.fixture(scope="session")
-def all_test_cases(prompts_with_tests: List[Tuple[str, Path, Path]]) -> List[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
-    """Return all test cases from all prompts."""
-    test_cases = []
-    for prompt_id, prompt_path, test_path in prompts_with_tests:
-        prompt_data = load_yaml_file(prompt_path)
-        test_data = load_yaml_file(test_path)
-
-        for case in test_data.get('cases', []):
-            case_id = f"{prompt_id}::{case['name']}"
-            test_cases.append((case_id, prompt_data, case))
+@pytest.mark.parametrize("prompt", [prompt_param(p) for p in ALL_PROMPTS])
+def test_prompt_structure(prompt: PromptVersion):
+    """Test the structure of each prompt.yaml."""
+    prompt_data = load_yaml_file(prompt.path)
 
-    return test_cases
+    required_fields = ['id', 'version', 'template', 'input_variables']
+    missing_fields = [field for field in required_fields if field not in prompt_data]
 
+    if missing_fields:
+        pytest.fail(f"Prompt {prompt.name} missing fields: {missing_fields}")
 
-def test_test_cases_structure(prompts_with_tests):
-    """Test the structure of prompt.tests.yaml files."""
-    for prompt_id, prompt_path, test_path in prompts_with_tests:
-        test_data = load_yaml_file(test_path)
+    assert isinstance(prompt_data['input_variables'], list), \
+        f"Prompt {prompt.name}: input_variables must be a list"
+    assert isinstance(prompt_data['template'], str), \
+        f"Prompt {prompt.name}: template must be a string"
+    assert prompt_data['template'].strip(), \
+        f"Prompt {prompt.name}: template cannot be empty"
 
-        assert 'cases' in test_data, f"Tests for {prompt_id} must have 'cases' key"
-        assert isinstance(test_data['cases'], list), f"'cases' must be a list in {prompt_id}"
 
-        for i, case in enumerate(test_data['cases']):
-            case_name = case.get('name', f'case_{i}')
-            required = ['name', 'inputs', 'expect_contains']
-            missing = [field for field in required if field not in case]
+@pytest.mark.parametrize("prompt", [prompt_param(p) for p in ALL_PROMPTS])
+def test_template_variables_consistency(prompt: PromptVersion):
+    """Test if template variables match input_variables."""
+    prompt_data = load_yaml_file(prompt.path)
 
-            if missing:
-                pytest.fail(f"Prompt {prompt_id}, case '{case_name}' is missing: {missing}")
+    template = prompt_data['template']
+    declared_vars = set(prompt_data['input_variables'])
+    template_vars = set(re.findall(r'\{(\w+)\}', template))
 
-            assert isinstance(case['inputs'], dict), \
-                f"Prompt {prompt_id}, case '{case_name}': inputs must be a dict"
-            assert isinstance(case['expect_contains'], list), \
-                f"Prompt {prompt_id}, case '{case_name}': expect_contains must be a list"
+    undeclared = template_vars - declared_vars
+    if undeclared:
+        pytest.fail(f"Prompt {prompt.name} uses undeclared variables: {undeclared}")
 
+    unused = declared_vars - template_vars
+    if unused:
+        print(f"\nWarning: Prompt {prompt.name} has unused variables: {unused}")
 
-def test_prompt_rendering_with_test_cases(all_test_cases):
-    """Test if prompt renders correctly with test cases."""
-    for case_id, prompt_data, test_case in all_test_cases:
-        required_vars = set(prompt_data['input_variables'])
-        provided_vars = set(test_case['inputs'].keys())
 
-        invalid_vars = provided_vars - required_vars
-        if invalid_vars:
-            print(f"\nWarning: Case {case_id} provides unused variables: {invalid_vars}")
+@pytest.mark.parametrize("prompt", [prompt_param(p) for p in ALL_PROMPTS])
+def test_fstring_syntax(prompt: PromptVersion):
+    """Test if template has valid f-string format syntax."""
+    template_str = load_yaml_file(prompt.path)['template']
 
-        render_vars = {var: test_case['inputs'].get(var, '') for var in required_vars}
+    try:
+        formatter = string.Formatter()
+        list(formatter.parse(template_str))
+    except ValueError as e:
+        pytest.fail(f"Prompt {prompt.name} has f-string format syntax error: {e}")
 
-        try:
-            rendered = prompt_data['template'].format(**render_vars)
-        except Exception as e:
-            pytest.fail(f"Error rendering {case_id}: {e}")
 
-        missing_texts = [text for text in test_case['expect_contains'] if text not in rendered]
-        if missing_texts:
-            pytest.fail(
-                f"Case {case_id} doesn't contain expected texts:\n"
-                f"Missing: {missing_texts}\n"
-                f"First 500 characters of output:\n{rendered[:500]}..."
-            )
+@pytest.mark.parametrize("prompt", [prompt_param(p) for p in PROMPTS_WITH_TESTS])
+def test_test_cases_structure(prompt: PromptVersion):
+    """Test the structure of prompt.tests.yaml files."""
+    test_data = load_yaml_file(prompt.test_path)
+
+    assert 'cases' in test_data, f"Tests for {prompt.name} must have 'cases' key"
+    assert isinstance(test_data['cases'], list), f"'cases' must be a list in {prompt.name}"
+    budget = test_data.get('token_budget', 0)
+    assert isinstance(budget, int) and not isinstance(budget, bool), \
+        f"'token_budget' must be an integer in {prompt.name}"
+
+    for i, case in enumerate(test_data['cases']):
+        case_name = case.get('name', f'case_{i}')
+        required = ['name', 'inputs', 'expect_contains']
+        missing = [field for field in required if field not in case]
+
+        if missing:
+            pytest.fail(f"Prompt {prompt.name}, case '{case_name}' is missing: {missing}")
+
+        assert isinstance(case['inputs'], dict), \
+            f"Prompt {prompt.name}, case '{case_name}': inputs must be a dict"
+        assert isinstance(case['expect_contains'], list), \
+            f"Prompt {prompt.name}, case '{case_name}': expect_contains must be a list"
+        assert isinstance(case.get('live', {}), dict), \
+            f"Prompt {prompt.name}, case '{case_name}': live must be a dict"
+
+
+@pytest.mark.parametrize(
+    "prompt, test_case",
+    [prompt_param(prompt, case, id=case_id) for prompt, case, case_id in ALL_CASES],
+)
+def test_prompt_rendering_with_test_cases(prompt: PromptVersion, test_case: Dict[str, Any]):
+    """Test if prompt renders correctly with a test case."""
+    prompt_data = load_yaml_file(prompt.path)
+    case_id = f"{prompt.name}::{test_case.get('name')}"
+
+    required_vars = set(prompt_data['input_variables'])
+    provided_vars = set(test_case['inputs'].keys())
+
+    invalid_vars = provided_vars - required_vars
+    if invalid_vars:
+        print(f"\nWarning: Case {case_id} provides unused variables: {invalid_vars}")
+
+    render_vars = {var: test_case['inputs'].get(var, '') for var in required_vars}
+
+    try:
+        rendered = prompt_data['template'].format(**render_vars)
+    except Exception as e:
+        pytest.fail(f"Error rendering {case_id}: {e}")
+
+    missing_texts = [text for text in test_case['expect_contains'] if text not in rendered]
+    if missing_texts:
+        pytest.fail(
+            f"Case {case_id} doesn't contain expected texts:\n"
+            f"Missing: {missing_texts}\n"
+            f"First 500 characters of output:\n{rendered[:500]}..."
+        )
 
 
 if __name__ == "__main__":
-    pytest.main([__file__, "-v"])
\ No newline at end of file
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,110 @@
+"""
+Tests for the review queue worker against the local OpenAI stub.
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from openai_stub import OpenAIStub
+from prompt_metrics import MetricsStore
+from prompt_registry import PromptRegistry
+from review_queue import ReviewQueue, read_directory
+
+
+@pytest.fixture
+def stub():
+    stub = OpenAIStub(reply=lambda messages: f"ok: {len(messages[-1]['content'])}").start()
+    yield stub
+    stub.stop()
+
+
+def write_jobs(directory: Path, count: int) -> None:
+    lines = []
+    for i in range(count):
+        if i % 2:
+            job = {"id": f"pr-{i}", "type": "pull_request",
+                   "request": {"changes_summary": f"Change {i}", "files_changed": "a.py"}}
+        else:
+            job = {"id": f"cr-{i}", "type": "code_review", "request": {"code_diff": f"+ x = {i}"}}
+        lines.append(json.dumps(job))
+    lines.append(json.dumps({"id": "bad", "type": "code_review", "request": {"unknown": 1}}))
+    (directory / "jobs.jsonl").write_text("\n".join(lines), encoding='utf-8')
+
+
+def test_queue_processes_directory_jobs(stub: OpenAIStub, tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "stub")
+    jobs_dir = tmp_path / "jobs"
+    jobs_dir.mkdir()
+    write_jobs(jobs_dir, 20)
+    output = tmp_path / "results.jsonl"
+
+    async def main():
+        queue = ReviewQueue(output, concurrency=4, base_url=stub.base_url)
+        return await queue.run(read_directory(queue, jobs_dir))
+
+    metrics = asyncio.run(main())
+    results = {r["id"]: r for r in map(json.loads, output.read_text(encoding='utf-8').splitlines())}
+
+    assert metrics["completed"] == 20
+    assert metrics["failed"] == 1
+    assert metrics["queue_depth"] == 0
+    assert len(results) == 21
+    assert results["pr-1"]["agent"] == "agent-pull-request-creator"
+    assert results["cr-0"]["output"].startswith("ok: ")
+    assert "TypeError" in results["bad"]["error"]
+    assert (jobs_dir / "jobs.jsonl.queued").exists()
+
+
+def test_queue_routes_canary_and_records_metrics_per_version(stub: OpenAIStub, tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "stub")
+    canary = PromptRegistry(metrics_store=MetricsStore())
+    canary.registry["agents"]["agent-pull-request-creator"]["rollout"] = {"1.0.0": 50, "1.0.1": 50}
+    jobs_dir = tmp_path / "jobs"
+    jobs_dir.mkdir()
+    write_jobs(jobs_dir, 40)
+    output = tmp_path / "results.jsonl"
+
+    async def main():
+        queue = ReviewQueue(output, prompt_registry=canary, concurrency=4, base_url=stub.base_url)
+        return await queue.run(read_directory(queue, jobs_dir))
+
+    asyncio.run(main())
+    results = [json.loads(line) for line in output.read_text(encoding='utf-8').splitlines()]
+    rows = canary.metrics.summary(agent="agent-pull-request-creator", operation="completion")
+
+    assert {r["version"] for r in results if r.get("agent") == "agent-pull-request-creator"} == {"1.0.0", "1.0.1"}
+    assert {row["version"] for row in rows} == {"1.0.0", "1.0.1"}
+    assert sum(row["count"] for row in rows) == 20
+    assert canary.metrics.summary(agent="agent-code-reviewer", operation="render")[0]["count"] == 20
+
+
+def test_malformed_input_is_recorded_and_the_run_continues(stub: OpenAIStub, tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "stub")
+    jobs_dir = tmp_path / "jobs"
+    jobs_dir.mkdir()
+    job = {"id": "cr-1", "type": "code_review", "request": {"code_diff": "+ x = 1"}}
+    (jobs_dir / "a.json").write_text("{not json", encoding='utf-8')
+    (jobs_dir / "b.json").write_text(json.dumps({**job, "id": "cr-0"}, indent=2), encoding='utf-8')
+    (jobs_dir / "c.jsonl").write_text(f"{json.dumps(job)}\n[1, 2]\n{{broken\n", encoding='utf-8')
+    output = tmp_path / "results.jsonl"
+
+    async def main():
+        queue = ReviewQueue(output, concurrency=2, base_url=stub.base_url)
+        return await queue.run(read_directory(queue, jobs_dir))
+
+    metrics = asyncio.run(main())
+    results = {r["id"]: r for r in map(json.loads, output.read_text(encoding='utf-8').splitlines())}
+
+    assert metrics["completed"] == 2
+    assert metrics["failed"] == 3
+    assert set(results) == {"a.json", "cr-0", "cr-1", "c.jsonl:2", "c.jsonl:3"}
+    assert "JSONDecodeError" in results["a.json"]["error"]
+    assert "JSON object" in results["c.jsonl:2"]["error"]
+    assert sorted(path.name for path in jobs_dir.iterdir()) == ["a.json.queued", "b.json.queued", "c.jsonl.queued"]
@@ -0,0 +1,73 @@
+"""
+Tests for incremental section parsing of streamed output.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from section_stream import (
+    CODE_REVIEW_SECTIONS,
+    PULL_REQUEST_SECTIONS,
+    SectionStreamParser,
+    stream_sections,
+)
+
+REVIEW = """Segue a revisão.
+
+**RESUMO EXECUTIVO:**
+- Aprovado com ressalvas
+
+**MELHORIAS RECOMENDADAS:**
+- [QUALITY] Adicionar type hints
+
+## PRÓXIMOS PASSOS
+1. Adicionar testes"""
+
+
+def chunked(text: str, size: int = 3):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_sections_close_as_soon_as_next_header_arrives():
+    parser = SectionStreamParser(CODE_REVIEW_SECTIONS)
+    closed_at = {}
+    consumed = 0
+    for chunk in chunked(REVIEW):
+        consumed += len(chunk)
+        for event in parser.feed(chunk):
+            if event.kind == "section_end":
+                closed_at[event.section] = consumed
+
+    assert list(closed_at) == ["RESUMO EXECUTIVO", "MELHORIAS RECOMENDADAS"]
+    assert closed_at["RESUMO EXECUTIVO"] <= REVIEW.index("[QUALITY]")
+
+    [last] = parser.close()
+    assert (last.section, last.text) == ("PRÓXIMOS PASSOS", "1. Adicionar testes")
+
+
+def test_stream_sections_yields_tokens_and_section_text():
+    events = list(stream_sections(chunked(REVIEW), CODE_REVIEW_SECTIONS))
+
+    tokens = "".join(e.text for e in events if e.kind == "token")
+    sections = {e.section: e.text for e in events if e.kind == "section_end"}
+
+    assert tokens == REVIEW
+    assert sections["RESUMO EXECUTIVO"] == "- Aprovado com ressalvas"
+    assert sections["MELHORIAS RECOMENDADAS"] == "- [QUALITY] Adicionar type hints"
+
+
+def test_inline_header_content_is_kept():
+    output = (
+        "**Resumo das Mudanças:** not a header\n"
+        "**TÍTULO DO PR:** feat: add cache system\n\n**DESCRIÇÃO:**\n\n### Resumo\nAdds a cache.\n"
+    )
+
+    sections = {
+        e.section: e.text
+        for e in stream_sections(chunked(output, 5), PULL_REQUEST_SECTIONS)
+        if e.kind == "section_end"
+    }
+
+    assert sections == {"TÍTULO DO PR": "feat: add cache system", "DESCRIÇÃO": "", "Resumo": "Adds a cache."}
@@ -0,0 +1,93 @@
+"""
+Tests for the token-budget gate, using a whitespace token counter.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from prompt_registry import PromptRegistry, split_sections
+import token_budget
+from token_budget import TokenBudgetChecker
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def write_agent(root: Path, templates: dict, budget: int = None) -> PromptRegistry:
+    for version, template in templates.items():
+        version_dir = root / "agent" / f"v{version}"
+        version_dir.mkdir(parents=True)
+        (version_dir / "prompt.yaml").write_text(yaml.safe_dump({
+            "_type": "prompt", "id": "agent", "version": version,
+            "input_variables": ["text"], "template": template,
+        }), encoding='utf-8')
+        tests = {"cases": [{"name": "case", "inputs": {"text": "one two"}, "expect_contains": []}]}
+        if budget is not None:
+            tests["token_budget"] = budget
+        (version_dir / "prompt.tests.yaml").write_text(yaml.safe_dump(tests), encoding='utf-8')
+
+    last = list(templates)[-1]
+    (root / "registry.yaml").write_text(yaml.safe_dump({"agents": {"agent": {
+        "description": "Agent", "current_version": last, "path": f"agent/v{last}/prompt.yaml",
+    }}}), encoding='utf-8')
+    return PromptRegistry(prompts_dir=str(root))
+
+
+def test_split_sections_attributes_text_to_headers():
+    text = "Intro line\n\n## Instruções\nDo it\n\n## Formato da Resposta\n**TÍTULO:** x\n"
+
+    sections = split_sections(text)
+
+    assert [title for title, _ in sections] == ["(início)", "Instruções", "Formato da Resposta"]
+    assert "".join(section for _, section in sections) == text
+
+
+def test_version_over_budget_fails(tmp_path: Path):
+    registry = write_agent(tmp_path, {"1.0.0": "## A\n" + "word " * 20 + "{text}"}, budget=10)
+
+    [result] = TokenBudgetChecker(registry, count=count_words).check()
+
+    assert result.max_tokens == 24
+    assert result.failures == ["24 tokens exceeds budget of 10"]
+
+
+def test_growth_over_previous_version_fails(tmp_path: Path):
+    registry = write_agent(tmp_path, {
+        "1.0.0": "## A\n" + "word " * 10 + "{text}",
+        "1.0.1": "## A\n" + "word " * 12 + "{text}",
+        "1.0.2": "## A\n" + "word " * 30 + "\n## B\n{text}",
+    })
+
+    results = TokenBudgetChecker(registry, count=count_words, max_growth=20).check()
+
+    assert [bool(r.failures) for r in results] == [False, False, True]
+    assert "grew" in results[2].failures[0]
+    assert results[2].sections == {"A": 32, "B": 4}
+
+
+@pytest.mark.parametrize("budget", [True, "100", 1.5])
+def test_non_integer_budget_fails(tmp_path: Path, budget):
+    registry = write_agent(tmp_path, {"1.0.0": "{text}"}, budget=budget)
+
+    [result] = TokenBudgetChecker(registry, count=count_words).check()
+
+    assert result.failures == [f"token_budget must be an integer, got {budget!r}"]
+
+
+def test_count_tokens_estimates_when_encoding_is_unavailable(monkeypatch):
+    def offline(name):
+        raise ConnectionError("encoding download failed")
+
+    monkeypatch.setattr(token_budget.tiktoken, "get_encoding", offline)
+    token_budget._encoding.cache_clear()
+    try:
+        with pytest.warns(UserWarning, match="unavailable"):
+            assert token_budget.count_tokens("a" * 10, encoding="offline-test") == 3
+    finally:
+        token_budget._encoding.cache_clear()
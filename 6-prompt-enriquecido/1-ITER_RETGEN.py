@@ -1,221 +1,214 @@
-from dotenv import load_dotenv
-from langchain.chat_models import init_chat_model
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-
-# Load environment variables
-load_dotenv()
-
-llm = init_chat_model("openai:gpt-4o-mini", temperature=0.7)
-
-# ========= Enhanced Prompt Templates =========
-
-# Prompt to generate initial draft with MANY specific gaps
-draft_prompt = PromptTemplate(
-    input_variables=["question"],
-    template=(
-        "You are an expert assistant with limited initial knowledge.\n"
-        "Answer the following question, but you MUST mark MANY specific details as missing.\n"
-        "Use [MISSING: ...] markers for:\n"
-        "- Specific version numbers and release dates\n"
-        "- Technical specifications and parameters\n"
-        "- Performance metrics and benchmarks\n"
-        "- Comparison data between different versions\n"
-        "- Implementation details and code examples\n"
-        "- Real-world use cases and case studies\n"
-        "- Limitations and known issues\n"
-        "- Future roadmap and upcoming features\n\n"
-        "Be thorough in identifying what specific information would make the answer complete.\n"
-        "Start with a basic overview but mark MANY specific details as missing.\n\n"
-        "Do not generate more than 5 MISSING Markers."
-        "Question: {question}\n\n"
-        "Answer:"
-    ),
+import argparse
+import asyncio
+from pathlib import Path
+
+from convergence import ConvergenceController, Decision
+from gap_cache import DEFAULT_CACHE_DIR, GapCache
+from iter_retgen import (
+    DraftCreated,
+    FinalAnswer,
+    GapFilled,
+    GapsFound,
+    IterationFinished,
+    Notice,
+    compare_modes,
+    compare_policies,
+    iter_retgen_events,
+    iter_retgen_many,
+    print_comparison,
+    print_policy_comparison,
 )
-
-# Prompt to generate queries from gaps - now more specific
-query_prompt = PromptTemplate(
-    input_variables=["draft"],
-    template=(
-        "You received the following draft with gaps:\n{draft}\n\n"
-        "For each [MISSING: ...] marker, provide information to fill that gap.\n"
-        "Format each as: 'For [MISSING: topic]: provide the actual information'\n"
-        "Be specific and provide real data when possible.\n"
-        "Example: 'For [MISSING: version numbers]: LangChain is at version 0.1.0, LangGraph at 0.2.0'\n"
-        "List information for each gap, maximum 5 items."
-    ),
-)
-
-# Prompt to fill gaps gradually based on complexity
-fill_prompt = PromptTemplate(
-    input_variables=["question", "draft", "queries", "iteration"],
-    template=(
-        "Original question: {question}\n\n"
-        "Current draft (iteration {iteration}):\n{draft}\n\n"
-        "Information to help fill the gaps:\n{queries}\n\n"
-        "CRITICAL INSTRUCTIONS:\n"
-        "1. You MUST replace AT LEAST 1-2 [MISSING: ...] markers with concrete information\n"
-        "2. ACTUALLY REPLACE the text '[MISSING: xyz]' with real content - don't keep the marker\n"
-        "3. Use the information above to guide what content to add\n"
-        "4. Do NOT add any new [MISSING:] markers - only fill or keep existing ones\n"
-        "5. If you cannot fill a gap with certainty, keep it as [MISSING: ...]\n\n"
-        "Example of what to do:\n"
-        "- WRONG: '[MISSING: version numbers and release dates]' (keeping the marker)\n"
-        "- RIGHT: 'LangChain version 0.1.0 was released in January 2024' (replacing with content)\n\n"
-        "Important: This is iteration {iteration}. You MUST make progress by filling gaps.\n\n"
-        "Rewrite the ENTIRE answer with the [MISSING:] markers replaced:"
-    ),
-)
-
-# New prompt to identify additional gaps after filling
-expansion_prompt = PromptTemplate(
-    input_variables=["draft"],
-    template=(
-        "Review this draft answer:\n{draft}\n\n"
-        "Identify areas that could benefit from MORE specific information.\n"
-        "Add new [MISSING: ...] markers for:\n"
-        "- Technical details that were glossed over\n"
-        "- Specific examples that would clarify concepts\n"
-        "- Comparative data that would add context\n"
-        "- Implementation specifics that developers would need\n\n"
-        "Return the same text but with ADDITIONAL [MISSING: ...] markers for deeper details:"
-    ),
-)
-
-# ========= Create Runnable Chains =========
-
-draft_chain = draft_prompt | llm | StrOutputParser()
-query_chain = query_prompt | llm | StrOutputParser()
-fill_chain = fill_prompt | llm | StrOutputParser()
-expansion_chain = expansion_prompt | llm | StrOutputParser()
-
-# ========= Enhanced Main Function =========
-
-def iter_retgen_multi(question: str, max_iters: int = 10, target_completeness: float = 0.95):
-    """
-    Perform iterative retrieval and generation with multiple natural rounds.
-    Continues until all gaps are filled or max iterations reached.
-
-    Args:
-        question: The question to answer
-        max_iters: Maximum number of iterations to refine the answer
-        target_completeness: Target completeness (0-1), stops when achieved
-
-    Returns:
-        The final refined answer
-    """
-
-    # Generate initial draft with many gaps
-    draft = draft_chain.invoke({"question": question})
-    print("\n=== Initial Draft (with many gaps) ===")
-    print(draft)
-
-    # Count initial gaps
-    initial_gaps = draft.count("[MISSING:")
-    print(f"\n Initial gaps identified: {initial_gaps}")
-
-    actual_iterations = 0
-    consecutive_no_progress = 0
-
-    # Iterative refinement - continue until complete or max iterations
-    for iteration in range(max_iters):
-        actual_iterations = iteration + 1
-        current_gaps = draft.count("[MISSING:")
-
-        # Check if we've reached completion
-        if current_gaps == 0:
-            print("\n All gaps filled!")
-
-            # Only expand in early iterations, not indefinitely
-            if iteration < 2:  # Only expand in first couple iterations
-                print("Checking for areas to expand...")
-                draft = expansion_chain.invoke({"draft": draft})
-                current_gaps = draft.count("[MISSING:")
-
-                if current_gaps == 0:
-                    print(" Answer is comprehensive and complete!")
-                    break
-                else:
-                    print(f" Identified {current_gaps} new areas for expansion")
-                    consecutive_no_progress = 0  # Reset counter
-            else:
-                print("✅ Answer is complete after multiple refinements!")
-                break  # Stop after filling all gaps in later iterations
-
-        print(f"\n{'='*60}")
-        print(f" ITERATION {iteration + 1}")
-        print(f" Current gaps to address: {current_gaps}")
-        print('='*60)
-
-        # Generate queries for missing information
-        queries = query_chain.invoke({"draft": draft})
-        print("\n=== Generated Queries ===")
-        queries_list = queries.split('\n')
-        for i, query in enumerate(queries_list[:10], 1):  # Show max 10 queries
-            if query.strip():
-                print(f"{i}. {query.strip()}")
-        if len(queries_list) > 10:
-            print(f"   ... and {len(queries_list) - 10} more queries")
-
-        # Fill gaps with new information (gradual filling based on iteration)
-        draft = fill_chain.invoke({
-            "question": question,
-            "draft": draft,
-            "queries": queries,
-            "iteration": iteration + 1
-        })
-
-        # Show refined answer
-        print("\n=== Refined Answer ===")
-        print(draft[:500] + "..." if len(draft) > 500 else draft)  # Show preview
-
-        # Report progress
-        new_gaps = draft.count("[MISSING:")
-        filled = current_gaps - new_gaps
-        print(f"\nProgress: Filled {filled} gaps, {new_gaps} remaining")
-
-        # Check if we're making progress
-        if filled == 0:
-            consecutive_no_progress += 1
-            if consecutive_no_progress >= 3:
-                print("\nNo progress in 3 consecutive iterations. Stopping.")
-                break
+from model_tiers import StageModels
+from vector_index import open_retriever
+
+STOP_MESSAGES = {
+    "complete": "✅ Answer is complete!",
+    "no_progress": "No progress in 3 consecutive iterations. Stopping.",
+    "unfillable": "Remaining gaps could not be filled. Stopping.",
+    "max_iters": "Reached the maximum number of iterations.",
+    "deadline": "Deadline reached; returning the partial answer.",
+    "cancelled": "Cancelled; returning the partial answer.",
+    "token_budget": "Token budget cannot cover another round. Stopping.",
+    "time_budget": "Time budget cannot cover another round. Stopping.",
+    "low_gain": "Gaps filled per 1k tokens fell below the threshold. Stopping.",
+}
+
+# ========= Event Rendering =========
+
+def render_event(event, prefix: str = "") -> None:
+    """Print one ITER-RETGEN event"""
+    def say(text: str = "") -> None:
+        for line in text.split("\n"):
+            print(f"{prefix}{line}")
+
+    if isinstance(event, DraftCreated):
+        say("\n=== Initial Draft (with many gaps) ===")
+        say(event.draft)
+    elif isinstance(event, GapsFound):
+        if event.iteration == 0:
+            say(f"\n Initial gaps identified: {len(event.gaps)} ({event.duplicates} duplicates)")
         else:
-            consecutive_no_progress = 0
-
-    print(f"\n{'='*60}")
-    print(f" REFINEMENT COMPLETE after {actual_iterations} iterations")
-    print(f"{'='*60}")
-
-    return draft
-
-
-# ========= Main Execution =========
-
-if __name__ == "__main__":
-    # Using a complex technical question that naturally requires multiple iterations
-    demonstration_question = (
-        "Explain about the LangChain and LangGraph"
-    )
-
-    print(f"'{demonstration_question}'")
-    print("#"*60)
-
-    # Run with more iterations to ensure completion
-    final_answer = iter_retgen_multi(demonstration_question, max_iters=10)
-
+            say(f"\n All gaps filled! Identified {len(event.gaps)} new areas for expansion")
+        for gap in event.gaps:
+            say(f"- #{gap.id} {gap.topic}")
+    elif isinstance(event, Notice):
+        say(event.message)
+    elif isinstance(event, Decision):
+        say(f"[controller] {event.describe()}")
+    elif isinstance(event, GapFilled):
+        text = event.text[:100] if event.text is not None else "(filled in rewrite)"
+        say(f"- filled #{event.gap.id} {event.gap.topic} [{event.source}]: {text}")
+    elif isinstance(event, IterationFinished):
+        say(f"\n{'='*60}")
+        say(f" ITERATION {event.iteration}")
+        say('='*60)
+        say(event.draft[:500] + "..." if len(event.draft) > 500 else event.draft)  # Show preview
+        counts = event.counts
+        say(
+            f"\nProgress: Filled {event.filled} gaps, {counts['open']} remaining "
+            f"({counts['duplicate']} duplicates, {counts['reworded']} reworded so far)"
+        )
+    elif isinstance(event, FinalAnswer):
+        say(f"\n{STOP_MESSAGES[event.reason]}")
+        say(f"{'='*60}")
+        say(f" REFINEMENT COMPLETE after {event.stats['iterations']} iterations")
+        say(f"{'='*60}")
+
+
+def print_statistics(question: str, final: FinalAnswer, cache=None) -> None:
+    stats = final.stats
     print("\n" + "="*60)
     print("FINAL COMPLETE ANSWER:")
     print("="*60)
-    print(final_answer)
+    print(final.answer)
 
     # Final statistics
-    final_gaps = final_answer.count("[MISSING:")
-    initial_length = len(demonstration_question)
-    final_length = len(final_answer)
+    initial_length = len(question)
+    final_length = len(final.answer)
 
     print("\n" + "="*60)
     print(f"FINAL STATISTICS:")
-    print(f"   - Remaining gaps: {final_gaps}")
+    print(f"   - Gaps: {stats['initial_gaps']} initial, {stats['filled_gaps']} filled, {stats['remaining_gaps']} remaining")
+    print(f"   - Duplicates: {stats['duplicate_gaps']}, reworded: {stats['reworded_gaps']}")
     print(f"   - Answer expansion: {final_length / initial_length:.1f}x original question length")
-    print("="*60)
\ No newline at end of file
+    print(f"   - Tokens: {stats['tokens']} (~${stats['cost_usd']:.4f}), elapsed: {stats['elapsed_s']:.1f}s, stop reason: {final.reason}")
+    if cache is not None:
+        cache_stats = cache.stats()
+        print(
+            f"   - Gap cache: {cache_stats['hits']}/{cache_stats['lookups']} hits "
+            f"({cache_stats['hit_rate']:.0%}), {cache_stats['saved_calls']} model calls saved"
+        )
+    print("="*60)
+    if final.stages is not None:
+        final.stages.print()
+
+# ========= Consumers =========
+
+async def answer_one(question: str, cache=None, **kwargs) -> None:
+    print(f"'{question}'")
+    print("#"*60)
+    async for event in iter_retgen_events(question, cache=cache, **kwargs):
+        render_event(event)
+        if isinstance(event, FinalAnswer):
+            print_statistics(question, event, cache)
+
+
+async def answer_many(questions, max_parallel: int, cache=None, **kwargs) -> None:
+    """Run the questions concurrently, printing only their milestones"""
+    async for index, event in iter_retgen_many(questions, max_parallel=max_parallel, cache=cache, **kwargs):
+        prefix = f"[q{index + 1}] "
+        if isinstance(event, (GapsFound, IterationFinished)):
+            summary = (
+                f"{len(event.gaps)} gaps" if isinstance(event, GapsFound)
+                else f"iteration {event.iteration}: filled {event.filled}, {event.counts['open']} open"
+            )
+            print(f"{prefix}{summary}")
+        elif isinstance(event, FinalAnswer):
+            print(f"{prefix}done ({event.reason}, {event.stats['iterations']} iterations)")
+            print_statistics(questions[index], event, cache)
+
+# ========= Main Execution =========
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ITER-RETGEN: iterative retrieval and generation")
+    parser.add_argument("--question", default="Explain about the LangChain and LangGraph")
+    parser.add_argument("--max-iters", type=int, default=10)
+    parser.add_argument("--docs", type=Path, default=None, help="Directory of documents for local BM25 retrieval")
+    parser.add_argument("--index-path", type=Path, default=None, help="Where the BM25 or vector index is persisted")
+    parser.add_argument("--retriever", choices=["bm25", "vector"], default="bm25", help="Local retrieval backend for --docs")
+    parser.add_argument("--embedder", default="hashing",
+                        help="Embedder for --retriever vector: hashing, hashing:<dim> or e.g. openai:text-embedding-3-small")
+    parser.add_argument("--top-k", type=int, default=3, help="Passages retrieved per gap")
+    parser.add_argument("--mode", choices=["rewrite", "parallel"], default="rewrite",
+                        help="rewrite: full-answer fill rounds; parallel: one concurrent prompt per gap")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent gap prompts in parallel mode")
+    parser.add_argument("--edits", action="store_true", help="Request JSON edits instead of full-answer rewrites")
+    parser.add_argument("--gap-cache", type=Path, default=None,
+                        help="Gap-fill cache directory (default: .gap-cache); without --docs fills are reused for the same question only")
+    parser.add_argument("--gap-cache-ttl", type=float, default=7 * 24 * 3600, help="Seconds a cached fill stays valid")
+    parser.add_argument("--no-gap-cache", action="store_true", help="Do not read or write cached gap fills")
+    parser.add_argument("--deadline", type=float, default=None, help="Seconds per question before the partial answer is returned")
+    parser.add_argument("--tiered", action="store_true",
+                        help="Cheap models for draft/query/expansion with escalation, stronger fill tier (model_tiers.TIERED_PRESET)")
+    parser.add_argument("--stage-model", action="append", default=[], metavar="STAGE=MODEL[@TEMP],...",
+                        help="Tiers for one stage (draft, query, fill, expansion), cheapest first; repeatable")
+    parser.add_argument("--controller", action="store_true",
+                        help="Decide rounds and expansions from token spend and marginal gain instead of fixed heuristics")
+    parser.add_argument("--token-budget", type=int, default=None, help="Tokens per question (implies --controller)")
+    parser.add_argument("--time-budget", type=float, default=None, help="Seconds per question (implies --controller)")
+    parser.add_argument("--min-gain", type=float, default=0.5, help="Minimum gaps filled per 1k tokens to keep going")
+    parser.add_argument("--compare-policies", action="store_true",
+                        help="Run fixed heuristics and the controller and report cost vs completeness")
+    parser.add_argument("--compare", action="store_true",
+                        help="Run rewrite, edits and parallel modes and report iterations, time and tokens")
+    parser.add_argument("--questions", type=Path, default=None,
+                        help="File with one question per line (answered concurrently, or used by --compare)")
+    parser.add_argument("--max-parallel", type=int, default=4, help="Questions answered at once with --questions")
+    args = parser.parse_args()
+
+    cache = None
+    if not args.no_gap_cache:
+        cache = GapCache(args.gap_cache or DEFAULT_CACHE_DIR, ttl=args.gap_cache_ttl)
+
+    retriever = None
+    if args.docs:
+        retriever, description = open_retriever(args.docs, args.retriever, args.embedder, args.index_path)
+        print(description)
+
+    questions = [args.question]
+    if args.questions:
+        questions = [line.strip() for line in args.questions.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+    def make_controller() -> ConvergenceController:
+        return ConvergenceController(
+            token_budget=args.token_budget, time_budget=args.time_budget, min_gain_per_1k=args.min_gain,
+        )
+
+    if args.compare:
+        print_comparison(compare_modes(
+            questions, max_iters=args.max_iters, retriever=retriever,
+            top_k=args.top_k, max_concurrency=args.concurrency,
+        ))
+        raise SystemExit(0)
+
+    models = StageModels.parse(args.stage_model, StageModels.preset() if args.tiered else None)
+    options = dict(
+        max_iters=args.max_iters, retriever=retriever, top_k=args.top_k, mode=args.mode,
+        max_concurrency=args.concurrency, edits=args.edits, deadline=args.deadline, models=models,
+    )
+    if args.compare_policies:
+        # No gap cache here: the second run would be served from the first
+        rows = compare_policies(questions, make_controller, **options)
+        print_policy_comparison(rows)
+        for row in rows:
+            for line in row["decisions"]:
+                print(f"[controller] {row['question'][:40]}: {line}")
+        raise SystemExit(0)
+
+    use_controller = args.controller or args.token_budget is not None or args.time_budget is not None
+    if args.questions:
+        factory = make_controller if use_controller else None
+        asyncio.run(answer_many(questions, args.max_parallel, cache=cache, controller_factory=factory, **options))
+    else:
+        controller = make_controller() if use_controller else None
+        asyncio.run(answer_one(args.question, cache=cache, controller=controller, **options))
@@ -7,11 +7,31 @@ from langchain.chat_models import init_chat_model
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
 
+from slot_extraction import SlotExtractor
+from vector_index import VectorRetriever, load_or_build_vectors, make_embedder
+
 # Load environment variables
 load_dotenv()
 
 # ========= Configuration =========
 
+# Conventional branch prefixes, so "feature/login" is never read as an org/repo
+BRANCH_PREFIXES = "feature|feat|fix|bugfix|hotfix|release|chore|docs|refactor"
+BRANCH_EXCLUSION = rf"(?!(?:{BRANCH_PREFIXES})/)"
+
+# Source directories and file extensions, so "in src/app.py" is never read as an org/repo or branch
+PATH_ROOTS = "src|lib|libs|app|apps|test|tests|docs|pkg|cmd|internal|scripts|packages|config"
+FILE_EXTENSIONS = (
+    "py|pyi|ipynb|js|jsx|ts|tsx|go|rs|java|kt|rb|php|c|h|cc|cpp|hpp|cs|swift|md|rst|txt|"
+    "json|ya?ml|toml|cfg|ini|sql|sh|html|css|lock"
+)
+FILE_EXCLUSION = rf"(?![\w./-]*\.(?:{FILE_EXTENSIONS})\b)"
+PATH_EXCLUSION = rf"(?!(?:{PATH_ROOTS})/){FILE_EXCLUSION}"
+
+# owner/name with a letter in the owner, so "3/4" is not a repository, and nothing
+# path-like after it (an optional .git suffix is dropped)
+REPOSITORY = r"((?=[\w-]*[A-Za-z])[\w-]+/[\w.-]+?)(?:\.git)?(?![\w/-]|\.\w)"
+
 @dataclass
 class EnrichmentConfig:
     """Configuration for query enrichment"""
@@ -19,19 +39,77 @@ class EnrichmentConfig:
     temperature: float = 0.0
     max_rounds: int = 10
 
+    # Optional semantic retrieval: related passages are shown to the enrichment model
+    docs_dir: Optional[str] = None
+    embedder: str = "hashing"
+    retrieval_top_k: int = 3
+
+    # Resolve fields with the patterns below; the LLM only reads ambiguous free-text fields.
+    # False sends every round to the enrichment chain.
+    local_extraction: bool = True
+
     # Define what information we want to collect
-    required_information: List[Dict[str, str]] = None
+    required_information: List[Dict[str, Any]] = None
 
     def __post_init__(self):
         if self.required_information is None:
-            # Default configuration for PR review scenario
+            # Default configuration for PR review scenario.
+            # patterns/hints/kind drive the SlotExtractor; task turns a resolved value into a sub-query.
             self.required_information = [
-                {"field": "pr_id", "question": "What is the PR ID?"},
-                {"field": "repository", "question": "What is the repository name?"},
-                {"field": "branch", "question": "What is the branch name?"},
-                {"field": "concerns", "question": "What are your specific concerns?"},
-                {"field": "style_guide", "question": "What style guide should be followed?"},
-                {"field": "test_requirements", "question": "What are the test requirements?"},
+                {
+                    "field": "pr_id", "question": "What is the PR ID?", "kind": "structured",
+                    "patterns": [r"(?:\bPR|pull request|/pull/)\s*#?\s*(\d+)", r"#(\d+)\b"],
+                    "task": "Review PR #{value}",
+                },
+                {
+                    "field": "repository", "question": "What is the repository name?", "kind": "structured",
+                    "patterns": [
+                        r"github\.com[/:]([\w.-]+/[\w-]+)",
+                        r"\b(?:repo|repository)\b\s*(?:is|:|=|named)?\s*`?" + BRANCH_EXCLUSION + REPOSITORY,
+                        r"\b(?:in|from)\s+`?" + BRANCH_EXCLUSION + PATH_EXCLUSION + REPOSITORY,
+                    ],
+                },
+                {
+                    "field": "branch", "question": "What is the branch name?", "kind": "structured",
+                    "patterns": [
+                        r"\b" + FILE_EXCLUSION + r"((?:" + BRANCH_PREFIXES + r")/[\w./-]+)",
+                        r"\bbranch\s*(?:is|:|=|named)\s*`?([\w./-]+)",
+                        # "into main" names the merge target, not the branch under review
+                        r"\b(?:on|from)\s+`?(main|master|develop|trunk)\b",
+                    ],
+                },
+                {
+                    "field": "concerns", "question": "What are your specific concerns?", "kind": "free_text",
+                    "patterns": [
+                        r"\bconcern(?:s|ed)?\s*(?:are|is|:|about)\s*([^|\n;.]+)",
+                        r"\bworried about\s+([^|\n;.]+)",
+                        r"\bfocus(?:ing)? on\s+([^|\n;.]+)",
+                    ],
+                    "hints": r"\b(security|performance|bug|readab|maintainab|memory|leak|race|regression|vulnerab|complexity)\w*",
+                    "task": "Review for {value}",
+                },
+                {
+                    "field": "style_guide", "question": "What style guide should be followed?", "kind": "free_text",
+                    "patterns": [
+                        r"\b(PEP\s?8)\b",
+                        r"\b(Google(?:'s)?\s+\w+\s+style(?:\s+guide)?)",
+                        r"\b(Airbnb(?:\s+JavaScript)?(?:\s+style(?:\s+guide)?)?)",
+                        r"\b(Ruff|Flake8|ESLint|Prettier|gofmt|rustfmt|StandardJS)\b",
+                        r"\bstyle guide\s*(?:is|:|=)\s*([^|\n,.;]+)",
+                    ],
+                    "hints": r"\b(style|lint|format|convention|guideline)\w*",
+                    "task": "Check compliance with {value}",
+                },
+                {
+                    "field": "test_requirements", "question": "What are the test requirements?", "kind": "free_text",
+                    "patterns": [
+                        r"(\d{1,3}\s*%\s*(?:test\s+)?coverage)",
+                        r"\b(no\s+(?:new\s+)?tests?(?:\s+(?:required|needed))?)",
+                        r"\b((?:unit|integration|e2e|end-to-end|regression)\s+tests?)\b",
+                    ],
+                    "hints": r"\b(test|coverage|pytest|jest|unittest|tdd)\w*",
+                    "task": "Verify test requirements: {value}",
+                },
             ]
 
 
@@ -55,6 +133,29 @@ class QueryEnricher:
         self.llm = init_chat_model(config.model_name, temperature=config.temperature)
         self.enrichment_chain = self._create_enrichment_chain()
         self.rewrite_chain = self._create_rewrite_chain()
+        self.slot_chain = self._create_slot_chain()
+        self.extractor = SlotExtractor(config.required_information)
+        self.retriever = self._create_retriever()
+        # Enrichment rounds and how many of them needed the LLM
+        self.enrich_calls = 0
+        self.llm_calls = 0
+        # Slot values read by the LLM, per (free text, fields): later rounds only add answers
+        self.slot_values: Dict[tuple, Dict[str, Any]] = {}
+
+    def _create_retriever(self) -> Optional[VectorRetriever]:
+        """Vector index over docs_dir, built once and reused from disk"""
+        if not self.config.docs_dir:
+            return None
+        embedder = make_embedder(self.config.embedder)
+        index, _ = load_or_build_vectors(self.config.docs_dir, embedder)
+        return VectorRetriever(index, embedder)
+
+    def related_context(self, query: str) -> str:
+        """Passages related to the query, formatted for the enrichment prompt"""
+        if self.retriever is None:
+            return ""
+        hits = self.retriever.search(query, k=self.config.retrieval_top_k)
+        return "\n".join(f"- ({hit.passage.source}:{hit.passage.start_line}) {hit.passage.text[:400]}" for hit in hits)
 
     def _create_enrichment_chain(self):
         """Create the query enrichment chain"""
@@ -113,8 +214,62 @@ NEVER set clarifications to empty [] unless ALL 6 required items are explicitly
 
         return rewrite_prompt | self.llm | StrOutputParser()
 
+    def _create_slot_chain(self):
+        """Create chain that reads only the ambiguous free-text fields"""
+        slot_prompt = ChatPromptTemplate.from_messages([
+            ("system", """Extract the requested fields from a software development request.
+
+Use ONLY what the user explicitly stated; background passages are not user input.
+Output STRICT JSON mapping each field name to a short string, or null when the user did not state it."""),
+            ("user", "Fields:\n{fields}\n\nRequest:\n{question}")
+        ])
+
+        return slot_prompt | self.llm | JsonOutputParser()
+
+    def _with_background(self, query: str) -> str:
+        context = self.related_context(query)
+        if context:
+            # Background only: the rules still require the user to provide every field
+            query = f"{query}\n\nBackground (not provided by the user):\n{context}"
+        return query
+
+    def extract(self, query: str) -> Dict[str, Any]:
+        """Fill the required fields locally, asking the LLM only about ambiguous free-text fields"""
+        slots = self.extractor.extract(query)
+        ambiguous = self.extractor.ambiguous(slots)
+        if ambiguous:
+            _, free_text = self.extractor.split(query)
+            key = (free_text, tuple(slot.field for slot in ambiguous))
+            if key not in self.slot_values:
+                self.llm_calls += 1
+                fields = "\n".join(f"- {slot.field}: {slot.question}" for slot in ambiguous)
+                try:
+                    values = self.slot_chain.invoke({"fields": fields, "question": self._with_background(free_text)})
+                except Exception as e:
+                    print(f"Error during slot extraction: {e}")
+                    values = {}
+                self.slot_values[key] = values if isinstance(values, dict) else {}
+            self.extractor.merge(slots, self.slot_values[key])
+
+        resolved = [slot for slot in slots.values() if slot.value is not None]
+        tasks = {info["field"]: info.get("task") for info in self.config.required_information}
+        sub_queries = [tasks[slot.field].format(value=slot.value) for slot in resolved if tasks[slot.field]]
+        return {
+            "is_complex": len(sub_queries) > 1,
+            "sub_queries": sub_queries,
+            "clarifications": [slot.question for slot in slots.values() if slot.value is None],
+            "entities": [f"{slot.field}: {slot.value}" for slot in resolved],
+            "sources": {slot.field: slot.source for slot in resolved},
+        }
+
     def enrich(self, query: str) -> Dict[str, Any]:
         """Enrich a query with clarifications"""
+        self.enrich_calls += 1
+        if self.config.local_extraction:
+            return self.extract(query)
+
+        self.llm_calls += 1
+        query = self._with_background(query)
         try:
             return self.enrichment_chain.invoke({"question": query})
         except Exception as e:
@@ -154,6 +309,7 @@ class EnrichmentSession:
         self.initial_question = ""
         self.provided_information = []
         self.round_num = 0
+        self.stats: Dict[str, Any] = {}
 
     def _display_enrichment(self, enriched: Dict[str, Any]):
         """Display enrichment results"""
@@ -185,6 +341,7 @@ class EnrichmentSession:
         self.initial_question = initial_question
         self.provided_information = []
         self.round_num = 0
+        enrich_calls, llm_calls = self.enricher.enrich_calls, self.enricher.llm_calls
 
         print(f"\nInitial question: '{initial_question}'")
         print("="*60)
@@ -236,6 +393,11 @@ class EnrichmentSession:
         print("\n=== Final Enriched Question ===")
         print(natural_question)
 
+        rounds = self.enricher.enrich_calls - enrich_calls
+        calls = self.enricher.llm_calls - llm_calls
+        self.stats = {"enrichment_rounds": rounds, "llm_calls": calls, "llm_call_rate": calls / rounds if rounds else 0.0}
+        print(f"\nLLM call rate: {calls}/{rounds} enrichment rounds ({self.stats['llm_call_rate']:.0%})")
+
         return natural_question, enriched
 
 
@@ -0,0 +1,323 @@
+"""
+Batch ITER-RETGEN over a JSONL file of questions.
+
+Each input line is {"id": "...", "question": "..."} ("id" is optional; a
+hash of the question is used instead). Questions run concurrently up to
+--concurrency, and every model call of every question goes through one
+global rate limiter (requests and tokens per minute). Results are appended
+to the output JSONL as each question finishes, with its iterations, gaps,
+tokens and stop reason.
+
+The output file is the checkpoint: on restart, questions that already have
+a successful record are skipped, failed ones are retried, and a line left
+half-written by a crash is discarded.
+
+Usage:
+    python batch_retgen.py faq.jsonl answers.jsonl --concurrency 8 --rpm 500 --tpm 200000
+    python batch_retgen.py faq.jsonl answers.jsonl --docs repo_langchain_1.0 --mode parallel
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler, UsageMetadataCallbackHandler
+
+from convergence import ConvergenceController
+from gap_cache import DEFAULT_CACHE_DIR, GapCache
+from iter_retgen import FinalAnswer, iter_retgen_events
+from model_tiers import StageModels
+from vector_index import open_retriever
+
+CHARS_PER_TOKEN = 4  # rough prompt size estimate until the real usage is known
+
+# ========= Rate Limiting =========
+
+class RateLimiter:
+    """
+    Token buckets for requests and tokens per minute, shared by all runs.
+
+    Buckets hold burst_seconds worth of capacity, so a fresh run cannot
+    spend a whole minute's quota at once. A call reserves one request and
+    its estimated prompt tokens before it starts; once the real usage is
+    known the difference is charged, so the token bucket may briefly go
+    negative and later calls wait it out.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        burst_seconds: float = 10.0,
+        clock=time.monotonic,
+    ):
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self.clock = clock
+        self.request_capacity = max(1.0, (requests_per_minute or 0) * burst_seconds / 60)
+        self.token_capacity = (tokens_per_minute or 0) * burst_seconds / 60
+        self.requests = self.request_capacity if requests_per_minute else 0.0
+        self.tokens = self.token_capacity
+        self.waited = 0.0
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        elapsed, self._updated = now - self._updated, now
+        if self.rpm:
+            self.requests = min(self.request_capacity, self.requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self.tokens = min(self.token_capacity, self.tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens: int = 0) -> int:
+        """Wait for one request and `tokens` tokens of capacity; returns the tokens reserved"""
+        reserved = int(min(tokens, self.token_capacity)) if self.tpm else 0
+        async with self._lock:  # first come, first served
+            while True:
+                self._refill()
+                wait = 0.0
+                if self.rpm and self.requests < 1:
+                    wait = (1 - self.requests) * 60 / self.rpm
+                if self.tpm and self.tokens < reserved:
+                    wait = max(wait, (reserved - self.tokens) * 60 / self.tpm)
+                if wait <= 0:
+                    break
+                self.waited += wait
+                await asyncio.sleep(wait)
+            if self.rpm:
+                self.requests -= 1
+            self.tokens -= reserved
+        return reserved
+
+    def charge(self, tokens: int) -> None:
+        """Charge tokens beyond (or refund below, if negative) what was reserved"""
+        if self.tpm:
+            self._refill()
+            self.tokens = min(self.token_capacity, self.tokens - tokens)
+
+
+class RateLimitCallback(AsyncCallbackHandler):
+    """Holds every chat model call until the limiter lets it through"""
+
+    def __init__(self, limiter: RateLimiter):
+        self.limiter = limiter
+        self._reserved: Dict[UUID, int] = {}
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs) -> None:
+        estimate = sum(len(str(message.content)) for batch in messages for message in batch) // CHARS_PER_TOKEN
+        self._reserved[run_id] = await self.limiter.acquire(estimate)
+
+    async def on_llm_end(self, response, *, run_id: UUID, **kwargs) -> None:
+        reserved = self._reserved.pop(run_id, 0)
+        used = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                used += usage.get("total_tokens", 0)
+        if used:
+            self.limiter.charge(used - reserved)
+
+    async def on_llm_error(self, error, *, run_id: UUID, **kwargs) -> None:
+        self._reserved.pop(run_id, None)
+
+# ========= Input / Output =========
+
+def question_id(record: Dict[str, Any]) -> str:
+    return str(record.get("id") or hashlib.sha256(record["question"].encode("utf-8")).hexdigest()[:12])
+
+
+def read_questions(path: Path) -> List[Dict[str, Any]]:
+    questions = []
+    seen: Set[str] = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not isinstance(record, dict) or not str(record.get("question", "")).strip():
+                raise ValueError(f"{path}:{number}: expected an object with a non-empty 'question'")
+            record["id"] = question_id(record)
+            if record["id"] in seen:
+                raise ValueError(f"{path}:{number}: duplicate id '{record['id']}'")
+            seen.add(record["id"])
+            questions.append(record)
+    return questions
+
+
+def completed_ids(path: Path) -> Set[str]:
+    """Ids with a successful record in the output; drops a trailing half-written line"""
+    if not path.exists():
+        return set()
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+    done = set()
+    for line in data.decode("utf-8").splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if record.get("error"):
+            done.discard(record.get("id"))
+        else:
+            done.add(record.get("id"))
+    return done
+
+# ========= Batch Runner =========
+
+async def answer_question(
+    record: Dict[str, Any],
+    limiter: RateLimiter,
+    controller_factory: Optional[Callable[[], ConvergenceController]] = None,
+    **kwargs,
+) -> Dict[str, Any]:
+    """Run one question to its FinalAnswer and build its output record"""
+    controller = controller_factory() if controller_factory is not None else None
+    usage = UsageMetadataCallbackHandler()
+    config = {"callbacks": [RateLimitCallback(limiter), usage], "tags": ["batch", record["id"]]}
+    start = time.perf_counter()
+    final: Optional[FinalAnswer] = None
+    async for event in iter_retgen_events(record["question"], config=config, controller=controller, **kwargs):
+        if isinstance(event, FinalAnswer):
+            final = event
+    totals = list(usage.usage_metadata.values())
+    result = {
+        "id": record["id"],
+        "question": record["question"],
+        "answer": final.answer,
+        **final.stats,
+        "input_tokens": sum(u.get("input_tokens", 0) for u in totals),
+        "output_tokens": sum(u.get("output_tokens", 0) for u in totals),
+        "wall_s": round(time.perf_counter() - start, 3),
+    }
+    if controller is not None:
+        result["decisions"] = [decision.describe() for decision in controller.decisions]
+    return result
+
+
+async def run_batch(
+    questions: List[Dict[str, Any]],
+    output: Path,
+    concurrency: int = 4,
+    limiter: Optional[RateLimiter] = None,
+    **kwargs,
+) -> Dict[str, Any]:
+    """
+    Answer the questions not yet in `output`, appending one record per question.
+
+    At most `concurrency` questions are in flight; other arguments go to
+    iter_retgen_events. Returns a summary of the run.
+    """
+    limiter = limiter or RateLimiter()
+    done = completed_ids(output)
+    pending = [record for record in questions if record["id"] not in done]
+    summary = {
+        "total": len(questions), "skipped": len(questions) - len(pending),
+        "answered": 0, "failed": 0, "tokens": 0, "cost_usd": 0.0,
+    }
+    if not pending:
+        return summary
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for record in pending:
+        queue.put_nowait(record)
+    start = time.perf_counter()
+
+    with open(output, "a", encoding="utf-8") as out:
+        def write(result: Dict[str, Any]) -> None:
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+
+        async def worker() -> None:
+            while not queue.empty():
+                record = queue.get_nowait()
+                try:
+                    result = await answer_question(record, limiter, **kwargs)
+                except Exception as e:
+                    result = {"id": record["id"], "question": record["question"], "error": f"{type(e).__name__}: {e}"}
+                    summary["failed"] += 1
+                else:
+                    summary["answered"] += 1
+                    summary["tokens"] += result["input_tokens"] + result["output_tokens"]
+                    summary["cost_usd"] += result["cost_usd"]
+                write(result)
+                finished = summary["answered"] + summary["failed"]
+                status = result.get("error") or f"{result['stop_reason']}, {result['iterations']} iterations"
+                print(f"[{finished}/{len(pending)}] {record['id']}: {status}")
+
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, len(pending)))))
+
+    summary["wall_s"] = round(time.perf_counter() - start, 1)
+    summary["rate_limited_s"] = round(limiter.waited, 1)
+    return summary
+
+# ========= Main Execution =========
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run ITER-RETGEN over a JSONL file of questions")
+    parser.add_argument("input", type=Path, help='JSONL with {"id": ..., "question": ...} per line')
+    parser.add_argument("output", type=Path, help="JSONL of results; reruns resume from it")
+    parser.add_argument("--concurrency", type=int, default=4, help="Questions in flight at once")
+    parser.add_argument("--rpm", type=float, default=None, help="Global model requests per minute")
+    parser.add_argument("--tpm", type=float, default=None, help="Global model tokens per minute")
+    parser.add_argument("--max-iters", type=int, default=10)
+    parser.add_argument("--mode", choices=["rewrite", "parallel"], default="rewrite")
+    parser.add_argument("--gap-concurrency", type=int, default=8, help="Concurrent gap prompts in parallel mode")
+    parser.add_argument("--edits", action="store_true", help="Request JSON edits instead of full-answer rewrites")
+    parser.add_argument("--tiered", action="store_true", help="Use the tiered per-stage model preset")
+    parser.add_argument("--stage-model", action="append", default=[], metavar="STAGE=MODEL[@TEMP],...",
+                        help="Tiers for one stage (draft, query, fill, expansion), cheapest first; repeatable")
+    parser.add_argument("--token-budget", type=int, default=None, help="Tokens per question (convergence controller)")
+    parser.add_argument("--time-budget", type=float, default=None, help="Seconds per question (convergence controller)")
+    parser.add_argument("--min-gain", type=float, default=None, help="Minimum gaps filled per 1k tokens to keep going")
+    parser.add_argument("--deadline", type=float, default=None, help="Seconds per question before the partial answer is kept")
+    parser.add_argument("--docs", type=Path, default=None, help="Directory of documents for local retrieval")
+    parser.add_argument("--index-path", type=Path, default=None)
+    parser.add_argument("--retriever", choices=["bm25", "vector"], default="bm25")
+    parser.add_argument("--embedder", default="hashing", help="Embedder for --retriever vector")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--gap-cache", type=Path, default=None, help="Gap-fill cache directory (default: .gap-cache)")
+    parser.add_argument("--no-gap-cache", action="store_true")
+    args = parser.parse_args()
+
+    retriever = None
+    if args.docs:
+        retriever, description = open_retriever(args.docs, args.retriever, args.embedder, args.index_path)
+        print(description)
+    cache = None if args.no_gap_cache else GapCache(args.gap_cache or DEFAULT_CACHE_DIR)
+
+    if args.token_budget is not None or args.time_budget is not None or args.min_gain is not None:
+        controller_factory = partial(
+            ConvergenceController,
+            token_budget=args.token_budget, time_budget=args.time_budget,
+            min_gain_per_1k=0.5 if args.min_gain is None else args.min_gain,
+        )
+    else:
+        controller_factory = None
+
+    summary = asyncio.run(run_batch(
+        read_questions(args.input), args.output,
+        concurrency=args.concurrency, limiter=RateLimiter(args.rpm, args.tpm),
+        max_iters=args.max_iters, mode=args.mode, max_concurrency=args.gap_concurrency, edits=args.edits,
+        deadline=args.deadline, retriever=retriever, top_k=args.top_k, cache=cache,
+        controller_factory=controller_factory,
+        models=StageModels.parse(args.stage_model, StageModels.preset() if args.tiered else None),
+    ))
+    print(
+        f"\n{summary['answered']} answered, {summary['failed']} failed, {summary['skipped']} already done "
+        f"of {summary['total']}; {summary['tokens']} tokens (~${summary['cost_usd']:.4f})"
+        + (f" in {summary['wall_s']}s ({summary['rate_limited_s']}s waiting on the rate limiter)" if "wall_s" in summary else "")
+    )
+    if cache is not None:
+        print(f"Gap cache: {cache.stats()}")
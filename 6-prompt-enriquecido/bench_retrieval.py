@@ -0,0 +1,89 @@
+"""
+Benchmark for the local BM25 retrieval backend.
+
+Measures index build, save and load time and query latency over a
+directory of documents. Queries default to typical gap topics produced by
+ITER-RETGEN drafts.
+
+Usage:
+    python bench_retrieval.py --docs repo_langchain_1.0
+    python bench_retrieval.py --docs repo_langchain_1.0 --queries 2000 --top-k 5
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from retrieval import BM25Index, fingerprint
+
+GAP_TOPICS = [
+    "version numbers and release dates",
+    "technical specifications and parameters",
+    "performance metrics and benchmarks",
+    "comparison between LangChain and LangGraph",
+    "implementation details and code examples",
+    "real-world use cases",
+    "limitations and known issues",
+    "future roadmap and upcoming features",
+    "state graph checkpointer persistence",
+    "tool calling agents with memory",
+]
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the BM25 index")
+    parser.add_argument("--docs", type=Path, default=Path("repo_langchain_1.0"))
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    current = fingerprint(args.docs)
+    fingerprint_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = BM25Index.build(args.docs)
+    index.fingerprint = current
+    build_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bm25.pkl"
+        start = time.perf_counter()
+        index.save(path)
+        save_time = time.perf_counter() - start
+        size = path.stat().st_size
+
+        start = time.perf_counter()
+        loaded = BM25Index.load(path)
+        load_time = time.perf_counter() - start
+
+    queries = [f"{GAP_TOPICS[i % len(GAP_TOPICS)]} LangChain LangGraph" for i in range(args.queries)]
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        loaded.search(query, k=args.top_k)
+        latencies.append(time.perf_counter() - start)
+
+    print(f"Documents dir:    {args.docs}")
+    print(f"Passages:         {len(index.passages):,}")
+    print(f"Terms:            {len(index.postings):,}")
+    print(f"Fingerprint:      {fingerprint_time * 1000:.1f} ms")
+    print(f"Build:            {build_time:.2f} s ({len(index.passages) / build_time:,.0f} passages/s)")
+    print(f"Save:             {save_time * 1000:.1f} ms ({size / 1024 / 1024:.1f} MiB)")
+    print(f"Load:             {load_time * 1000:.1f} ms")
+    print(
+        f"Query (k={args.top_k}):      p50 {percentile(latencies, 50) * 1000:.2f} ms, "
+        f"p95 {percentile(latencies, 95) * 1000:.2f} ms, "
+        f"mean {statistics.mean(latencies) * 1000:.2f} ms over {len(latencies)} queries"
+    )
+
+
+if __name__ == "__main__":
+    main()
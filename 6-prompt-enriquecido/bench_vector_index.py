@@ -0,0 +1,92 @@
+"""
+Benchmark for the memmap vector index.
+
+Builds indexes of random unit vectors at each size (appended in chunks, as
+an incremental build would) and measures append throughput and top-k
+cosine query latency for single queries and query batches. The 1M x 256
+index takes about 1 GiB of disk in the temporary directory.
+
+Usage:
+    python bench_vector_index.py
+    python bench_vector_index.py --sizes 100000 1000000 --dim 384 --batch 32 --k 5
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from vector_index import VectorIndex
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def build(directory: Path, size: int, dim: int, chunk: int, rng) -> float:
+    index = VectorIndex.create(directory, dim, "random")
+    start = time.perf_counter()
+    for offset in range(0, size, chunk):
+        count = min(chunk, size - offset)
+        index.add([str(i) for i in range(offset, offset + count)], rng.standard_normal((count, dim), dtype=np.float32))
+    return time.perf_counter() - start
+
+
+def time_queries(index: VectorIndex, queries: np.ndarray, batch: int, k: int):
+    latencies = []
+    for start in range(0, len(queries), batch):
+        began = time.perf_counter()
+        index.search_vectors(queries[start:start + batch], k)
+        latencies.append(time.perf_counter() - began)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the memmap vector index")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--batch", type=int, default=32, help="Queries per batched search")
+    parser.add_argument("--chunk", type=int, default=50_000, help="Vectors per append")
+    parser.add_argument("--dir", type=Path, default=None, help="Where to build the indexes (default: a temp dir)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for size in args.sizes:
+            directory = Path(tmp) / f"bench-{size}"
+            build_time = build(directory, size, args.dim, args.chunk, rng)
+
+            start = time.perf_counter()
+            index = VectorIndex.open(directory)
+            open_time = time.perf_counter() - start
+
+            time_queries(index, queries[:1], 1, args.k)  # warm the page cache
+            single = time_queries(index, queries, 1, args.k)
+            batched = time_queries(index, queries, args.batch, args.k)
+            per_query = [latency / args.batch for latency in batched]
+
+            print(f"\n=== {size:,} vectors x {args.dim} ===")
+            print(f"Append:           {build_time:.2f} s ({size / build_time:,.0f} vectors/s)")
+            print(f"Disk:             {index.vectors_path.stat().st_size / 1024 / 1024:,.0f} MiB vectors")
+            print(f"Open:             {open_time * 1000:.2f} ms")
+            print(
+                f"Query (k={args.k}):      p50 {percentile(single, 50) * 1000:.1f} ms, "
+                f"p95 {percentile(single, 95) * 1000:.1f} ms, mean {statistics.mean(single) * 1000:.1f} ms"
+            )
+            print(
+                f"Batch of {args.batch}:      p50 {percentile(batched, 50) * 1000:.1f} ms per batch, "
+                f"{statistics.mean(per_query) * 1000:.2f} ms per query"
+            )
+            del index
+
+
+if __name__ == "__main__":
+    main()
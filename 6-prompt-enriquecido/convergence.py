@@ -0,0 +1,130 @@
+"""
+Token-budget-aware convergence for ITER-RETGEN.
+
+The fixed heuristics stop on max_iters, on zero gaps or after 3 rounds
+without progress, and expand in the first two iterations whatever it
+costs. The controller instead tracks the tokens and time spent per fill
+round and the marginal gain (gaps filled per 1k tokens) over the last
+rounds, and before each round or expansion pass decides whether it is
+worth paying for:
+
+    next_round()   stop when the expected round cost does not fit the
+                   remaining token/time budget, or the gain fell below
+                   min_gain_per_1k
+    expansion()    expand only while the gain is good, the expansion
+                   limit is not reached and an expansion plus one fill
+                   round fit the budget
+
+Every decision is returned as a Decision (and yielded by the event
+stream), so runs can be audited afterwards.
+
+Usage:
+    controller = ConvergenceController(token_budget=20_000, min_gain_per_1k=0.3)
+    async for event in iter_retgen_events(question, controller=controller):
+        ...
+    for decision in controller.decisions:
+        print(decision.describe())
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+CONTINUE = "continue"
+STOP = "stop"
+EXPAND = "expand"
+SKIP_EXPANSION = "skip_expansion"
+
+
+@dataclass
+class Decision:
+    iteration: int
+    action: str
+    reason: str
+    tokens: int
+    elapsed: float
+    gain_per_1k: Optional[float] = None
+
+    def describe(self) -> str:
+        gain = "n/a" if self.gain_per_1k is None else f"{self.gain_per_1k:.2f}"
+        return (
+            f"iteration {self.iteration}: {self.action} ({self.reason}) "
+            f"tokens={self.tokens} elapsed={self.elapsed:.1f}s gain/1k={gain}"
+        )
+
+
+@dataclass
+class Round:
+    """One fill iteration: gaps closed and what it cost"""
+    filled: int
+    tokens: int
+    seconds: float
+
+
+@dataclass
+class ConvergenceController:
+    token_budget: Optional[int] = None
+    time_budget: Optional[float] = None
+    min_gain_per_1k: float = 0.5
+    window: int = 2
+    max_expansions: int = 1
+    rounds: List[Round] = field(default_factory=list)
+    decisions: List[Decision] = field(default_factory=list)
+    expansions: int = 0
+
+    def record(self, filled: int, tokens: int, seconds: float) -> None:
+        self.rounds.append(Round(filled, tokens, seconds))
+
+    def gain_per_1k(self) -> Optional[float]:
+        """Gaps filled per 1k tokens over the last `window` rounds (None before the first)"""
+        recent = self.rounds[-self.window:]
+        if not recent:
+            return None
+        filled = sum(r.filled for r in recent)
+        tokens = sum(r.tokens for r in recent)
+        if not tokens:
+            return math.inf if filled else 0.0
+        return filled * 1000 / tokens
+
+    def round_cost(self) -> Tuple[float, float]:
+        """Expected (tokens, seconds) of the next round: the mean of the recent ones"""
+        recent = self.rounds[-self.window:]
+        if not recent:
+            return 0.0, 0.0
+        return sum(r.tokens for r in recent) / len(recent), sum(r.seconds for r in recent) / len(recent)
+
+    def _over_budget(self, tokens: int, elapsed: float, rounds: int) -> Optional[str]:
+        cost_tokens, cost_seconds = self.round_cost()
+        if self.token_budget is not None and tokens + rounds * cost_tokens > self.token_budget:
+            return "token_budget"
+        if self.time_budget is not None and elapsed + rounds * cost_seconds > self.time_budget:
+            return "time_budget"
+        return None
+
+    def _decide(self, iteration: int, action: str, reason: str, tokens: int, elapsed: float) -> Decision:
+        decision = Decision(iteration, action, reason, tokens, elapsed, self.gain_per_1k())
+        self.decisions.append(decision)
+        return decision
+
+    def next_round(self, iteration: int, tokens: int, elapsed: float) -> Decision:
+        """Whether to run another fill round"""
+        over = self._over_budget(tokens, elapsed, rounds=1)
+        if over:
+            return self._decide(iteration, STOP, over, tokens, elapsed)
+        gain = self.gain_per_1k()
+        if gain is not None and gain < self.min_gain_per_1k:
+            return self._decide(iteration, STOP, "low_gain", tokens, elapsed)
+        return self._decide(iteration, CONTINUE, "within_budget", tokens, elapsed)
+
+    def expansion(self, iteration: int, tokens: int, elapsed: float) -> Decision:
+        """Whether an expansion pass (and the fill round it calls for) is worth paying for"""
+        if self.expansions >= self.max_expansions:
+            return self._decide(iteration, SKIP_EXPANSION, "expansion_limit", tokens, elapsed)
+        gain = self.gain_per_1k()
+        if gain is not None and gain < self.min_gain_per_1k:
+            return self._decide(iteration, SKIP_EXPANSION, "low_gain", tokens, elapsed)
+        over = self._over_budget(tokens, elapsed, rounds=2)
+        if over:
+            return self._decide(iteration, SKIP_EXPANSION, over, tokens, elapsed)
+        self.expansions += 1
+        return self._decide(iteration, EXPAND, "worth_expanding", tokens, elapsed)
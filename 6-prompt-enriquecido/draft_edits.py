@@ -0,0 +1,115 @@
+"""
+Structured edits for ITER-RETGEN drafts.
+
+Instead of rewriting the whole answer, the model returns a JSON list of edits
+against a draft whose markers are numbered ([MISSING#1: ...]):
+
+    [
+      {"op": "replace", "marker": 1, "text": "LangChain 1.0 was released in ..."},
+      {"op": "insert_after", "anchor": "exact text from the draft", "text": " [MISSING: ...]"}
+    ]
+
+Edits are validated and applied locally; any problem raises EditError so the
+caller can fall back to a full rewrite.
+"""
+
+import itertools
+import json
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+MISSING_MARKER = re.compile(r"\[MISSING:\s*([^\]]+?)\s*\]")
+OPERATIONS = ("replace", "insert_after")
+
+
+class EditError(ValueError):
+    """The edits could not be parsed, validated or applied"""
+
+
+@dataclass
+class Edit:
+    op: str
+    text: str
+    marker: Optional[int] = None
+    anchor: Optional[str] = None
+
+
+def number_markers(draft: str) -> str:
+    """The draft with each marker shown as [MISSING#<id>: topic], ids from 1 in order"""
+    counter = itertools.count(1)
+    return MISSING_MARKER.sub(lambda m: f"[MISSING#{next(counter)}: {m.group(1)}]", draft)
+
+
+def parse_edits(output: str) -> List[Edit]:
+    """Parse the model output (optionally inside a ```json fence) into edits"""
+    text = output.strip()
+    fenced = re.match(r"^```(?:json)?\s*(.*?)\s*```$", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        payload = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise EditError(f"Edits are not valid JSON: {e}") from e
+    if isinstance(payload, dict) and isinstance(payload.get("edits"), list):
+        payload = payload["edits"]
+    if not isinstance(payload, list):
+        raise EditError("Edits must be a JSON list")
+
+    edits = []
+    for i, item in enumerate(payload):
+        if not isinstance(item, dict) or item.get("op") not in OPERATIONS or not isinstance(item.get("text"), str):
+            raise EditError(f"Edit {i} must have op in {OPERATIONS} and a text string: {item}")
+        if item["op"] == "replace" and not isinstance(item.get("marker"), int):
+            raise EditError(f"Edit {i} (replace) needs an integer marker id")
+        if item["op"] == "insert_after" and not (isinstance(item.get("anchor"), str) and item["anchor"]):
+            raise EditError(f"Edit {i} (insert_after) needs a non-empty anchor")
+        edits.append(Edit(op=item["op"], text=item["text"], marker=item.get("marker"), anchor=item.get("anchor")))
+    return edits
+
+
+def resolve_edits(draft: str, edits: List[Edit], allow_new_markers: bool = False) -> List[Tuple[int, int, str]]:
+    """
+    Turn edits into non-overlapping (start, end, text) splices on the draft.
+
+    Marker ids must exist, anchors must occur exactly once, and unless
+    allow_new_markers is set no edit may introduce a [MISSING:] marker.
+    """
+    markers = [match.span() for match in MISSING_MARKER.finditer(draft)]
+    splices = []
+    for edit in edits:
+        if not allow_new_markers and "[MISSING" in edit.text:
+            raise EditError(f"Edit adds a new marker: {edit.text[:80]}")
+        if edit.op == "replace":
+            if not 1 <= edit.marker <= len(markers):
+                raise EditError(f"Unknown marker id {edit.marker} (draft has {len(markers)})")
+            start, end = markers[edit.marker - 1]
+            splices.append((start, end, edit.text))
+        else:
+            count = draft.count(edit.anchor)
+            if count != 1:
+                raise EditError(f"Anchor found {count} times, expected once: {edit.anchor[:80]}")
+            position = draft.index(edit.anchor) + len(edit.anchor)
+            splices.append((position, position, edit.text))
+
+    splices.sort(key=lambda splice: (splice[0], splice[1]))
+    for (_, previous_end, _), (start, _, _) in zip(splices, splices[1:]):
+        if start < previous_end:
+            raise EditError("Edits overlap")
+    return splices
+
+
+def apply_splices(draft: str, splices: List[Tuple[int, int, str]]) -> str:
+    parts = []
+    cursor = 0
+    for start, end, text in splices:
+        parts.append(draft[cursor:start])
+        parts.append(text)
+        cursor = end
+    parts.append(draft[cursor:])
+    return "".join(parts)
+
+
+def apply_edits(draft: str, edits: List[Edit], allow_new_markers: bool = False) -> str:
+    """Validate and apply edits; raises EditError without touching the draft on failure"""
+    return apply_splices(draft, resolve_edits(draft, edits, allow_new_markers))
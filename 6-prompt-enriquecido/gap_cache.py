@@ -0,0 +1,108 @@
+"""
+Persistent cache of gap fills shared across iterations and questions.
+
+A fill is stored under the normalized gap topic plus a hash of the context it
+was produced from: the retrieved passages when a local index is used, or the
+question itself otherwise (a topic such as "version numbers" means different
+things for different questions). Without --docs, fills are therefore only
+reused by later rounds and runs of the same question; sharing fills across
+questions needs a retriever, so that the key depends on the passages alone.
+Fills are recorded in every mode: parallel, --edits, and full rewrites (where
+the fill is read back from the rewritten draft). Entries carry their
+provenance and expire after a TTL. Each entry is one JSON file, written atomically, so several
+processes can share the directory.
+
+Usage:
+    cache = GapCache(".gap-cache", ttl=7 * 24 * 3600)
+    context = context_hash(passages_text)
+    fill = cache.get("version numbers", context)
+    if fill is None:
+        cache.put("version numbers", context, text, {"question": question, "model": "gpt-4o-mini"})
+    print(cache.stats())
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from gap_index import topic_words
+
+DEFAULT_CACHE_DIR = Path(__file__).parent / ".gap-cache"
+
+
+def normalize_topic(topic: str) -> str:
+    return " ".join(sorted(topic_words(topic)))
+
+
+def context_hash(text: str) -> str:
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class CachedFill:
+    topic: str
+    context: str
+    text: str
+    created_at: float
+    provenance: Dict[str, Any] = field(default_factory=dict)
+
+
+class GapCache:
+    """Gap fills on disk keyed by (normalized topic, context hash)"""
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR, ttl: float = 7 * 24 * 3600, clock: Callable[[], float] = time.time):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.clock = clock
+        self.counters = {"lookups": 0, "hits": 0, "misses": 0, "expired": 0, "stores": 0, "saved_calls": 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(topic: str, context: str) -> str:
+        return hashlib.sha256(f"{normalize_topic(topic)}|{context}".encode("utf-8")).hexdigest()
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += amount
+
+    def get(self, topic: str, context: str) -> Optional[CachedFill]:
+        self._count("lookups")
+        path = self.cache_dir / f"{self.key(topic, context)}.json"
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = CachedFill(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            self._count("misses")
+            return None
+        if self.clock() - entry.created_at > self.ttl:
+            self._count("expired")
+            self._count("misses")
+            return None
+        self._count("hits")
+        return entry
+
+    def put(self, topic: str, context: str, text: str, provenance: Optional[Dict[str, Any]] = None) -> CachedFill:
+        entry = CachedFill(topic=topic, context=context, text=text, created_at=self.clock(), provenance=provenance or {})
+        path = self.cache_dir / f"{self.key(topic, context)}.json"
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(entry), f, ensure_ascii=False)
+        os.replace(tmp, path)
+        self._count("stores")
+        return entry
+
+    def record_saved_calls(self, calls: int) -> None:
+        """Model calls skipped thanks to cached fills"""
+        self._count("saved_calls", calls)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        counters["hit_rate"] = round(counters["hits"] / counters["lookups"], 3) if counters["lookups"] else 0.0
+        return counters
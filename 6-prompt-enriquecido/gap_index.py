@@ -0,0 +1,198 @@
+"""
+Structured index of the [MISSING: ...] gaps of an ITER-RETGEN draft.
+
+Each marker becomes a Gap record with id, topic, span and status. Topics that
+are near-identical to an open gap (same normalized words, or Jaccard
+similarity above a threshold) are recorded as duplicates of it, and every
+status change is kept in the gap's history with its iteration number.
+
+The index follows the draft in two ways:
+    apply(splices)      incremental: the (start, end, text) splices applied to
+                        the draft close the gaps they replace, register markers
+                        in inserted text and shift the spans after them; only
+                        the changed text is scanned
+    reconcile(draft)    after a full rewrite: markers are matched back to gaps
+                        by topic, so filled, kept and reworded gaps are told apart
+"""
+
+import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from draft_edits import MISSING_MARKER
+
+WORD = re.compile(r"[^\W_]+")
+STOPWORDS = frozenset("a an and are as at be by for from in is of on or the to with".split())
+
+OPEN = "open"
+DUPLICATE = "duplicate"
+FILLED = "filled"
+
+
+def topic_words(topic: str) -> frozenset:
+    """Normalized words of a topic: lowercased, stopwords dropped, plural "s" stripped"""
+    words = (word for word in WORD.findall(topic.lower()) if word not in STOPWORDS)
+    return frozenset(word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word for word in words)
+
+
+def similarity(a: frozenset, b: frozenset) -> float:
+    """Jaccard similarity of two word sets"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class Gap:
+    id: int
+    topic: str
+    span: Tuple[int, int]
+    status: str = OPEN
+    duplicate_of: Optional[int] = None
+    history: List[Tuple[int, str]] = field(default_factory=list)
+
+    @property
+    def words(self) -> frozenset:
+        return topic_words(self.topic)
+
+    @property
+    def in_draft(self) -> bool:
+        return self.status in (OPEN, DUPLICATE)
+
+
+class GapIndex:
+    """Gaps of one draft, in document order"""
+
+    def __init__(self, draft: str = "", threshold: float = 0.8, iteration: int = 0):
+        self.threshold = threshold
+        self.gaps: Dict[int, Gap] = {}
+        self._next_id = 1
+        for match in MISSING_MARKER.finditer(draft):
+            self._add(match.group(1), match.span(), iteration, "found")
+
+    # ----- queries -----
+
+    def in_draft(self) -> List[Gap]:
+        """Gaps whose marker is still in the draft (open and duplicates), by position"""
+        return sorted((gap for gap in self.gaps.values() if gap.in_draft), key=lambda gap: gap.span)
+
+    def open(self) -> List[Gap]:
+        """Distinct open gaps (duplicates excluded), by position"""
+        return [gap for gap in self.in_draft() if gap.status == OPEN]
+
+    def counts(self) -> Dict[str, int]:
+        counts = {OPEN: 0, DUPLICATE: 0, FILLED: 0, "reworded": 0}
+        for gap in self.gaps.values():
+            counts[gap.status] += 1
+            if any(event.startswith("reworded") for _, event in gap.history):
+                counts["reworded"] += 1
+        return counts
+
+    def filled_in(self, iteration: int) -> List[Gap]:
+        """Gaps closed during the given iteration"""
+        return [
+            gap for gap in self.gaps.values()
+            if gap.status == FILLED and gap.history and gap.history[-1] == (iteration, FILLED)
+        ]
+
+    def markers(self, gap: Gap) -> List[Gap]:
+        """A gap and its duplicates"""
+        return [gap] + [other for other in self.in_draft() if other.duplicate_of == gap.id]
+
+    # ----- updates -----
+
+    def _canonical_for(self, words: frozenset) -> Optional[Gap]:
+        best, best_score = None, self.threshold
+        for gap in self.gaps.values():
+            if gap.status != OPEN:
+                continue
+            score = similarity(words, gap.words)
+            if score >= best_score:
+                best, best_score = gap, score
+        return best
+
+    def _add(self, topic: str, span: Tuple[int, int], iteration: int, event: str) -> Gap:
+        gap = Gap(id=self._next_id, topic=topic, span=span)
+        self._next_id += 1
+        canonical = self._canonical_for(gap.words)
+        if canonical is not None:
+            gap.status = DUPLICATE
+            gap.duplicate_of = canonical.id
+            event = f"{event} (duplicate of #{canonical.id})"
+        gap.history.append((iteration, event))
+        self.gaps[gap.id] = gap
+        return gap
+
+    def _close(self, gap: Gap, iteration: int) -> None:
+        gap.status = FILLED
+        gap.history.append((iteration, FILLED))
+        # A duplicate left behind becomes the open gap for its topic
+        heirs = [other for other in self.in_draft() if other.duplicate_of == gap.id]
+        if heirs:
+            heir = heirs[0]
+            heir.status, heir.duplicate_of = OPEN, None
+            heir.history.append((iteration, f"promoted (#{gap.id} filled)"))
+            for other in heirs[1:]:
+                other.duplicate_of = heir.id
+
+    def _close_all(self, gaps: Iterable[Gap], iteration: int) -> None:
+        # Duplicates first, so a canonical gap closed in the same step has no heir to promote
+        for gap in sorted(gaps, key=lambda gap: gap.status != DUPLICATE):
+            self._close(gap, iteration)
+
+    def apply(self, splices: Iterable[Tuple[int, int, str]], iteration: int) -> None:
+        """
+        Follow (start, end, text) splices applied to the draft, given in
+        original coordinates and sorted by position.
+        """
+        by_span = {gap.span: gap for gap in self.gaps.values() if gap.in_draft}
+        replaced: List[Gap] = []
+        ends: List[int] = []
+        shifts: List[int] = []  # cumulative shift for positions at or after ends[i]
+        added: List[Tuple[str, Tuple[int, int]]] = []
+        shift = 0
+        for start, end, text in splices:
+            if (start, end) in by_span:
+                replaced.append(by_span[(start, end)])
+            for match in MISSING_MARKER.finditer(text):
+                offset = start + shift
+                added.append((match.group(1), (offset + match.start(), offset + match.end())))
+            shift += len(text) - (end - start)
+            ends.append(end)
+            shifts.append(shift)
+
+        self._close_all(replaced, iteration)
+        if shift or ends:
+            for gap in self.in_draft():
+                i = bisect_right(ends, gap.span[0]) - 1
+                if i >= 0 and shifts[i]:
+                    gap.span = (gap.span[0] + shifts[i], gap.span[1] + shifts[i])
+        for topic, span in added:
+            self._add(topic, span, iteration, "added")
+
+    def reconcile(self, draft: str, iteration: int) -> None:
+        """Match the markers of a rewritten draft back to the known gaps"""
+        pending = {gap.id: gap for gap in self.in_draft()}
+        unmatched = []
+        for match in MISSING_MARKER.finditer(draft):
+            topic, span = match.group(1), match.span()
+            same = next((gap for gap in pending.values() if gap.topic == topic), None)
+            if same is not None:
+                same.span = span
+                del pending[same.id]
+            else:
+                unmatched.append((topic, span))
+
+        for topic, span in unmatched:
+            words = topic_words(topic)
+            candidates = [(similarity(words, gap.words), gap) for gap in pending.values()]
+            score, gap = max(candidates, key=lambda item: item[0], default=(0.0, None))
+            if gap is not None and score >= self.threshold / 2:
+                gap.history.append((iteration, f"reworded from '{gap.topic}'"))
+                gap.topic, gap.span = topic, span
+                del pending[gap.id]
+            else:
+                self._add(topic, span, iteration, "added")
+
+        self._close_all(pending.values(), iteration)
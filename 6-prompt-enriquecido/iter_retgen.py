@@ -0,0 +1,900 @@
+"""
+ITER-RETGEN engine: iterative retrieval and generation as an async stream of events.
+
+iter_retgen_events() drafts an answer with [MISSING: ...] markers and fills
+them over several rounds, yielding typed events as it goes:
+
+    DraftCreated       the initial draft
+    GapsFound          the open gaps at the start of the run and after an expansion
+    GapFilled          a gap replaced by a cached or generated fill
+    Notice             progress details (retrieved passages, rejected edits, ...)
+    IterationFinished  the draft and gap counts after each round
+    Decision           a convergence controller decision (see convergence.py)
+    FinalAnswer        the answer, the stats and why the run stopped (always last)
+
+Model calls are awaited, so many questions can share one event loop
+(see iter_retgen_many). A run stops early when its deadline passes or its
+stop event is set, and still yields a FinalAnswer with the partial draft;
+cancelling the consuming task cancels the in-flight model calls.
+
+Usage:
+    async for event in iter_retgen_events("Explain LangGraph", deadline=60):
+        if isinstance(event, FinalAnswer):
+            print(event.answer)
+"""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from itertools import accumulate
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from dotenv import load_dotenv
+from langchain.chat_models import init_chat_model
+from langchain_core.callbacks import UsageMetadataCallbackHandler, get_usage_metadata_callback
+from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import RunnableConfig
+from langchain_core.output_parsers import StrOutputParser
+
+from convergence import ConvergenceController, Decision
+from draft_edits import MISSING_MARKER, EditError, apply_splices, number_markers, parse_edits, resolve_edits
+from gap_cache import GapCache, context_hash
+from gap_index import FILLED, Gap, GapIndex
+from model_tiers import DEFAULT_MODEL, DEFAULT_TEMPERATURE, StageFailed, StageModels, StageReport, StageRunner
+from retrieval import SearchHit, format_gap_passages, search_gaps
+
+# Load environment variables
+load_dotenv()
+
+# Model and temperature are picked per call by the stage tiers (model_tiers.py)
+llm = init_chat_model(DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE, configurable_fields=("model", "temperature"))
+
+# ========= Enhanced Prompt Templates =========
+
+# Prompt to generate initial draft with MANY specific gaps
+draft_prompt = PromptTemplate(
+    input_variables=["question"],
+    template=(
+        "You are an expert assistant with limited initial knowledge.\n"
+        "Answer the following question, but you MUST mark MANY specific details as missing.\n"
+        "Use [MISSING: ...] markers for:\n"
+        "- Specific version numbers and release dates\n"
+        "- Technical specifications and parameters\n"
+        "- Performance metrics and benchmarks\n"
+        "- Comparison data between different versions\n"
+        "- Implementation details and code examples\n"
+        "- Real-world use cases and case studies\n"
+        "- Limitations and known issues\n"
+        "- Future roadmap and upcoming features\n\n"
+        "Be thorough in identifying what specific information would make the answer complete.\n"
+        "Start with a basic overview but mark MANY specific details as missing.\n\n"
+        "Do not generate more than 5 MISSING Markers."
+        "Question: {question}\n\n"
+        "Answer:"
+    ),
+)
+
+# Prompt to generate queries from gaps - now more specific
+query_prompt = PromptTemplate(
+    input_variables=["draft"],
+    template=(
+        "You received the following draft with gaps:\n{draft}\n\n"
+        "For each [MISSING: ...] marker, provide information to fill that gap.\n"
+        "Format each as: 'For [MISSING: topic]: provide the actual information'\n"
+        "Be specific and provide real data when possible.\n"
+        "Example: 'For [MISSING: version numbers]: LangChain is at version 0.1.0, LangGraph at 0.2.0'\n"
+        "List information for each gap, maximum 5 items."
+    ),
+)
+
+# Prompt to fill gaps gradually based on complexity
+fill_prompt = PromptTemplate(
+    input_variables=["question", "draft", "queries", "iteration"],
+    template=(
+        "Original question: {question}\n\n"
+        "Current draft (iteration {iteration}):\n{draft}\n\n"
+        "Information to help fill the gaps:\n{queries}\n\n"
+        "CRITICAL INSTRUCTIONS:\n"
+        "1. You MUST replace AT LEAST 1-2 [MISSING: ...] markers with concrete information\n"
+        "2. ACTUALLY REPLACE the text '[MISSING: xyz]' with real content - don't keep the marker\n"
+        "3. Use the information above to guide what content to add\n"
+        "4. Do NOT add any new [MISSING:] markers - only fill or keep existing ones\n"
+        "5. If you cannot fill a gap with certainty, keep it as [MISSING: ...]\n\n"
+        "Example of what to do:\n"
+        "- WRONG: '[MISSING: version numbers and release dates]' (keeping the marker)\n"
+        "- RIGHT: 'LangChain version 0.1.0 was released in January 2024' (replacing with content)\n\n"
+        "Important: This is iteration {iteration}. You MUST make progress by filling gaps.\n\n"
+        "Rewrite the ENTIRE answer with the [MISSING:] markers replaced:"
+    ),
+)
+
+# New prompt to identify additional gaps after filling
+expansion_prompt = PromptTemplate(
+    input_variables=["draft"],
+    template=(
+        "Review this draft answer:\n{draft}\n\n"
+        "Identify areas that could benefit from MORE specific information.\n"
+        "Add new [MISSING: ...] markers for:\n"
+        "- Technical details that were glossed over\n"
+        "- Specific examples that would clarify concepts\n"
+        "- Comparative data that would add context\n"
+        "- Implementation specifics that developers would need\n\n"
+        "Return the same text but with ADDITIONAL [MISSING: ...] markers for deeper details:"
+    ),
+)
+
+# Small targeted prompt to fill ONE gap (parallel mode)
+gap_fill_prompt = PromptTemplate(
+    input_variables=["question", "topic", "context", "information"],
+    template=(
+        "Original question: {question}\n\n"
+        "A draft answer contains the marker [MISSING: {topic}] in this passage:\n"
+        "...{context}...\n\n"
+        "Information that may help:\n{information}\n\n"
+        "Write ONLY the text that should replace the marker, so that the passage reads naturally.\n"
+        "Be concrete and concise (1-3 sentences). Do not add any [MISSING:] markers.\n"
+        "If you cannot fill this gap with certainty, answer exactly: UNKNOWN"
+    ),
+)
+
+# Patch-based variants: return JSON edits instead of the entire answer
+fill_edits_prompt = PromptTemplate(
+    input_variables=["question", "draft", "queries", "iteration"],
+    template=(
+        "Original question: {question}\n\n"
+        "Current draft (iteration {iteration}); gaps are numbered [MISSING#id: topic]:\n{draft}\n\n"
+        "Information to help fill the gaps:\n{queries}\n\n"
+        "Replace every gap you can fill with concrete information.\n"
+        "Do NOT rewrite the answer. Return ONLY a JSON list of edits, for example:\n"
+        '[{{"op": "replace", "marker": 1, "text": "LangChain 1.0 was released in October 2025"}}]\n'
+        "Rules: one edit per filled gap, the text replaces the whole marker and reads naturally in place, "
+        "no new [MISSING:] markers, omit gaps you cannot fill with certainty. Return [] if none."
+    ),
+)
+
+expansion_edits_prompt = PromptTemplate(
+    input_variables=["draft"],
+    template=(
+        "Review this draft answer:\n{draft}\n\n"
+        "Identify areas that could benefit from MORE specific information "
+        "(technical details, examples, comparative data, implementation specifics).\n"
+        "Do NOT rewrite the answer. Return ONLY a JSON list of insertions, for example:\n"
+        '[{{"op": "insert_after", "anchor": "exact text copied from the draft", "text": " [MISSING: benchmark numbers]"}}]\n'
+        "Each anchor must be copied verbatim and appear exactly once in the draft. Return [] if nothing is missing."
+    ),
+)
+
+# ========= Create Runnable Chains =========
+
+draft_chain = draft_prompt | llm | StrOutputParser()
+query_chain = query_prompt | llm | StrOutputParser()
+fill_chain = fill_prompt | llm | StrOutputParser()
+expansion_chain = expansion_prompt | llm | StrOutputParser()
+gap_fill_chain = gap_fill_prompt | llm | StrOutputParser()
+fill_edits_chain = fill_edits_prompt | llm | StrOutputParser()
+expansion_edits_chain = expansion_edits_prompt | llm | StrOutputParser()
+
+# ========= Events =========
+
+@dataclass
+class DraftCreated:
+    draft: str
+
+
+@dataclass
+class GapsFound:
+    iteration: int
+    gaps: List[Gap]
+    duplicates: int = 0
+
+
+@dataclass
+class GapFilled:
+    iteration: int
+    gap: Gap
+    text: Optional[str]  # None when the gap disappeared in a full rewrite
+    source: str  # "model" or "cache"
+
+
+@dataclass
+class Notice:
+    iteration: int
+    message: str
+
+
+@dataclass
+class IterationFinished:
+    iteration: int
+    draft: str
+    filled: int
+    counts: Dict[str, int]
+
+
+@dataclass
+class FinalAnswer:
+    answer: str
+    stats: Dict[str, Any] = field(default_factory=dict)
+    # complete, no_progress, unfillable, max_iters, deadline, cancelled,
+    # or a controller stop: token_budget, time_budget, low_gain
+    reason: str = "max_iters"
+    stages: Optional[StageReport] = None
+
+
+Event = Union[DraftCreated, GapsFound, GapFilled, Notice, IterationFinished, Decision, FinalAnswer]
+
+
+class DeadlineExceeded(Exception):
+    """The run's deadline passed while a model call was in flight"""
+
+# ========= Validation =========
+
+MAX_DRAFT_MARKERS = 5
+
+
+def count_markers(text: str) -> int:
+    return len(MISSING_MARKER.findall(text))
+
+
+def validate_draft(output: str) -> Optional[str]:
+    # A draft without markers is fine: the model knew enough, and the expansion pass may still add gaps
+    markers = count_markers(output)
+    if not output.strip():
+        return "empty draft"
+    if markers > MAX_DRAFT_MARKERS:
+        return f"{markers} markers (at most {MAX_DRAFT_MARKERS})"
+    return None
+
+
+def validate_queries(output: str) -> Optional[str]:
+    return None if "MISSING" in output else "no 'For [MISSING: topic]' lines"
+
+
+def validate_gap_fill(output: str) -> Optional[str]:
+    if not output.strip():
+        return "empty fill"
+    return "fill contains a [MISSING:] marker" if "[MISSING" in output else None
+
+
+def validate_fill(draft: str) -> Callable[[str], Optional[str]]:
+    def validate(output: str) -> Optional[str]:
+        if not output.strip():
+            return "empty rewrite"
+        if count_markers(output) > count_markers(draft):
+            return "fill added new [MISSING:] markers"
+        return None
+    return validate
+
+
+def validate_expansion(draft: str) -> Callable[[str], Optional[str]]:
+    def validate(output: str) -> Optional[str]:
+        return "expansion dropped most of the draft" if len(output.strip()) < len(draft.strip()) // 2 else None
+    return validate
+
+
+def validate_edits(draft: str, allow_new_markers: bool = False) -> Callable[[str], Optional[str]]:
+    def validate(output: str) -> Optional[str]:
+        try:
+            resolve_edits(draft, parse_edits(output), allow_new_markers)
+        except EditError as e:
+            return str(e)
+        return None
+    return validate
+
+# ========= Gap Filling =========
+
+async def fill_gaps_parallel(
+    question: str,
+    draft: str,
+    gaps: GapIndex,
+    passages: Optional[Dict[str, List[SearchHit]]] = None,
+    max_concurrency: int = 8,
+    context_chars: int = 300,
+    skip: Optional[Set[int]] = None,
+    runner: Optional[StageRunner] = None,
+) -> Tuple[str, Dict[int, str], List[Tuple[int, int, str]]]:
+    """
+    Fill every open gap with its own small prompt, concurrently, and splice the results back.
+
+    A gap's duplicates get the same fill. Fills that still contain a marker
+    are retried on the next fill tier; gaps answered with UNKNOWN (or
+    rejected on every tier) keep their marker, and gap ids in `skip` are
+    not asked again. `passages` are the retrieved hits by topic.
+
+    Returns:
+        The updated draft, the fills by gap id and the splices applied
+    """
+    targets = [gap for gap in gaps.open() if not skip or gap.id not in skip]
+    if not targets:
+        return draft, {}, []
+
+    passages = passages or {}
+    inputs = []
+    for gap in targets:
+        start, end = gap.span
+        inputs.append({
+            "question": question,
+            "topic": gap.topic,
+            "context": draft[max(0, start - context_chars):end + context_chars],
+            "information": format_gap_passages({gap.topic: passages[gap.topic]}) if gap.topic in passages else "(none)",
+        })
+
+    runner = runner or StageRunner()
+    outputs = await runner.batch("fill", gap_fill_chain, inputs, validate_gap_fill, max_concurrency)
+    fills = {
+        gap.id: text.strip()
+        for gap, text in zip(targets, outputs)
+        if text.strip() and text.strip() != "UNKNOWN" and "[MISSING:" not in text
+    }
+    splices = sorted(
+        (*marker.span, fills[gap.id])
+        for gap in targets if gap.id in fills
+        for marker in gaps.markers(gap)
+    )
+    return apply_splices(draft, splices), fills, splices
+
+# ========= Gap Cache =========
+
+def gap_context(question: str, hits: Optional[List[SearchHit]]) -> str:
+    """Context a fill depends on: the retrieved passages, or the question without retrieval"""
+    if hits is None:
+        return context_hash(f"question: {question}")
+    return context_hash("\n".join(f"{hit.passage.source}:{hit.passage.start_line}\n{hit.passage.text}" for hit in hits))
+
+
+def serve_cached_fills(
+    question: str,
+    draft: str,
+    gaps: GapIndex,
+    cache: GapCache,
+    passages: Optional[Dict[str, List[SearchHit]]],
+) -> Tuple[str, Dict[int, str], List[Tuple[int, int, str]]]:
+    """
+    Splice cached fills into the open gaps (and their duplicates) before any model call.
+
+    Returns:
+        The updated draft, the served fills by gap id and the splices applied
+    """
+    served = {}
+    splices = []
+    for gap in gaps.open():
+        entry = cache.get(gap.topic, gap_context(question, passages.get(gap.topic) if passages is not None else None))
+        if entry is not None:
+            served[gap.id] = entry.text
+            splices.extend((*marker.span, entry.text) for marker in gaps.markers(gap))
+    splices.sort()
+    return apply_splices(draft, splices), served, splices
+
+
+def store_fills(
+    question: str,
+    cache: GapCache,
+    gaps: GapIndex,
+    fills: Dict[int, str],
+    passages: Optional[Dict[str, List[SearchHit]]],
+    mode: str,
+    model: str = DEFAULT_MODEL,
+) -> None:
+    """Cache fills (by gap id) under their topic, with their provenance"""
+    for gap_id, text in fills.items():
+        topic = gaps.gaps[gap_id].topic
+        hits = passages.get(topic) if passages is not None else None
+        cache.put(topic, gap_context(question, hits), text, {
+            "question": question,
+            "model": model,
+            "mode": mode,
+            "sources": [f"{hit.passage.source}:{hit.passage.start_line}" for hit in hits or []],
+        })
+
+
+def fills_from_splices(gaps: GapIndex, splices: List[Tuple[int, int, str]]) -> Dict[int, str]:
+    """Gap id -> replacement for splices that replace a gap marker (before gaps.apply)"""
+    by_span = {gap.span: gap for gap in gaps.in_draft()}
+    return {
+        by_span[(start, end)].id: text
+        for start, end, text in splices
+        if (start, end) in by_span and "[MISSING" not in text
+    }
+
+
+# Markers stay whole and punctuation is kept apart, so a fill never swallows a trailing period
+DIFF_TOKEN = re.compile(rf"{MISSING_MARKER.pattern}|\w+|[^\w\s]|\s+")
+
+
+def fills_from_rewrite(gaps: GapIndex, draft: str, rewritten: str) -> Dict[int, str]:
+    """
+    Gap id -> text that took a marker's place in a full rewrite (before gaps.reconcile).
+
+    The drafts are aligned word by word; a marker counts as filled only when the
+    words around it survived the rewrite, so reworded passages yield nothing.
+    """
+    old_words = [match.group() for match in DIFF_TOKEN.finditer(draft)]
+    new_words = [match.group() for match in DIFF_TOKEN.finditer(rewritten)]
+    old_offsets = [0, *accumulate(map(len, old_words))]
+    new_offsets = [0, *accumulate(map(len, new_words))]
+
+    markers = gaps.in_draft()
+    fills = {}
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, old_words, new_words, autojunk=False).get_opcodes():
+        if tag == "equal":
+            continue
+        start, end = old_offsets[i1], old_offsets[i2]
+        inside = [gap for gap in markers if start <= gap.span[0] and gap.span[1] <= end]
+        if len(inside) != 1:
+            continue
+        gap = inside[0]
+        before, after = draft[start:gap.span[0]], draft[gap.span[1]:end]
+        replacement = rewritten[new_offsets[j1]:new_offsets[j2]]
+        if len(replacement) < len(before) + len(after):
+            continue
+        if not (replacement.startswith(before) and replacement.endswith(after)):
+            continue
+        text = replacement[len(before):len(replacement) - len(after)].strip()
+        if text and "[MISSING" not in text:
+            fills[gap.id] = text
+    return fills
+
+# ========= Draft Updates =========
+
+async def fill_draft(
+    question: str, draft: str, queries: str, iteration: int, use_edits: bool, log=print,
+    runner: Optional[StageRunner] = None,
+) -> Tuple[str, Optional[List[Tuple[int, int, str]]]]:
+    """
+    Fill gaps with JSON edits applied locally, falling back to a full rewrite.
+    Both escalate through the fill tiers while their output fails validation.
+
+    Returns:
+        The new draft and the applied splices (None after a full rewrite)
+    """
+    runner = runner or StageRunner()
+    if use_edits:
+        try:
+            output = await runner.invoke("fill", fill_edits_chain, {
+                "question": question,
+                "draft": number_markers(draft),
+                "queries": queries,
+                "iteration": iteration,
+            }, validate_edits(draft))
+            splices = resolve_edits(draft, parse_edits(output))
+            log(f"Applied {len(splices)} edits")
+            return apply_splices(draft, splices), splices
+        except StageFailed as e:
+            log(f"Edits rejected ({e.error}); falling back to a full rewrite")
+    inputs = {"question": question, "draft": draft, "queries": queries, "iteration": iteration}
+    try:
+        return await runner.invoke("fill", fill_chain, inputs, validate_fill(draft)), None
+    except StageFailed as e:
+        log(f"Keeping a rewrite that failed validation on every tier ({e.error})")
+        return e.output, None
+
+
+async def expand_draft(
+    draft: str, use_edits: bool, log=print, runner: Optional[StageRunner] = None
+) -> Tuple[str, Optional[List[Tuple[int, int, str]]]]:
+    """Add markers for deeper details with anchored insertions, falling back to a full rewrite"""
+    runner = runner or StageRunner()
+    if use_edits:
+        try:
+            output = await runner.invoke(
+                "expansion", expansion_edits_chain, {"draft": draft}, validate_edits(draft, allow_new_markers=True)
+            )
+            splices = resolve_edits(draft, parse_edits(output), allow_new_markers=True)
+            return apply_splices(draft, splices), splices
+        except StageFailed as e:
+            log(f"Expansion edits rejected ({e.error}); falling back to a full rewrite")
+    try:
+        return await runner.invoke("expansion", expansion_chain, {"draft": draft}, validate_expansion(draft)), None
+    except StageFailed as e:
+        log(f"Expansion failed validation on every tier ({e.error}); keeping the draft")
+        return draft, []
+
+
+def update_gaps(gaps: GapIndex, draft: str, splices: Optional[List[Tuple[int, int, str]]], iteration: int) -> None:
+    """Follow the edits incrementally, or re-match the markers after a full rewrite"""
+    if splices is None:
+        gaps.reconcile(draft, iteration)
+    else:
+        gaps.apply(splices, iteration)
+
+# ========= Event Stream =========
+
+async def iter_retgen_events(
+    question: str,
+    max_iters: int = 10,
+    target_completeness: float = 0.95,
+    retriever=None,
+    top_k: int = 3,
+    mode: str = "rewrite",
+    max_concurrency: int = 8,
+    edits: bool = False,
+    cache: Optional[GapCache] = None,
+    deadline: Optional[float] = None,
+    stop: Optional[asyncio.Event] = None,
+    config: Optional[RunnableConfig] = None,
+    controller: Optional[ConvergenceController] = None,
+    models: Optional[StageModels] = None,
+) -> AsyncIterator[Event]:
+    """
+    Perform iterative retrieval and generation with multiple natural rounds,
+    yielding progress events. Continues until all gaps are filled or max
+    iterations reached; the last event is always a FinalAnswer.
+
+    Args:
+        question: The question to answer
+        max_iters: Maximum number of iterations to refine the answer
+        target_completeness: Target completeness (0-1), stops when achieved
+        retriever: Local index (retrieval.BM25Index or vector_index.VectorRetriever);
+            when given, gap topics are searched in it instead of asking the
+            LLM for the information (query_chain)
+        top_k: Passages retrieved per gap
+        mode: "rewrite" (query + full fill_chain rewrite) or "parallel"
+            (one targeted prompt per gap, run concurrently)
+        max_concurrency: Concurrent gap prompts in parallel mode
+        edits: Ask for JSON edits (marker replacements, anchored insertions)
+            instead of rewriting the entire answer; falls back to a rewrite
+            when the edits do not validate
+        cache: Gap-fill cache consulted before any query or fill call
+        deadline: Seconds the run may take; an in-flight model call is
+            cancelled when it passes and the partial draft is returned
+        stop: Event checked between iterations; when set the run stops with
+            the current draft (reason "cancelled")
+        config: Runnable config (callbacks list, tags) passed to every model call
+        controller: Decides from the token/time spend and the marginal gain
+            whether to run each round and each expansion pass, instead of
+            the fixed heuristics (expand in the first two iterations, stop
+            after 3 rounds without progress)
+        models: Model tiers per stage (draft, query, fill, expansion); a
+            stage's call moves up a tier while its output fails validation.
+            The per-stage latency and cost are in FinalAnswer.stages
+    """
+    if mode not in ("rewrite", "parallel"):
+        raise ValueError(f"Unknown mode '{mode}'. Expected 'rewrite' or 'parallel'")
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    deadline_at = started_at + deadline if deadline is not None else None
+
+    # Count this run's tokens next to the caller's callbacks
+    usage = UsageMetadataCallbackHandler()
+    config = {**(config or {}), "callbacks": [*((config or {}).get("callbacks") or []), usage]}
+
+    runner = StageRunner(models, config)
+
+    def spent() -> int:
+        return sum(u.get("total_tokens", 0) for u in usage.usage_metadata.values())
+
+    async def call(step: Awaitable):
+        if deadline_at is None:
+            return await step
+        try:
+            return await asyncio.wait_for(step, max(0.0, deadline_at - loop.time()))
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded from None
+
+    notes: List[str] = []
+
+    def drain(iteration: int) -> List[Notice]:
+        events = [Notice(iteration, message) for message in notes]
+        notes.clear()
+        return events
+
+    draft = ""
+    gaps = GapIndex()
+    initial_gaps = 0
+    actual_iterations = 0
+    reason = "max_iters"
+    try:
+        # Generate initial draft with many gaps
+        try:
+            draft = await call(runner.invoke("draft", draft_chain, {"question": question}, validate_draft))
+        except StageFailed as e:
+            draft = e.output
+            notes.append(f"Keeping a draft that failed validation on every tier ({e.error})")
+        yield DraftCreated(draft)
+        for notice in drain(0):
+            yield notice
+
+        # Index the initial gaps
+        gaps = GapIndex(draft)
+        initial_gaps = len(gaps.open())
+        yield GapsFound(0, gaps.open(), gaps.counts()["duplicate"])
+
+        consecutive_no_progress = 0
+        unfillable: Set[int] = set()  # parallel mode: gaps already answered UNKNOWN
+
+        # Iterative refinement - continue until complete or max iterations
+        for iteration in range(max_iters):
+            if stop is not None and stop.is_set():
+                reason = "cancelled"
+                break
+            actual_iterations = iteration + 1
+            current_gaps = len(gaps.open())
+            round_tokens, round_start = spent(), loop.time()
+
+            # Check if we've reached completion
+            if current_gaps == 0:
+                if controller is not None:
+                    decision = controller.expansion(actual_iterations, spent(), loop.time() - started_at)
+                    yield decision
+                    if decision.action != "expand":
+                        reason = "complete"
+                        break
+                # Only expand in early iterations, not indefinitely
+                elif iteration >= 2:
+                    reason = "complete"
+                    break
+                draft, splices = await call(expand_draft(draft, edits, notes.append, runner))
+                for notice in drain(actual_iterations):
+                    yield notice
+                update_gaps(gaps, draft, splices, actual_iterations)
+                current_gaps = len(gaps.open())
+                if current_gaps == 0:
+                    reason = "complete"
+                    break
+                yield GapsFound(actual_iterations, gaps.open(), gaps.counts()["duplicate"])
+                consecutive_no_progress = 0  # Reset counter
+
+            if mode == "parallel" and all(gap.id in unfillable for gap in gaps.open()):
+                reason = "unfillable"
+                break
+
+            if controller is not None:
+                decision = controller.next_round(actual_iterations, spent(), loop.time() - started_at)
+                yield decision
+                if decision.action == "stop":
+                    reason = decision.reason
+                    break
+
+            # Retrieval is local, so passages are known before any model call
+            passages = None
+            if retriever is not None:
+                passages = search_gaps(retriever, question, [gap.topic for gap in gaps.open()], top_k=top_k)
+
+            fills: Dict[int, str] = {}
+            served: Dict[int, str] = {}
+            if cache is not None:
+                draft, served, splices = serve_cached_fills(question, draft, gaps, cache, passages)
+                if served:
+                    pending = {gap_id: gaps.gaps[gap_id] for gap_id in served}
+                    gaps.apply(splices, actual_iterations)
+                    for gap_id, text in served.items():
+                        yield GapFilled(actual_iterations, pending[gap_id], text, "cache")
+
+            if mode == "parallel":
+                # One small prompt per gap, all at once
+                attempted = {gap.id for gap in gaps.open()} - unfillable
+                draft, fills, splices = await call(fill_gaps_parallel(
+                    question, draft, gaps, passages=passages,
+                    max_concurrency=max_concurrency, skip=unfillable, runner=runner,
+                ))
+                if cache is not None:
+                    cache.record_saved_calls(len(served))
+                    store_fills(question, cache, gaps, fills, passages, mode, runner.last_model.get("fill", DEFAULT_MODEL))
+                gaps.apply(splices, actual_iterations)
+                unfillable |= attempted - set(fills)
+            elif not gaps.open():
+                # Every gap came from the cache: no query or fill call this round
+                cache.record_saved_calls(1 if retriever is not None else 2)
+            else:
+                if passages is not None:
+                    # Turn each gap into a query against the local index
+                    results = {gap.topic: passages[gap.topic] for gap in gaps.open()}
+                    queries = format_gap_passages(results)
+                    for topic, hits in results.items():
+                        sources = [f"{hit.passage.source}:{hit.passage.start_line}" for hit in hits]
+                        notes.append(f"Retrieved for '{topic}': {', '.join(sources) or 'no passages'}")
+                else:
+                    # Generate queries for missing information
+                    try:
+                        queries = await call(runner.invoke("query", query_chain, {"draft": draft}, validate_queries))
+                    except StageFailed as e:
+                        queries = e.output
+                    queries_list = [query.strip() for query in queries.split("\n") if query.strip()]
+                    notes.append(f"Generated {len(queries_list)} queries")
+                for notice in drain(actual_iterations):
+                    yield notice
+
+                # Fill gaps with new information (gradual filling based on iteration)
+                filled_draft, splices = await call(fill_draft(
+                    question, draft, queries, actual_iterations, edits, notes.append, runner
+                ))
+                if splices is not None:
+                    fills = fills_from_splices(gaps, splices)
+                else:
+                    fills = fills_from_rewrite(gaps, draft, filled_draft)
+                draft = filled_draft
+                update_gaps(gaps, draft, splices, actual_iterations)
+                # A rewrite can keep a marker's words around a new marker: only closed gaps count
+                fills = {gap_id: text for gap_id, text in fills.items() if gaps.gaps[gap_id].status == FILLED}
+                if cache is not None:
+                    store_fills(
+                        question, cache, gaps, fills, passages, "edits" if splices is not None else "rewrite",
+                        runner.last_model.get("fill", DEFAULT_MODEL),
+                    )
+                for notice in drain(actual_iterations):
+                    yield notice
+
+            closed = gaps.filled_in(actual_iterations)
+            for gap in closed:
+                if gap.id in fills:
+                    yield GapFilled(actual_iterations, gap, fills[gap.id], "model")
+                elif splices is None and gap.duplicate_of is None and gap.id not in served:
+                    yield GapFilled(actual_iterations, gap, None, "model")
+
+            if controller is not None:
+                controller.record(len(closed), spent() - round_tokens, loop.time() - round_start)
+
+            # Report progress
+            yield IterationFinished(actual_iterations, draft, len(closed), gaps.counts())
+
+            # Check if we're making progress
+            if not closed:
+                consecutive_no_progress += 1
+                if consecutive_no_progress >= 3:
+                    reason = "no_progress"
+                    break
+            else:
+                consecutive_no_progress = 0
+    except DeadlineExceeded:
+        reason = "deadline"
+
+    counts = gaps.counts()
+    yield FinalAnswer(draft, {
+        "iterations": actual_iterations,
+        "initial_gaps": initial_gaps,
+        "remaining_gaps": counts["open"],
+        "filled_gaps": counts["filled"],
+        "duplicate_gaps": counts["duplicate"],
+        "reworded_gaps": counts["reworded"],
+        "tokens": spent(),
+        "cost_usd": round(runner.report.total_cost(), 6),
+        "elapsed_s": round(loop.time() - started_at, 3),
+        "stop_reason": reason,
+        "stages": runner.report.as_dict(),
+    }, reason, runner.report)
+
+
+async def iter_retgen_many(
+    questions: List[str],
+    max_parallel: int = 4,
+    controller_factory: Optional[Callable[[], ConvergenceController]] = None,
+    **kwargs,
+) -> AsyncIterator[Tuple[int, Event]]:
+    """
+    Run several questions concurrently in the current event loop, yielding
+    (question index, event) as events arrive. At most max_parallel runs are
+    active at once; each run gets its own controller from controller_factory
+    and the other arguments go to iter_retgen_events.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    slots = asyncio.Semaphore(max_parallel)
+
+    async def pump(index: int, question: str) -> None:
+        try:
+            async with slots:
+                controller = controller_factory() if controller_factory is not None else None
+                async for event in iter_retgen_events(question, controller=controller, **kwargs):
+                    queue.put_nowait((index, event))
+        except Exception as e:
+            queue.put_nowait((index, e))
+        else:
+            queue.put_nowait((index, None))
+
+    tasks = [asyncio.create_task(pump(index, question)) for index, question in enumerate(questions)]
+    running = len(tasks)
+    try:
+        while running:
+            index, event = await queue.get()
+            if event is None:
+                running -= 1
+            elif isinstance(event, Exception):
+                raise event
+            else:
+                yield index, event
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def iter_retgen_multi(
+    question: str, on_event: Optional[Callable[[Event], None]] = None, return_stats: bool = False, **kwargs
+):
+    """
+    Blocking wrapper around iter_retgen_events (arguments are forwarded).
+
+    Returns:
+        The final refined answer (and the stats when return_stats is set)
+    """
+    async def consume() -> FinalAnswer:
+        async for event in iter_retgen_events(question, **kwargs):
+            if on_event is not None:
+                on_event(event)
+            if isinstance(event, FinalAnswer):
+                return event
+
+    final = asyncio.run(consume())
+    return (final.answer, final.stats) if return_stats else final.answer
+
+# ========= Mode Comparison =========
+
+COMPARE_MODES = {
+    "rewrite": {"mode": "rewrite"},
+    "edits": {"mode": "rewrite", "edits": True},
+    "parallel": {"mode": "parallel"},
+}
+
+
+def compare_modes(questions: List[str], modes=tuple(COMPARE_MODES), **kwargs) -> List[Dict]:
+    """Run each question in each mode, measuring iterations, wall time and tokens"""
+    rows = []
+    for question in questions:
+        for mode in modes:
+            start = time.perf_counter()
+            with get_usage_metadata_callback() as usage:
+                answer, stats = iter_retgen_multi(question, return_stats=True, **COMPARE_MODES[mode], **kwargs)
+            totals = [model_usage for model_usage in usage.usage_metadata.values()]
+            rows.append({
+                "question": question,
+                "mode": mode,
+                **stats,
+                "wall_s": time.perf_counter() - start,
+                "input_tokens": sum(u.get("input_tokens", 0) for u in totals),
+                "output_tokens": sum(u.get("output_tokens", 0) for u in totals),
+            })
+    return rows
+
+
+def print_comparison(rows: List[Dict]) -> None:
+    print(f"\n{'MODE':<9} {'ITERS':>5} {'GAPS':>9} {'WALL':>8} {'IN TOK':>8} {'OUT TOK':>8}  QUESTION")
+    for row in rows:
+        print(
+            f"{row['mode']:<9} {row['iterations']:>5} {row['initial_gaps']:>4}->{row['remaining_gaps']:<3} "
+            f"{row['wall_s']:>7.1f}s {row['input_tokens']:>8} {row['output_tokens']:>8}  {row['question'][:50]}"
+        )
+    for mode in dict.fromkeys(row["mode"] for row in rows):
+        selected = [row for row in rows if row["mode"] == mode]
+        print(
+            f"TOTAL {mode:<9} iterations={sum(r['iterations'] for r in selected)} "
+            f"wall={sum(r['wall_s'] for r in selected):.1f}s "
+            f"tokens={sum(r['input_tokens'] + r['output_tokens'] for r in selected)}"
+        )
+
+
+def compare_policies(
+    questions: List[str], make_controller: Callable[[], ConvergenceController], **kwargs
+) -> List[Dict]:
+    """Run each question with the fixed heuristics and with a fresh controller: cost vs completeness"""
+    rows = []
+    for question in questions:
+        for policy in ("fixed", "controller"):
+            controller = make_controller() if policy == "controller" else None
+            answer, stats = iter_retgen_multi(question, return_stats=True, controller=controller, **kwargs)
+            total = stats["filled_gaps"] + stats["remaining_gaps"]
+            rows.append({
+                "question": question,
+                "policy": policy,
+                **stats,
+                "completeness": stats["filled_gaps"] / total if total else 1.0,
+                "decisions": [d.describe() for d in controller.decisions] if controller else [],
+            })
+    return rows
+
+
+def print_policy_comparison(rows: List[Dict]) -> None:
+    print(f"\n{'POLICY':<11} {'ITERS':>5} {'TOKENS':>8} {'WALL':>8} {'COMPLETE':>9}  {'STOP':<13} QUESTION")
+    for row in rows:
+        print(
+            f"{row['policy']:<11} {row['iterations']:>5} {row['tokens']:>8} {row['elapsed_s']:>7.1f}s "
+            f"{row['completeness']:>8.0%}  {row['stop_reason']:<13} {row['question'][:40]}"
+        )
+    for policy in dict.fromkeys(row["policy"] for row in rows):
+        selected = [row for row in rows if row["policy"] == policy]
+        tokens = sum(r["tokens"] for r in selected)
+        filled = sum(r["filled_gaps"] for r in selected)
+        print(
+            f"TOTAL {policy:<11} tokens={tokens} filled={filled} "
+            f"mean completeness={sum(r['completeness'] for r in selected) / len(selected):.0%} "
+            f"gaps/1k tokens={filled * 1000 / tokens if tokens else 0:.2f}"
+        )
@@ -0,0 +1,231 @@
+"""
+Per-stage model tiers for ITER-RETGEN.
+
+Each stage (draft, query, fill, expansion) has an ordered list of tiers,
+cheapest first. A call runs on the first tier and moves up one tier each
+time its output fails the stage's validation (for example a fill that
+adds new [MISSING:] markers). The model and temperature are chosen per
+call through the configurable chat model, so the chains stay shared.
+
+Every attempt is recorded in a StageReport: calls, escalations, latency,
+tokens and estimated cost per stage and model. This lets you pick the
+cheapest mix that keeps the answers good.
+
+Usage:
+    models = StageModels.parse(["query=openai:gpt-4.1-nano,openai:gpt-4o-mini"])
+    runner = StageRunner(models)
+    output = await runner.invoke("query", query_chain, {"draft": draft}, validate_queries)
+    runner.report.print()
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from langchain_core.callbacks import UsageMetadataCallbackHandler
+from langchain_core.runnables import RunnableConfig
+
+STAGES = ("draft", "query", "fill", "expansion")
+DEFAULT_MODEL = "openai:gpt-4o-mini"
+DEFAULT_TEMPERATURE = 0.7
+
+# USD per 1M input / output tokens, for the cost estimate
+PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+}
+
+# Cheap models for the mechanical stages, escalating to stronger ones on failure
+TIERED_PRESET = {
+    "draft": ["openai:gpt-4.1-nano", "openai:gpt-4o-mini"],
+    "query": ["openai:gpt-4.1-nano", "openai:gpt-4o-mini"],
+    "fill": ["openai:gpt-4o-mini", "openai:gpt-4o"],
+    "expansion": ["openai:gpt-4.1-nano", "openai:gpt-4o-mini"],
+}
+
+Validator = Callable[[str], Optional[str]]  # error message, or None when the output is acceptable
+
+
+class StageFailed(Exception):
+    """Every tier of a stage produced output that failed validation"""
+
+    def __init__(self, stage: str, error: str, output: Any):
+        super().__init__(f"{stage}: {error}")
+        self.stage = stage
+        self.error = error
+        self.output = output
+
+
+@dataclass
+class Tier:
+    model: str
+    temperature: float = DEFAULT_TEMPERATURE
+
+
+@dataclass
+class StageModels:
+    """Ordered tiers per stage; stages not configured use DEFAULT_MODEL only"""
+    tiers: Dict[str, List[Tier]] = field(default_factory=dict)
+
+    def for_stage(self, stage: str) -> List[Tier]:
+        return self.tiers.get(stage) or [Tier(DEFAULT_MODEL)]
+
+    @classmethod
+    def preset(cls, presets: Dict[str, List[str]] = TIERED_PRESET) -> "StageModels":
+        return cls({stage: [Tier(model) for model in models] for stage, models in presets.items()})
+
+    @classmethod
+    def parse(cls, specs: Sequence[str], base: Optional["StageModels"] = None) -> "StageModels":
+        """Parse "stage=model[@temperature],model..." specs on top of base"""
+        tiers = dict(base.tiers) if base else {}
+        for spec in specs:
+            stage, _, models = spec.partition("=")
+            if stage not in STAGES or not models:
+                raise ValueError(f"Expected <stage>=<model>[,<model>...] with stage in {STAGES}: {spec}")
+            tiers[stage] = []
+            for model in models.split(","):
+                name, _, temperature = model.strip().partition("@")
+                tiers[stage].append(Tier(name, float(temperature) if temperature else DEFAULT_TEMPERATURE))
+        return cls(tiers)
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    input_price, output_price = PRICES.get(model.split(":", 1)[-1], (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+# ========= Report =========
+
+@dataclass
+class StageUsage:
+    calls: int = 0
+    rejected: int = 0
+    seconds: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+
+
+class StageReport:
+    """Latency, tokens and cost per (stage, model)"""
+
+    def __init__(self):
+        self.usage: Dict[tuple, StageUsage] = {}
+        self.escalations: Dict[str, int] = {}
+
+    def record(self, stage: str, model: str, calls: int, rejected: int, seconds: float, usage: Dict[str, Dict]) -> None:
+        entry = self.usage.setdefault((stage, model), StageUsage())
+        entry.calls += calls
+        entry.rejected += rejected
+        entry.seconds += seconds
+        for model_usage in usage.values():
+            entry.input_tokens += model_usage.get("input_tokens", 0)
+            entry.output_tokens += model_usage.get("output_tokens", 0)
+        entry.cost_usd = estimate_cost(model, entry.input_tokens, entry.output_tokens)
+
+    def escalated(self, stage: str, count: int = 1) -> None:
+        self.escalations[stage] = self.escalations.get(stage, 0) + count
+
+    def merge(self, other: "StageReport") -> None:
+        for (stage, model), entry in other.usage.items():
+            mine = self.usage.setdefault((stage, model), StageUsage())
+            for name in ("calls", "rejected", "seconds", "input_tokens", "output_tokens", "cost_usd"):
+                setattr(mine, name, getattr(mine, name) + getattr(entry, name))
+        for stage, count in other.escalations.items():
+            self.escalated(stage, count)
+
+    def as_dict(self) -> Dict[str, Any]:
+        stages: Dict[str, Any] = {}
+        for (stage, model), entry in sorted(self.usage.items(), key=lambda item: STAGES.index(item[0][0])):
+            stages.setdefault(stage, {"escalations": self.escalations.get(stage, 0), "models": {}})
+            stages[stage]["models"][model] = {
+                "calls": entry.calls,
+                "rejected": entry.rejected,
+                "seconds": round(entry.seconds, 3),
+                "input_tokens": entry.input_tokens,
+                "output_tokens": entry.output_tokens,
+                "cost_usd": round(entry.cost_usd, 6),
+            }
+        return stages
+
+    def total_cost(self) -> float:
+        return sum(entry.cost_usd for entry in self.usage.values())
+
+    def print(self) -> None:
+        print(f"\n{'STAGE':<10} {'MODEL':<22} {'CALLS':>5} {'REJECT':>6} {'SECONDS':>8} {'IN TOK':>8} {'OUT TOK':>8} {'COST $':>9}")
+        for stage, data in self.as_dict().items():
+            for model, entry in data["models"].items():
+                print(
+                    f"{stage:<10} {model:<22} {entry['calls']:>5} {entry['rejected']:>6} {entry['seconds']:>8.2f} "
+                    f"{entry['input_tokens']:>8} {entry['output_tokens']:>8} {entry['cost_usd']:>9.5f}"
+                )
+        escalations = ", ".join(f"{stage}={count}" for stage, count in self.escalations.items()) or "none"
+        print(f"Total estimated cost: ${self.total_cost():.5f}; escalations: {escalations}")
+
+# ========= Runner =========
+
+class StageRunner:
+    """Invokes chains on a stage's tiers, escalating while the output fails validation"""
+
+    def __init__(self, models: Optional[StageModels] = None, config: Optional[RunnableConfig] = None):
+        self.models = models or StageModels()
+        self.config = config or {}
+        self.report = StageReport()
+        self.last_model: Dict[str, str] = {}
+
+    def _config(self, tier: Tier, usage: UsageMetadataCallbackHandler, **extra) -> RunnableConfig:
+        return {
+            **self.config,
+            **extra,
+            "callbacks": [*(self.config.get("callbacks") or []), usage],
+            "configurable": {**self.config.get("configurable", {}), "model": tier.model, "temperature": tier.temperature},
+        }
+
+    async def invoke(self, stage: str, chain, inputs: Dict[str, Any], validate: Optional[Validator] = None):
+        """
+        Run the chain on the stage's tiers until the output validates.
+
+        Raises:
+            StageFailed with the last output when every tier is rejected
+        """
+        tiers = self.models.for_stage(stage)
+        error, output = None, None
+        for level, tier in enumerate(tiers):
+            if level:
+                self.report.escalated(stage)
+            usage = UsageMetadataCallbackHandler()
+            start = time.perf_counter()
+            output = await chain.ainvoke(inputs, self._config(tier, usage))
+            error = validate(output) if validate else None
+            self.report.record(stage, tier.model, 1, int(error is not None), time.perf_counter() - start, usage.usage_metadata)
+            if error is None:
+                self.last_model[stage] = tier.model
+                return output
+        raise StageFailed(stage, error, output)
+
+    async def batch(
+        self, stage: str, chain, inputs: List[Dict[str, Any]], validate: Optional[Validator] = None, max_concurrency: int = 8
+    ) -> List[Any]:
+        """Run a batch on the stage's tiers; only the rejected items move up a tier (their last output is kept)"""
+        outputs: List[Any] = [None] * len(inputs)
+        pending = list(range(len(inputs)))
+        for level, tier in enumerate(self.models.for_stage(stage)):
+            if not pending:
+                break
+            if level:
+                self.report.escalated(stage, len(pending))
+            usage = UsageMetadataCallbackHandler()
+            start = time.perf_counter()
+            results = await chain.abatch([inputs[i] for i in pending], self._config(tier, usage, max_concurrency=max_concurrency))
+            rejected = []
+            for i, output in zip(pending, results):
+                outputs[i] = output
+                if validate and validate(output) is not None:
+                    rejected.append(i)
+            self.report.record(stage, tier.model, len(pending), len(rejected), time.perf_counter() - start, usage.usage_metadata)
+            if len(rejected) < len(pending):
+                self.last_model[stage] = tier.model
+            pending = rejected
+        return outputs
@@ -0,0 +1,278 @@
+"""
+Local BM25 retrieval over a directory of documents.
+
+Files (Markdown, text, code) are split into passages at blank lines, tokenized
+and stored in an inverted index (term -> passage ids and term frequencies).
+The index is pickled next to a fingerprint of the document directory (paths,
+sizes and mtimes), so later runs load it directly unless a file changed.
+Everything runs locally; no network is needed.
+
+Usage:
+    from retrieval import load_or_build
+    index, built = load_or_build("repo_langchain_1.0")
+    for hit in index.search("LangGraph checkpoint persistence", k=3):
+        print(hit.score, hit.passage.source, hit.passage.text[:80])
+"""
+
+import hashlib
+import heapq
+import math
+import os
+import pickle
+import re
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# ========= Configuration =========
+
+DEFAULT_EXTENSIONS = (
+    ".md", ".mdx", ".rst", ".txt",
+    ".py", ".ipynb", ".js", ".ts", ".java", ".go", ".rs", ".toml", ".yaml", ".yml",
+)
+SKIP_DIRS = {".git", "node_modules", "venv", ".venv", "__pycache__", ".retrieval-cache"}
+DEFAULT_CACHE_DIR = Path(__file__).parent / ".retrieval-cache"
+INDEX_FORMAT = 1
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or that the this to was were "
+    "what when where which who why will with de do da das dos em para por que um uma os as no na".split()
+)
+
+
+# ========= Data Structures =========
+
+@dataclass
+class Passage:
+    """A contiguous block of a document"""
+    source: str
+    start_line: int
+    text: str
+
+
+@dataclass
+class SearchHit:
+    passage: Passage
+    score: float
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens; snake_case and camelCase are split into parts"""
+    tokens = []
+    for word in TOKEN_PATTERN.findall(text):
+        parts = re.findall(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+|[^\W\d_A-Za-z]+", word) or [word]
+        for part in parts:
+            part = part.lower()
+            if len(part) > 1 and part not in STOPWORDS:
+                tokens.append(part)
+    return tokens
+
+
+def split_passages(text: str, source: str, max_chars: int = 1200) -> Iterator[Passage]:
+    """Group blank-line separated blocks into passages of about max_chars (hard cut at 2x)"""
+    block: List[str] = []
+    block_start = 1
+    size = 0
+    for number, line in enumerate(text.splitlines(), 1):
+        blank = not line.strip()
+        if block and size >= max_chars and (blank or size >= 2 * max_chars):
+            yield Passage(source, block_start, "\n".join(block).strip())
+            block, size = [], 0
+        if not block:
+            if blank:
+                continue
+            block_start = number
+        block.append(line)
+        size += len(line) + 1
+    if block:
+        yield Passage(source, block_start, "\n".join(block).strip())
+
+
+def iter_documents(docs_dir: Path, extensions: Iterable[str] = DEFAULT_EXTENSIONS) -> Iterator[Path]:
+    extensions = tuple(extensions)
+    for root, dirs, files in os.walk(docs_dir):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+        for name in sorted(files):
+            if name.endswith(extensions):
+                yield Path(root) / name
+
+
+def fingerprint(docs_dir: Path, extensions: Iterable[str] = DEFAULT_EXTENSIONS, max_chars: int = 1200) -> str:
+    """Hash of every indexed file's path, size and mtime plus the split parameters"""
+    digest = hashlib.sha256(f"{INDEX_FORMAT}:{max_chars}".encode())
+    for path in iter_documents(docs_dir, extensions):
+        stat = path.stat()
+        digest.update(f"{path.relative_to(docs_dir)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+# ========= BM25 Index =========
+
+class BM25Index:
+    """Okapi BM25 over passages, with compact array-based postings"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.passages: List[Passage] = []
+        self.lengths = array("I")
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.fingerprint = ""
+
+    @property
+    def avg_length(self) -> float:
+        return sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+    def add(self, passage: Passage) -> None:
+        doc_id = len(self.passages)
+        terms = Counter(tokenize(passage.text))
+        self.passages.append(passage)
+        self.lengths.append(sum(terms.values()))
+        for term, tf in terms.items():
+            ids, tfs = self.postings.setdefault(term, (array("I"), array("I")))
+            ids.append(doc_id)
+            tfs.append(tf)
+
+    @classmethod
+    def build(
+        cls,
+        docs_dir: Path,
+        extensions: Iterable[str] = DEFAULT_EXTENSIONS,
+        max_chars: int = 1200,
+    ) -> "BM25Index":
+        docs_dir = Path(docs_dir)
+        index = cls()
+        for path in iter_documents(docs_dir, extensions):
+            try:
+                text = path.read_text(encoding="utf-8")
+            except (UnicodeDecodeError, OSError):
+                continue
+            source = str(path.relative_to(docs_dir))
+            for passage in split_passages(text, source, max_chars):
+                index.add(passage)
+        return index
+
+    def search(self, query: str, k: int = 3) -> List[SearchHit]:
+        """Top-k passages for a free-text query"""
+        n = len(self.passages)
+        if not n:
+            return []
+        avg_length = self.avg_length
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            ids, tfs = posting
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            for doc_id, tf in zip(ids, tfs):
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [SearchHit(self.passages[doc_id], score) for doc_id, score in best]
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({"format": INDEX_FORMAT, "index": self}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _payload(path: Path) -> Optional[Dict[str, Any]]:
+        """The saved payload; None if the file is missing or is not a BM25 index of any format version"""
+        try:
+            with open(path, "rb") as f:
+                payload = pickle.load(f)
+        except Exception:  # unpickling an arbitrary file can raise almost anything
+            return None
+        if not isinstance(payload, dict) or "format" not in payload or "index" not in payload:
+            return None
+        return payload
+
+    @classmethod
+    def is_index(cls, path: Path) -> bool:
+        """Whether the file holds a saved index of any format version (safe to replace)"""
+        return cls._payload(path) is not None
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["BM25Index"]:
+        """Load a saved index; None if missing, not an index or written by another format version"""
+        payload = cls._payload(path)
+        if payload is None or payload["format"] != INDEX_FORMAT:
+            return None
+        return payload["index"]
+
+
+def default_index_path(docs_dir: Path) -> Path:
+    key = hashlib.sha256(str(Path(docs_dir).resolve()).encode()).hexdigest()[:16]
+    return DEFAULT_CACHE_DIR / f"bm25-{key}.pkl"
+
+
+def load_or_build(
+    docs_dir: Path,
+    index_path: Optional[Path] = None,
+    extensions: Iterable[str] = DEFAULT_EXTENSIONS,
+    max_chars: int = 1200,
+) -> Tuple[BM25Index, bool]:
+    """
+    Return (index, built); the saved index is reused while the documents are unchanged.
+
+    Raises:
+        FileNotFoundError if docs_dir is missing
+        FileExistsError if index_path holds anything but a saved index
+    """
+    docs_dir = Path(docs_dir)
+    if not docs_dir.is_dir():
+        raise FileNotFoundError(f"Documents directory not found: {docs_dir}")
+    index_path = Path(index_path) if index_path else default_index_path(docs_dir)
+    current = fingerprint(docs_dir, extensions, max_chars)
+
+    index = BM25Index.load(index_path)
+    if index is not None and index.fingerprint == current:
+        return index, False
+
+    if index is None and index_path.exists() and not BM25Index.is_index(index_path):
+        raise FileExistsError(f"{index_path} exists and is not a BM25 index; refusing to overwrite it")
+
+    index = BM25Index.build(docs_dir, extensions, max_chars)
+    index.fingerprint = current
+    index.save(index_path)
+    return index, True
+
+
+# ========= Gap Retrieval =========
+
+def search_gaps(index, question: str, topics: Iterable[str], top_k: int = 3) -> Dict[str, List[SearchHit]]:
+    """
+    Search each gap topic, weighted twice, with the question as context.
+
+    `index` is a BM25Index or any retriever with search(query, k); one that
+    also has search_many(queries, k) (vector_index.VectorRetriever) gets all
+    topics in a single batch.
+    """
+    queries = {topic: f"{topic} {topic} {question}" for topic in topics}
+    if hasattr(index, "search_many"):
+        return dict(zip(queries, index.search_many(list(queries.values()), k=top_k))) if queries else {}
+    return {topic: index.search(query, k=top_k) for topic, query in queries.items()}
+
+
+def format_gap_passages(results: Dict[str, List[SearchHit]], max_passage_chars: int = 600) -> str:
+    """Format retrieved passages per gap as the information block of fill_chain"""
+    blocks = []
+    for topic, hits in results.items():
+        if not hits:
+            blocks.append(f"For [MISSING: {topic}]: no local passages found")
+            continue
+        lines = [f"For [MISSING: {topic}]:"]
+        for hit in hits:
+            text = hit.passage.text
+            if len(text) > max_passage_chars:
+                text = text[:max_passage_chars].rstrip() + "..."
+            lines.append(f"- ({hit.passage.source}:{hit.passage.start_line}) {text}")
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
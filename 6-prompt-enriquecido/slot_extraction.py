@@ -0,0 +1,108 @@
+"""
+Deterministic slot extraction for query enrichment.
+
+Each required field can declare:
+    patterns   regexes whose first group (or whole match) is the value,
+               tried in order, e.g. r"#(\\d+)" for a PR id
+    hints      a regex saying the text may talk about the field
+    kind       "structured" (PR id, repository, branch) or "free_text"
+
+Answers collected by the session ("What is the PR ID?: 123") fill their
+field directly. Otherwise a field is resolved by its patterns, missing when
+nothing matches, or ambiguous when it is free text, no pattern matched but
+its hints matched. Patterns and hints only see the user's own text: answers
+to other questions are never searched, so "the fix for issue #99" given as
+the concerns does not become the PR id. Only ambiguous fields need a model; structured fields
+with a hint and no match (e.g. "review my PR") are simply missing.
+
+Usage:
+    extractor = SlotExtractor(config.required_information)
+    slots = extractor.extract("Review PR #42 in acme/api on feature/login")
+    extractor.ambiguous(slots)  # fields to send to the LLM, if any
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+RESOLVED = "resolved"
+MISSING = "missing"
+AMBIGUOUS = "ambiguous"
+SEGMENT_SEPARATOR = " | "
+
+
+@dataclass
+class Slot:
+    field: str
+    question: str
+    value: Optional[str] = None
+    status: str = MISSING
+    source: Optional[str] = None  # answer, pattern or llm
+
+
+class SlotExtractor:
+    """Fills the required fields of a query from answers and configured patterns"""
+
+    def __init__(self, fields: List[Dict[str, Any]]):
+        self.fields = fields
+        self.patterns = {
+            info["field"]: [re.compile(pattern, re.IGNORECASE) for pattern in info.get("patterns", [])]
+            for info in fields
+        }
+        self.hints = {
+            info["field"]: re.compile(info["hints"], re.IGNORECASE) if info.get("hints") else None
+            for info in fields
+        }
+
+    def split(self, text: str) -> Tuple[Dict[str, str], str]:
+        """Values given as "<question>: <answer>" segments, and the remaining free text"""
+        answers, free_text = {}, []
+        for segment in text.split(SEGMENT_SEPARATOR):
+            segment = segment.strip()
+            info = next((info for info in self.fields if segment.startswith(info["question"])), None)
+            if info is None:
+                free_text.append(segment)
+                continue
+            value = segment[len(info["question"]):].lstrip(" :").strip()
+            if value:
+                answers[info["field"]] = value
+        return answers, SEGMENT_SEPARATOR.join(free_text)
+
+    def _match(self, field: str, text: str) -> Optional[str]:
+        for pattern in self.patterns[field]:
+            match = pattern.search(text)
+            if match:
+                value = match.group(1) if match.groups() else match.group(0)
+                return value.strip(" .,;")
+        return None
+
+    def extract(self, text: str) -> Dict[str, Slot]:
+        answers, free_text = self.split(text)
+        slots = {}
+        for info in self.fields:
+            field = info["field"]
+            slot = Slot(field, info["question"])
+            if field in answers:
+                slot.value, slot.status, slot.source = answers[field], RESOLVED, "answer"
+            else:
+                value = self._match(field, free_text)
+                if value:
+                    slot.value, slot.status, slot.source = value, RESOLVED, "pattern"
+                elif info.get("kind") == "free_text" and self.hints[field] is not None and self.hints[field].search(free_text):
+                    slot.status = AMBIGUOUS
+            slots[field] = slot
+        return slots
+
+    @staticmethod
+    def ambiguous(slots: Dict[str, Slot]) -> List[Slot]:
+        return [slot for slot in slots.values() if slot.status == AMBIGUOUS]
+
+    @staticmethod
+    def merge(slots: Dict[str, Slot], values: Dict[str, Any]) -> None:
+        """Apply model-extracted values to the ambiguous slots; the rest become missing"""
+        for slot in SlotExtractor.ambiguous(slots):
+            value = values.get(slot.field)
+            if isinstance(value, str) and value.strip() and value.strip().lower() not in ("null", "none", "unknown"):
+                slot.value, slot.status, slot.source = value.strip(), RESOLVED, "llm"
+            else:
+                slot.status = MISSING
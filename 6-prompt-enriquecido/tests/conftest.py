@@ -0,0 +1,8 @@
+"""
+Shared test setup: iter_retgen builds its chat model at import time.
+"""
+
+import os
+
+# The client needs a key to be constructed; tests replace the chains and never call the API
+os.environ.setdefault("OPENAI_API_KEY", "test")
@@ -0,0 +1,159 @@
+"""
+Tests for the batch runner: rate limiting, input validation and resuming from the output.
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import batch_retgen
+from batch_retgen import RateLimiter, completed_ids, question_id, read_questions, run_batch
+
+
+class FakeClock:
+    """Monotonic clock that only moves when the limiter sleeps"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    real_sleep = asyncio.sleep
+
+    async def sleep(seconds: float) -> None:
+        clock.sleeps.append(seconds)
+        clock.now += seconds
+        await real_sleep(0)
+
+    monkeypatch.setattr(batch_retgen.asyncio, "sleep", sleep)
+    return clock
+
+
+def test_requests_wait_once_the_burst_is_spent(clock: FakeClock):
+    limiter = RateLimiter(requests_per_minute=60, burst_seconds=10, clock=clock)
+
+    async def main():
+        for _ in range(11):
+            await limiter.acquire()
+
+    asyncio.run(main())
+
+    # Ten requests fit the burst; the eleventh waits for one request's worth of refill
+    assert clock.sleeps == [pytest.approx(1.0)]
+    assert limiter.waited == pytest.approx(1.0)
+
+
+def test_tokens_are_reserved_then_charged(clock: FakeClock):
+    limiter = RateLimiter(tokens_per_minute=600, burst_seconds=10, clock=clock)
+
+    async def main():
+        first = await limiter.acquire(80)
+        limiter.charge(-30)  # the call used 50 tokens, not 80
+        second = await limiter.acquire(50)
+        limiter.charge(40)  # this one used 90
+        third = await limiter.acquire(60)
+        return first, second, third
+
+    reserved = asyncio.run(main())
+
+    assert reserved == (80, 50, 60)
+    # 100 - 80 + 30 - 50 - 40 = -40 left: 100 tokens short of 60, at 10 tokens/s
+    assert clock.sleeps == [pytest.approx(10.0)]
+
+
+def test_reservation_is_capped_at_the_bucket_capacity(clock: FakeClock):
+    limiter = RateLimiter(tokens_per_minute=600, burst_seconds=10, clock=clock)
+
+    assert asyncio.run(limiter.acquire(10_000)) == 100
+    assert clock.sleeps == []
+
+
+def test_no_limits_never_wait(clock: FakeClock):
+    limiter = RateLimiter(clock=clock)
+
+    async def main():
+        return [await limiter.acquire(1000) for _ in range(100)]
+
+    assert asyncio.run(main()) == [0] * 100
+    assert clock.sleeps == []
+
+
+def write_lines(path: Path, *lines: str) -> None:
+    path.write_text("".join(lines), encoding="utf-8")
+
+
+def test_read_questions_hashes_missing_ids(tmp_path: Path):
+    path = tmp_path / "questions.jsonl"
+    write_lines(path, '{"id": "q1", "question": "What is LangGraph?"}\n', "\n", '{"question": "What is LangChain?"}\n')
+
+    questions = read_questions(path)
+
+    assert [q["id"] for q in questions] == ["q1", question_id({"question": "What is LangChain?"})]
+
+
+@pytest.mark.parametrize("lines, message", [
+    (['{"id": "q1", "question": "a?"}\n', '{"id": "q1", "question": "b?"}\n'], r":2: duplicate id 'q1'"),
+    (['{"question": "same?"}\n', '{"question": "same?"}\n'], r":2: duplicate id"),
+    (['{"id": 7, "question": "a?"}\n', '{"id": "7", "question": "b?"}\n'], r":2: duplicate id '7'"),
+    (['{"id": "q1", "question": "  "}\n'], r":1: expected an object"),
+    (['["a?"]\n'], r":1: expected an object"),
+])
+def test_read_questions_rejects_duplicates_and_bad_records(tmp_path: Path, lines, message):
+    path = tmp_path / "questions.jsonl"
+    write_lines(path, *lines)
+
+    with pytest.raises(ValueError, match=message):
+        read_questions(path)
+
+
+def test_completed_ids_drops_a_half_written_line_and_retries_failures(tmp_path: Path):
+    output = tmp_path / "answers.jsonl"
+    write_lines(
+        output,
+        '{"id": "ok", "answer": "a"}\n',
+        '{"id": "failed", "error": "TimeoutError: "}\n',
+        '{"id": "retried", "error": "RateLimitError: "}\n',
+        '{"id": "retried", "answer": "b"}\n',
+        '{"id": "crashed", "answ',
+    )
+
+    assert completed_ids(output) == {"ok", "retried"}
+    assert output.read_text(encoding="utf-8").endswith('{"id": "retried", "answer": "b"}\n')
+    assert completed_ids(tmp_path / "missing.jsonl") == set()
+
+
+def test_run_batch_resumes_and_retries_failed_questions(tmp_path: Path, monkeypatch):
+    output = tmp_path / "answers.jsonl"
+    write_lines(output, '{"id": "q1", "answer": "a"}\n', '{"id": "q2", "error": "TimeoutError: "}\n', '{"id": "q3"')
+    questions = [{"id": f"q{n}", "question": f"Question {n}?"} for n in range(1, 5)]
+    answered = []
+
+    async def answer_question(record, limiter, **kwargs):
+        answered.append(record["id"])
+        if record["id"] == "q4":
+            raise RuntimeError("model unavailable")
+        return {
+            "id": record["id"], "question": record["question"], "answer": "ok", "stop_reason": "complete",
+            "iterations": 1, "input_tokens": 10, "output_tokens": 5, "cost_usd": 0.001,
+        }
+
+    monkeypatch.setattr(batch_retgen, "answer_question", answer_question)
+    summary = asyncio.run(run_batch(questions, output, concurrency=2))
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+
+    assert sorted(answered) == ["q2", "q3", "q4"]
+    assert (summary["skipped"], summary["answered"], summary["failed"], summary["tokens"]) == (1, 2, 1, 30)
+    assert [r["id"] for r in records[:2]] == ["q1", "q2"]  # the half-written q3 line is gone
+    assert sorted(r["id"] for r in records[2:]) == ["q2", "q3", "q4"]
+    assert completed_ids(output) == {"q1", "q2", "q3"}
@@ -0,0 +1,109 @@
+"""
+Tests for the convergence controller's budget and marginal-gain decisions.
+"""
+
+import math
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from convergence import CONTINUE, EXPAND, SKIP_EXPANSION, STOP, ConvergenceController
+
+
+def controller_with(*rounds, **kwargs) -> ConvergenceController:
+    controller = ConvergenceController(**kwargs)
+    for filled, tokens, seconds in rounds:
+        controller.record(filled, tokens, seconds)
+    return controller
+
+
+def test_gain_and_cost_use_the_recent_window():
+    controller = controller_with((10, 1000, 1.0), (2, 1000, 2.0), (1, 3000, 4.0), window=2)
+
+    assert controller.gain_per_1k() == pytest.approx(3 * 1000 / 4000)
+    assert controller.round_cost() == (2000, 3.0)
+
+
+@pytest.mark.parametrize("rounds, expected", [
+    ((), None),
+    (((3, 0, 0.1),), math.inf),
+    (((0, 0, 0.1),), 0.0),
+])
+def test_gain_edge_cases(rounds, expected):
+    assert controller_with(*rounds).gain_per_1k() == expected
+
+
+def test_first_round_always_runs():
+    decision = controller_with(token_budget=1000, time_budget=1.0).next_round(1, tokens=500, elapsed=0.5)
+
+    assert (decision.action, decision.reason, decision.gain_per_1k) == (CONTINUE, "within_budget", None)
+
+
+@pytest.mark.parametrize("tokens, elapsed, reason", [
+    (8_000, 1.0, "token_budget"),  # 8k spent + 3k expected > 10k
+    (6_000, 55.0, "time_budget"),  # 55s + 10s expected > 60s
+    (7_000, 50.0, "within_budget"),  # exactly fits both
+])
+def test_next_round_stops_when_the_expected_cost_does_not_fit(tokens, elapsed, reason):
+    controller = controller_with((3, 3000, 10.0), token_budget=10_000, time_budget=60.0)
+
+    decision = controller.next_round(2, tokens, elapsed)
+
+    assert decision.reason == reason
+    assert decision.action == (CONTINUE if reason == "within_budget" else STOP)
+
+
+def test_next_round_stops_on_low_gain():
+    controller = controller_with((1, 4000, 1.0), (0, 4000, 1.0), min_gain_per_1k=0.5)
+
+    decision = controller.next_round(3, tokens=8000, elapsed=2.0)
+
+    assert (decision.action, decision.reason) == (STOP, "low_gain")
+    assert decision.gain_per_1k == pytest.approx(0.125)
+
+
+def test_budget_is_checked_before_gain():
+    controller = controller_with((0, 4000, 1.0), token_budget=5000)
+
+    assert controller.next_round(2, tokens=4000, elapsed=1.0).reason == "token_budget"
+
+
+def test_expansion_needs_room_for_itself_and_a_fill_round():
+    controller = controller_with((4, 2000, 1.0), token_budget=10_000)
+
+    # 7k + 2 * 2k > 10k: one more round would fit, an expansion and its round would not
+    assert controller.next_round(2, tokens=7000, elapsed=1.0).action == CONTINUE
+    decision = controller.expansion(2, tokens=7000, elapsed=1.0)
+
+    assert (decision.action, decision.reason) == (SKIP_EXPANSION, "token_budget")
+    assert controller.expansions == 0
+
+
+def test_expansion_limit_and_low_gain():
+    controller = controller_with((4, 1000, 1.0), max_expansions=1)
+
+    assert controller.expansion(1, tokens=1000, elapsed=1.0).action == EXPAND
+    assert controller.expansion(2, tokens=2000, elapsed=2.0).reason == "expansion_limit"
+
+    low = controller_with((0, 1000, 1.0), min_gain_per_1k=0.5).expansion(1, tokens=1000, elapsed=1.0)
+    assert (low.action, low.reason) == (SKIP_EXPANSION, "low_gain")
+
+
+def test_every_decision_is_recorded():
+    controller = controller_with((2, 1000, 1.0), token_budget=2500)
+
+    controller.next_round(2, tokens=1000, elapsed=1.0)
+    controller.expansion(2, tokens=1000, elapsed=1.0)
+    controller.next_round(3, tokens=2000, elapsed=2.0)
+
+    assert [(d.action, d.reason) for d in controller.decisions] == [
+        (CONTINUE, "within_budget"),
+        (SKIP_EXPANSION, "token_budget"),
+        (STOP, "token_budget"),
+    ]
+    assert controller.decisions[0].describe() == (
+        "iteration 2: continue (within_budget) tokens=1000 elapsed=1.0s gain/1k=2.00"
+    )
@@ -0,0 +1,92 @@
+"""
+Tests for parsing, validating and applying structured draft edits.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from draft_edits import Edit, EditError, apply_edits, apply_splices, number_markers, parse_edits, resolve_edits
+
+DRAFT = "LangChain [MISSING: release date] added agents. LangGraph [MISSING: checkpoints] stores state."
+
+
+def test_number_markers_counts_from_one():
+    assert number_markers(DRAFT) == (
+        "LangChain [MISSING#1: release date] added agents. LangGraph [MISSING#2: checkpoints] stores state."
+    )
+
+
+@pytest.mark.parametrize("output", [
+    '[{"op": "replace", "marker": 1, "text": "in 2025"}]',
+    '```json\n[{"op": "replace", "marker": 1, "text": "in 2025"}]\n```',
+    '{"edits": [{"op": "replace", "marker": 1, "text": "in 2025"}]}',
+])
+def test_parse_edits_accepts_plain_fenced_and_wrapped_json(output):
+    assert parse_edits(output) == [Edit(op="replace", text="in 2025", marker=1)]
+
+
+@pytest.mark.parametrize("output, message", [
+    ("not json", "not valid JSON"),
+    ('{"op": "replace"}', "must be a JSON list"),
+    ('[{"op": "delete", "text": "x"}]', "must have op"),
+    ('[{"op": "replace", "marker": 1}]', "must have op"),
+    ('[{"op": "replace", "marker": "1", "text": "x"}]', "integer marker"),
+    ('[{"op": "insert_after", "anchor": "", "text": "x"}]', "non-empty anchor"),
+])
+def test_parse_edits_rejects_malformed_output(output, message):
+    with pytest.raises(EditError, match=message):
+        parse_edits(output)
+
+
+def test_resolve_and_apply_replace_and_insert():
+    edits = [
+        Edit(op="replace", marker=2, text="persist graph state in checkpoints"),
+        Edit(op="insert_after", anchor="added agents.", text=" It also added middleware."),
+        Edit(op="replace", marker=1, text="1.0 (October 2025)"),
+    ]
+
+    splices = resolve_edits(DRAFT, edits)
+
+    assert [start for start, _, _ in splices] == sorted(start for start, _, _ in splices)
+    assert apply_splices(DRAFT, splices) == (
+        "LangChain 1.0 (October 2025) added agents. It also added middleware. "
+        "LangGraph persist graph state in checkpoints stores state."
+    )
+
+
+def test_no_edits_leave_the_draft_unchanged():
+    assert apply_edits(DRAFT, []) == DRAFT
+
+
+@pytest.mark.parametrize("edits, message", [
+    ([Edit(op="replace", marker=3, text="x")], "Unknown marker id 3"),
+    ([Edit(op="replace", marker=0, text="x")], "Unknown marker id 0"),
+    ([Edit(op="insert_after", anchor="not in the draft", text="x")], "found 0 times"),
+    ([Edit(op="insert_after", anchor="LangGraph", text="x"), Edit(op="insert_after", anchor="Lang", text="y")],
+     "found 2 times"),
+    ([Edit(op="replace", marker=1, text="a"), Edit(op="replace", marker=1, text="b")], "overlap"),
+    ([Edit(op="replace", marker=1, text="a"), Edit(op="insert_after", anchor="[MISSING: release", text="b")],
+     "overlap"),
+])
+def test_resolve_edits_rejects_unknown_ambiguous_and_overlapping_edits(edits, message):
+    with pytest.raises(EditError, match=message):
+        resolve_edits(DRAFT, edits)
+
+
+def test_new_markers_need_allow_new_markers():
+    edits = [Edit(op="insert_after", anchor="stores state.", text=" [MISSING: storage backends]")]
+
+    with pytest.raises(EditError, match="adds a new marker"):
+        apply_edits(DRAFT, edits)
+    assert apply_edits(DRAFT, edits, allow_new_markers=True).endswith("stores state. [MISSING: storage backends]")
+
+
+def test_parse_then_apply_round_trip():
+    output = json.dumps([{"op": "replace", "marker": 1, "text": "1.0"}, {"op": "replace", "marker": 2, "text": "saves"}])
+
+    assert apply_edits(DRAFT, parse_edits(output)) == "LangChain 1.0 added agents. LangGraph saves stores state."
@@ -0,0 +1,124 @@
+"""
+Tests for the gap-fill cache and how the fill modes record into it.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import iter_retgen
+from draft_edits import MISSING_MARKER
+from gap_cache import GapCache, context_hash
+from gap_index import GapIndex
+from iter_retgen import FinalAnswer, GapFilled, fills_from_rewrite, gap_context
+
+DRAFT = "LangChain [MISSING: release date] added agents. LangGraph [MISSING: checkpoint storage] persists state."
+FACTS = {"release date": "in October 2025", "checkpoint storage": "in SQLite or Postgres"}
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> GapCache:
+    return GapCache(tmp_path / "cache")
+
+
+def test_get_matches_normalized_topics_within_one_context(cache: GapCache):
+    context = context_hash("passages")
+    cache.put("the release dates", context, "in October 2025", {"model": "m"})
+
+    assert cache.get("Release date", context).text == "in October 2025"
+    assert cache.get("release date", context_hash("other passages")) is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_entries_expire_after_the_ttl(tmp_path: Path):
+    now = [1000.0]
+    cache = GapCache(tmp_path, ttl=60, clock=lambda: now[0])
+    cache.put("release date", "ctx", "in October 2025")
+
+    now[0] += 61
+
+    assert cache.get("release date", "ctx") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_context_without_retrieval_is_the_question():
+    assert gap_context("What is LangGraph?", None) != gap_context("What is LangChain?", None)
+    assert gap_context("What is LangGraph?", []) == gap_context("What is LangChain?", [])
+
+
+def test_fills_from_rewrite_reads_back_replaced_markers():
+    rewritten = "Agents arrived with LangChain 1.0. LangGraph in SQLite or Postgres persists state."
+
+    fills = fills_from_rewrite(GapIndex(DRAFT), DRAFT, rewritten)
+
+    # The first sentence was reworded around its marker, so no fill can be told apart from the rewording
+    assert fills == {2: "in SQLite or Postgres"}
+
+
+def test_fills_from_rewrite_keeps_punctuation_out_of_the_fill():
+    draft = "It was released [MISSING: release date]. It is stable."
+
+    fills = fills_from_rewrite(GapIndex(draft), draft, "It was released in October 2025. It is stable.")
+
+    assert fills == {1: "in October 2025"}
+
+
+def test_fills_from_rewrite_skips_markers_that_stay_markers():
+    rewritten = "LangChain [MISSING: exact release date] added agents. LangGraph persists state."
+
+    assert fills_from_rewrite(GapIndex(DRAFT), DRAFT, rewritten) == {}
+
+
+def fill_every_marker(inputs: dict) -> str:
+    return MISSING_MARKER.sub(lambda m: FACTS[m.group(1)], inputs["draft"])
+
+
+@pytest.fixture
+def chains(monkeypatch):
+    calls = {"fill": 0}
+
+    def fill(inputs):
+        calls["fill"] += 1
+        return fill_every_marker(inputs)
+
+    monkeypatch.setattr(iter_retgen, "draft_chain", RunnableLambda(lambda inputs: DRAFT))
+    monkeypatch.setattr(iter_retgen, "query_chain", RunnableLambda(lambda inputs: "query"))
+    monkeypatch.setattr(iter_retgen, "fill_chain", RunnableLambda(fill))
+    monkeypatch.setattr(iter_retgen, "expansion_chain", RunnableLambda(lambda inputs: inputs["draft"]))
+    return calls
+
+
+def run(question: str, cache: GapCache) -> list:
+    async def collect():
+        return [event async for event in iter_retgen.iter_retgen_events(question, max_iters=2, cache=cache)]
+    return asyncio.run(collect())
+
+
+def test_rewrite_mode_stores_fills_and_serves_them_to_the_same_question(chains, cache: GapCache):
+    first = run("What is LangGraph?", cache)
+
+    assert {(event.gap.topic, event.text) for event in first if isinstance(event, GapFilled)} == set(FACTS.items())
+    assert cache.stats()["stores"] == 2
+    entry = cache.get("release date", gap_context("What is LangGraph?", None))
+    assert entry.provenance["mode"] == "rewrite"
+
+    second = run("What is LangGraph?", cache)
+
+    assert {event.source for event in second if isinstance(event, GapFilled)} == {"cache"}
+    assert second[-1].answer == first[-1].answer
+    assert chains["fill"] == 1
+
+
+def test_without_retrieval_other_questions_do_not_reuse_fills(chains, cache: GapCache):
+    run("What is LangGraph?", cache)
+
+    events = run("What is LangChain?", cache)
+
+    assert {event.source for event in events if isinstance(event, GapFilled)} == {"model"}
+    assert isinstance(events[-1], FinalAnswer)
+    assert chains["fill"] == 2
@@ -0,0 +1,139 @@
+"""
+Tests for the GapIndex offset and duplicate bookkeeping.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from draft_edits import MISSING_MARKER, apply_splices
+from gap_index import DUPLICATE, FILLED, OPEN, GapIndex, similarity, topic_words
+
+DRAFT = (
+    "LangChain [MISSING: release date] added agents. "
+    "LangGraph [MISSING: checkpoint storage] persists state. "
+    "Also see [MISSING: checkpoints storage] and [MISSING: streaming modes]."
+)
+
+
+def marker_span(draft: str, topic: str, occurrence: int = 0) -> tuple:
+    return [m.span() for m in MISSING_MARKER.finditer(draft) if m.group(1) == topic][occurrence]
+
+
+def assert_spans_match(index: GapIndex, draft: str) -> None:
+    """Every gap still in the draft points at its own marker, and every marker has a gap"""
+    markers = [(m.span(), m.group(1)) for m in MISSING_MARKER.finditer(draft)]
+    assert [(gap.span, gap.topic) for gap in index.in_draft()] == markers
+
+
+@pytest.fixture
+def index() -> GapIndex:
+    return GapIndex(DRAFT)
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("checkpoint storage", "checkpoints storage", 1.0),
+    ("the release date", "release date", 1.0),
+    ("release date", "streaming modes", 0.0),
+    ("", "", 1.0),
+])
+def test_topic_similarity(a, b, expected):
+    assert similarity(topic_words(a), topic_words(b)) == expected
+
+
+def test_initial_markers_and_duplicates(index: GapIndex):
+    assert_spans_match(index, DRAFT)
+    assert [gap.topic for gap in index.open()] == ["release date", "checkpoint storage", "streaming modes"]
+    duplicate = index.gaps[3]
+    assert (duplicate.status, duplicate.duplicate_of) == (DUPLICATE, 2)
+    assert duplicate.history == [(0, "found (duplicate of #2)")]
+    assert [gap.id for gap in index.markers(index.gaps[2])] == [2, 3]
+    assert index.counts() == {OPEN: 3, DUPLICATE: 1, FILLED: 0, "reworded": 0}
+
+
+def test_apply_closes_replaced_gaps_and_shifts_the_rest(index: GapIndex):
+    start, end = marker_span(DRAFT, "release date")
+    splices = [(start, end, "in October 2025")]
+
+    index.apply(splices, iteration=1)
+    draft = apply_splices(DRAFT, splices)
+
+    assert_spans_match(index, draft)
+    assert index.gaps[1].status == FILLED
+    assert [gap.id for gap in index.filled_in(1)] == [1]
+    assert index.counts()[FILLED] == 1
+
+
+def test_apply_registers_markers_in_inserted_text(index: GapIndex):
+    position = DRAFT.index("persists state.") + len("persists state.")
+    start, end = marker_span(DRAFT, "streaming modes")
+    splices = [
+        (position, position, " It needs [MISSING: a checkpointer backend]."),
+        (start, end, "values, updates and messages, see [MISSING: streaming mode]"),
+    ]
+
+    index.apply(splices, iteration=2)
+    draft = apply_splices(DRAFT, splices)
+
+    assert_spans_match(index, draft)
+    added = [gap for gap in index.gaps.values() if gap.history[0][1].startswith("added")]
+    assert [gap.topic for gap in added] == ["a checkpointer backend", "streaming mode"]
+    # The streaming gap was filled in the same splice that re-added its topic: no duplicate of a closed gap
+    assert added[1].status == OPEN
+    assert index.gaps[4].status == FILLED
+
+
+def test_filling_a_canonical_gap_promotes_its_duplicate(index: GapIndex):
+    start, end = marker_span(DRAFT, "checkpoint storage")
+
+    index.apply([(start, end, "SQLite or Postgres")], iteration=1)
+
+    heir = index.gaps[3]
+    assert (heir.status, heir.duplicate_of) == (OPEN, None)
+    assert heir.history[-1] == (1, "promoted (#2 filled)")
+    assert [gap.id for gap in index.open()] == [1, 3, 4]
+
+
+def test_filling_a_gap_and_its_duplicate_together_promotes_nothing(index: GapIndex):
+    splices = sorted(
+        (*marker_span(DRAFT, topic), "filled") for topic in ("checkpoint storage", "checkpoints storage")
+    )
+
+    index.apply(splices, iteration=1)
+
+    assert index.gaps[2].status == FILLED
+    assert index.gaps[3].status == FILLED
+    assert all("promoted" not in event for _, event in index.gaps[3].history)
+    assert_spans_match(index, apply_splices(DRAFT, splices))
+
+
+def test_edits_between_gaps_shift_only_later_spans(index: GapIndex):
+    position = DRAFT.index("added agents.")
+    before = index.gaps[1].span
+
+    index.apply([(position, position + len("added"), "introduced")], iteration=1)
+
+    assert index.gaps[1].span == before
+    assert_spans_match(index, DRAFT.replace("added agents.", "introduced agents."))
+
+
+def test_reconcile_tells_filled_kept_and_reworded_gaps_apart(index: GapIndex):
+    rewritten = (
+        "LangChain 1.0 shipped in October 2025 with agents. "
+        "LangGraph [MISSING: checkpoint storage] persists state "
+        "and streams [MISSING: streaming modes supported] plus [MISSING: memory limits]."
+    )
+
+    index.reconcile(rewritten, iteration=1)
+
+    assert_spans_match(index, rewritten)
+    assert index.gaps[1].status == FILLED
+    assert index.gaps[3].status == FILLED  # duplicate marker dropped from the rewrite
+    streaming = index.gaps[4]
+    assert streaming.topic == "streaming modes supported"
+    assert streaming.history[-1] == (1, "reworded from 'streaming modes'")
+    assert [gap.topic for gap in index.open()][-1] == "memory limits"
+    assert index.counts()["reworded"] == 1
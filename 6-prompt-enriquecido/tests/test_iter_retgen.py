@@ -0,0 +1,197 @@
+"""
+Tests for the ITER-RETGEN engine with stub chains: parallel gap filling and the async API.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import iter_retgen
+from gap_index import GapIndex
+from iter_retgen import DraftCreated, FinalAnswer, GapFilled, fill_gaps_parallel, iter_retgen_events, iter_retgen_many
+
+DRAFT = (
+    "LangGraph [MISSING: checkpoint storage] persists state. "
+    "See also [MISSING: checkpoints storage]. Its roadmap is [MISSING: unknowable plans]."
+)
+
+
+@pytest.fixture
+def asked(monkeypatch) -> list:
+    """Topics sent to the per-gap fill chain, which answers UNKNOWN for 'unknowable' topics"""
+    topics = []
+
+    def fill(inputs):
+        topics.append(inputs["topic"])
+        return "UNKNOWN" if "unknowable" in inputs["topic"] else f"<{inputs['topic']}>"
+
+    monkeypatch.setattr(iter_retgen, "gap_fill_chain", RunnableLambda(fill))
+    monkeypatch.setattr(iter_retgen, "draft_chain", RunnableLambda(lambda inputs: DRAFT))
+    monkeypatch.setattr(iter_retgen, "expansion_chain", RunnableLambda(lambda inputs: inputs["draft"]))
+    return topics
+
+
+def test_duplicates_share_a_fill_and_unknown_keeps_its_marker(asked: list):
+    gaps = GapIndex(DRAFT)
+
+    draft, fills, splices = asyncio.run(fill_gaps_parallel("q?", DRAFT, gaps))
+
+    assert sorted(asked) == ["checkpoint storage", "unknowable plans"]  # the duplicate is not asked
+    assert fills == {1: "<checkpoint storage>"}
+    assert draft == (
+        "LangGraph <checkpoint storage> persists state. "
+        "See also <checkpoint storage>. Its roadmap is [MISSING: unknowable plans]."
+    )
+    assert len(splices) == 2
+
+
+def test_skipped_gaps_are_not_asked_again(asked: list):
+    gaps = GapIndex(DRAFT)
+    unknowable = next(gap.id for gap in gaps.open() if gap.topic == "unknowable plans")
+
+    draft, fills, _ = asyncio.run(fill_gaps_parallel("q?", DRAFT, gaps, skip={unknowable}))
+
+    assert asked == ["checkpoint storage"]
+    assert "[MISSING: unknowable plans]" in draft
+
+    assert asyncio.run(fill_gaps_parallel("q?", DRAFT, gaps, skip={gap.id for gap in gaps.open()})) == (DRAFT, {}, [])
+
+
+def test_parallel_run_stops_when_only_unfillable_gaps_remain(asked: list):
+    async def collect():
+        return [event async for event in iter_retgen.iter_retgen_events("q?", mode="parallel", max_iters=5)]
+
+    events = asyncio.run(collect())
+    final = events[-1]
+
+    assert isinstance(final, FinalAnswer)
+    assert final.reason == "unfillable"
+    assert final.stats["remaining_gaps"] == 1
+    assert asked.count("unknowable plans") == 1  # answered UNKNOWN once, never asked again
+    assert [(event.gap.topic, event.text) for event in events if isinstance(event, GapFilled)] == [
+        ("checkpoint storage", "<checkpoint storage>")
+    ]
+
+
+def collect(question: str = "q?", **kwargs) -> list:
+    async def run():
+        return [event async for event in iter_retgen_events(question, mode="parallel", **kwargs)]
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def slow_fill(monkeypatch) -> dict:
+    """A per-gap fill chain that takes a second and records whether it was cancelled"""
+    state = {"started": 0, "cancelled": 0}
+
+    async def fill(inputs):
+        state["started"] += 1
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            state["cancelled"] += 1
+            raise
+        return "filled"
+
+    monkeypatch.setattr(iter_retgen, "gap_fill_chain", RunnableLambda(fill))
+    monkeypatch.setattr(iter_retgen, "draft_chain", RunnableLambda(lambda inputs: DRAFT))
+    return state
+
+
+def test_deadline_yields_the_partial_draft(slow_fill: dict):
+    events = collect(deadline=0.2)
+    final = events[-1]
+
+    assert isinstance(final, FinalAnswer)
+    assert (final.reason, final.stats["stop_reason"]) == ("deadline", "deadline")
+    assert final.answer == DRAFT
+    assert final.stats["remaining_gaps"] == 2  # the duplicate marker is counted apart
+    assert slow_fill["cancelled"] == slow_fill["started"] > 0  # the in-flight fills were cancelled
+
+
+def test_stop_event_ends_the_run_between_iterations(slow_fill: dict):
+    stop = asyncio.Event()
+
+    async def run():
+        events = []
+        async for event in iter_retgen_events("q?", mode="parallel", stop=stop):
+            events.append(event)
+            if isinstance(event, DraftCreated):
+                stop.set()
+        return events
+
+    events = asyncio.run(run())
+
+    assert events[-1].reason == "cancelled"
+    assert events[-1].answer == DRAFT
+    assert slow_fill["started"] == 0
+
+
+def test_cancelling_the_consumer_cancels_the_model_calls(slow_fill: dict):
+    async def run():
+        async def consume():
+            async for _ in iter_retgen_events("q?", mode="parallel"):
+                pass
+
+        task = asyncio.create_task(consume())
+        while not slow_fill["started"]:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+
+    assert slow_fill["cancelled"] == slow_fill["started"] > 0
+
+
+@pytest.fixture
+def per_question_chains(monkeypatch) -> dict:
+    """Drafts take longer for earlier questions; 'boom' fails its draft"""
+    state = {"active": 0, "peak": 0}
+
+    async def draft(inputs):
+        if inputs["question"] == "boom":
+            raise RuntimeError("draft model down")
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.05 * (3 - int(inputs["question"])))
+        state["active"] -= 1
+        return f"Answer {inputs['question']} with [MISSING: detail {inputs['question']}]."
+
+    monkeypatch.setattr(iter_retgen, "draft_chain", RunnableLambda(draft))
+    monkeypatch.setattr(iter_retgen, "gap_fill_chain", RunnableLambda(lambda inputs: "filled"))
+    monkeypatch.setattr(iter_retgen, "expansion_chain", RunnableLambda(lambda inputs: inputs["draft"]))
+    return state
+
+
+def test_many_interleaves_runs_and_bounds_concurrency(per_question_chains: dict):
+    async def run():
+        return [item async for item in iter_retgen_many(["0", "1", "2"], max_parallel=2, mode="parallel", max_iters=1)]
+
+    items = asyncio.run(run())
+    finals = {index: event for index, event in items if isinstance(event, FinalAnswer)}
+    order = [index for index, event in items if isinstance(event, DraftCreated)]
+
+    assert sorted(finals) == [0, 1, 2]
+    assert finals[2].answer == "Answer 2 with filled."
+    assert order == [1, 0, 2]  # question 1 drafts faster than 0; 2 waits for a free slot
+    assert per_question_chains["peak"] == 2
+
+
+def test_many_raises_the_first_error_and_cancels_the_rest(per_question_chains: dict):
+    async def run():
+        seen = []
+        with pytest.raises(RuntimeError, match="draft model down"):
+            async for index, event in iter_retgen_many(["0", "boom", "2"], max_parallel=3, mode="parallel"):
+                seen.append((index, event))
+        return seen
+
+    seen = asyncio.run(run())
+
+    assert not any(isinstance(event, FinalAnswer) for _, event in seen)
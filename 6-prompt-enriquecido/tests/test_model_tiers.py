@@ -0,0 +1,114 @@
+"""
+Tests for per-stage model tiers, escalation and the draft validation they rely on.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from iter_retgen import MAX_DRAFT_MARKERS, validate_draft
+from model_tiers import DEFAULT_MODEL, DEFAULT_TEMPERATURE, StageFailed, StageModels, StageRunner, Tier
+
+CHEAP, STRONG = "openai:gpt-4.1-nano", "openai:gpt-4o"
+
+
+def models_of(stage_models: StageModels) -> dict:
+    return {stage: [(tier.model, tier.temperature) for tier in tiers] for stage, tiers in stage_models.tiers.items()}
+
+
+def test_parse_reads_tiers_and_temperatures():
+    models = StageModels.parse([f"fill={CHEAP}, {STRONG}@0.2", f"query={CHEAP}@0"])
+
+    assert models_of(models) == {
+        "fill": [(CHEAP, DEFAULT_TEMPERATURE), (STRONG, 0.2)],
+        "query": [(CHEAP, 0.0)],
+    }
+    assert models.for_stage("draft") == [Tier(DEFAULT_MODEL)]
+
+
+def test_parse_overrides_stages_of_the_base_only():
+    base = StageModels.preset()
+
+    models = StageModels.parse([f"fill={STRONG}"], base)
+
+    assert models_of(models)["fill"] == [(STRONG, DEFAULT_TEMPERATURE)]
+    assert models.tiers["draft"] == base.tiers["draft"]
+    assert len(base.tiers["fill"]) == 2  # the base is not modified
+
+
+@pytest.mark.parametrize("spec", ["review=openai:gpt-4o", "fill=", "fill", f"fill={CHEAP}@hot"])
+def test_parse_rejects_malformed_specs(spec):
+    with pytest.raises(ValueError):
+        StageModels.parse([spec])
+
+
+def chain_answering(by_model: dict) -> RunnableLambda:
+    """A chain whose output depends on the model the runner configured"""
+    return RunnableLambda(lambda inputs, config: by_model[config["configurable"]["model"]])
+
+
+def test_invoke_escalates_until_the_output_validates():
+    runner = StageRunner(StageModels.parse([f"draft={CHEAP},{STRONG}"]))
+    chain = chain_answering({CHEAP: "", STRONG: "LangGraph [MISSING: checkpoints] persists state."})
+
+    output = asyncio.run(runner.invoke("draft", chain, {"question": "q"}, validate_draft))
+
+    assert output.startswith("LangGraph")
+    assert runner.last_model["draft"] == STRONG
+    assert runner.report.escalations == {"draft": 1}
+    usage = runner.report.as_dict()["draft"]["models"]
+    assert (usage[CHEAP]["calls"], usage[CHEAP]["rejected"], usage[STRONG]["rejected"]) == (1, 1, 0)
+
+
+def test_invoke_stays_on_the_first_tier_when_it_validates():
+    runner = StageRunner(StageModels.parse([f"draft={CHEAP},{STRONG}"]))
+    chain = chain_answering({CHEAP: "LangGraph persists state in checkpoints.", STRONG: "unused"})
+
+    # No markers at all is a complete answer, not a failure
+    assert asyncio.run(runner.invoke("draft", chain, {}, validate_draft)).startswith("LangGraph")
+    assert runner.report.escalations == {}
+
+
+def test_invoke_raises_with_the_last_output_when_every_tier_fails():
+    runner = StageRunner(StageModels.parse([f"draft={CHEAP},{STRONG}"]))
+    too_many = " ".join(f"[MISSING: topic {n}]" for n in range(MAX_DRAFT_MARKERS + 1))
+
+    with pytest.raises(StageFailed) as failure:
+        asyncio.run(runner.invoke("draft", chain_answering({CHEAP: "", STRONG: too_many}), {}, validate_draft))
+
+    assert (failure.value.stage, failure.value.output) == ("draft", too_many)
+    assert failure.value.error == f"{MAX_DRAFT_MARKERS + 1} markers (at most {MAX_DRAFT_MARKERS})"
+    assert "draft" not in runner.last_model
+
+
+def test_batch_escalates_only_the_rejected_items():
+    runner = StageRunner(StageModels.parse([f"fill={CHEAP},{STRONG}"]))
+    chain = RunnableLambda(
+        lambda inputs, config: "" if inputs["hard"] and config["configurable"]["model"] == CHEAP else "filled"
+    )
+
+    outputs = asyncio.run(runner.batch(
+        "fill", chain, [{"hard": False}, {"hard": True}, {"hard": False}], lambda output: None if output else "empty"
+    ))
+
+    assert outputs == ["filled"] * 3
+    assert runner.report.escalations == {"fill": 1}
+    usage = runner.report.as_dict()["fill"]["models"]
+    assert (usage[CHEAP]["calls"], usage[STRONG]["calls"]) == (3, 1)
+
+
+@pytest.mark.parametrize("draft, error", [
+    ("LangGraph persists state.", None),
+    ("LangGraph persists [MISSING: storage] state.", None),
+    ("   ", "empty draft"),
+    (" ".join(["[MISSING: x]"] * (MAX_DRAFT_MARKERS + 1)), f"{MAX_DRAFT_MARKERS + 1} markers"),
+])
+def test_validate_draft(draft, error):
+    result = validate_draft(draft)
+
+    assert result is None if error is None else result.startswith(error)
@@ -0,0 +1,144 @@
+"""
+Tests for the local BM25 index and its persisted cache.
+"""
+
+import math
+import os
+import pickle
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from retrieval import BM25Index, Passage, load_or_build, search_gaps, split_passages, tokenize
+
+
+def index_of(*texts: str) -> BM25Index:
+    index = BM25Index()
+    for number, text in enumerate(texts):
+        index.add(Passage(f"doc{number}.md", 1, text))
+    return index
+
+
+@pytest.fixture
+def docs_dir(tmp_path: Path) -> Path:
+    docs = tmp_path / "docs"
+    (docs / "guide").mkdir(parents=True)
+    (docs / "guide" / "langgraph.md").write_text(
+        "LangGraph checkpoints persist graph state.\n\nCheckpointers save every step.\n", encoding="utf-8"
+    )
+    (docs / "langchain.md").write_text("LangChain runnables compose chat models and prompts.\n", encoding="utf-8")
+    (docs / "image.png").write_bytes(b"\x89PNG")
+    return docs
+
+
+def test_tokenize_splits_identifiers_and_drops_stopwords():
+    assert tokenize("The StateGraph of snake_case_name") == ["state", "graph", "snake", "case", "name"]
+
+
+def test_split_passages_groups_blocks_and_keeps_line_numbers():
+    text = "first block\nstill first\n\n\nsecond block\n"
+
+    passages = list(split_passages(text, "doc.md", max_chars=10))
+
+    assert [(p.start_line, p.text) for p in passages] == [(1, "first block\nstill first"), (5, "second block")]
+
+
+def test_bm25_scores_match_the_formula():
+    index = index_of("checkpoint checkpoint state", "graph state", "runnable chain")
+
+    [top, second] = index.search("checkpoint state", k=3)
+
+    n, avg_length, k1, b = 3, 7 / 3, index.k1, index.b
+    idf = lambda df: math.log(1 + (n - df + 0.5) / (df + 0.5))
+    term = lambda tf, length, df: idf(df) * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_length))
+    assert top.passage.source == "doc0.md"
+    assert top.score == pytest.approx(term(2, 3, 1) + term(1, 3, 2))
+    assert second.passage.source == "doc1.md"
+    assert second.score == pytest.approx(term(1, 2, 2))
+
+
+def test_search_ignores_unknown_terms_and_empty_index():
+    assert index_of("graph state").search("unrelated words", k=3) == []
+    assert BM25Index().search("graph", k=3) == []
+
+
+def test_search_gaps_weights_each_topic():
+    index = index_of("checkpoint persistence", "runnable composition")
+
+    results = search_gaps(index, "Explain LangGraph", ["checkpoint", "runnable"], top_k=1)
+
+    assert {topic: hits[0].passage.source for topic, hits in results.items()} == {
+        "checkpoint": "doc0.md",
+        "runnable": "doc1.md",
+    }
+
+
+def test_load_or_build_saves_then_reloads(docs_dir: Path, tmp_path: Path):
+    index_path = tmp_path / "cache" / "bm25.pkl"
+
+    built, was_built = load_or_build(docs_dir, index_path)
+    loaded, was_rebuilt = load_or_build(docs_dir, index_path)
+
+    assert (was_built, was_rebuilt) == (True, False)
+    assert index_path.exists()
+    assert [p.source for p in loaded.passages] == [p.source for p in built.passages]
+    assert {p.source for p in loaded.passages} == {"langchain.md", os.path.join("guide", "langgraph.md")}
+    assert loaded.search("checkpoints", k=1)[0].passage.source == os.path.join("guide", "langgraph.md")
+
+
+def test_changed_document_invalidates_the_saved_index(docs_dir: Path, tmp_path: Path):
+    index_path = tmp_path / "bm25.pkl"
+    load_or_build(docs_dir, index_path)
+
+    page = docs_dir / "langchain.md"
+    page.write_text("LangChain agents call tools in a loop.\n", encoding="utf-8")
+    stat = page.stat()
+    os.utime(page, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    index, built = load_or_build(docs_dir, index_path)
+
+    assert built
+    assert index.search("tools", k=1)[0].passage.source == "langchain.md"
+
+
+def test_split_parameters_invalidate_the_saved_index(docs_dir: Path, tmp_path: Path):
+    index_path = tmp_path / "bm25.pkl"
+    load_or_build(docs_dir, index_path)
+
+    _, built = load_or_build(docs_dir, index_path, max_chars=10)
+
+    assert built
+
+
+def test_index_of_another_format_version_is_rebuilt(docs_dir: Path, tmp_path: Path):
+    index_path = tmp_path / "bm25.pkl"
+    index_path.write_bytes(pickle.dumps({"format": 0, "index": None}))
+
+    index, built = load_or_build(docs_dir, index_path)
+
+    assert built
+    assert index.passages
+    assert BM25Index.load(index_path) is not None
+
+
+@pytest.mark.parametrize("content", [b"# My notes\n", pickle.dumps(["not", "an", "index"]), pickle.dumps({"a": 1})])
+def test_a_file_that_is_not_an_index_is_left_alone(docs_dir: Path, tmp_path: Path, content):
+    index_path = tmp_path / "notes.md"
+    index_path.write_bytes(content)
+
+    with pytest.raises(FileExistsError, match="not a BM25 index"):
+        load_or_build(docs_dir, index_path)
+
+    assert index_path.read_bytes() == content
+
+
+def test_a_directory_is_refused(docs_dir: Path):
+    with pytest.raises(FileExistsError, match="not a BM25 index"):
+        load_or_build(docs_dir, docs_dir)
+
+
+def test_missing_documents_directory_raises(tmp_path: Path):
+    with pytest.raises(FileNotFoundError):
+        load_or_build(tmp_path / "missing", tmp_path / "bm25.pkl")
@@ -0,0 +1,133 @@
+"""
+Tests for deterministic slot extraction with the default PR review fields.
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from slot_extraction import AMBIGUOUS, MISSING, RESOLVED, SlotExtractor
+
+# The script's name is not importable, so load its module from the file
+_spec = importlib.util.spec_from_file_location("query_enrichment", Path(__file__).parent.parent / "2-query-enrichment.py")
+query_enrichment = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(query_enrichment)
+
+
+@pytest.fixture(scope="module")
+def extractor() -> SlotExtractor:
+    return SlotExtractor(query_enrichment.EnrichmentConfig().required_information)
+
+
+def values(extractor: SlotExtractor, text: str, field: str):
+    slot = extractor.extract(text)[field]
+    return slot.value if slot.status == RESOLVED else None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Review PR #42 in acme/api on feature/login", "acme/api"),
+    ("see https://github.com/acme/web-app/pull/7", "acme/web-app"),
+    ("clone git@github.com:acme/api.git first", "acme/api"),
+    ("repository: acme/socket.io", "acme/socket.io"),
+    ("the repo is `acme/api.git`.", "acme/api"),
+    ("pulled from acme/api.", "acme/api"),
+    ("Fix the bug in src/app.py", None),
+    ("Fix the bug in utils/helpers.ts", None),
+    ("move it from lib/cache to tests/cache", None),
+    ("Rename the handler in core/http/server", None),
+    ("Fix in src/app.py for repo acme/api", "acme/api"),
+    ("merge feature/login", None),
+    ("changes in 3/4 of the files", None),
+])
+def test_repository(extractor: SlotExtractor, text, expected):
+    assert values(extractor, text, "repository") == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Review PR #42 in acme/api on feature/login", "feature/login"),
+    ("merge hotfix/1.2.3 into main", "hotfix/1.2.3"),
+    ("branch: login-form", "login-form"),
+    ("the change is on develop", "develop"),
+    ("PR #5 from master", "master"),
+    ("Please merge PR #5 into main", None),
+    ("Update docs/setup.md", None),
+    ("Review PR #42", None),
+])
+def test_branch(extractor: SlotExtractor, text, expected):
+    assert values(extractor, text, "branch") == expected
+
+
+def test_extract_resolves_answers_patterns_and_flags_free_text(extractor: SlotExtractor):
+    text = (
+        "Review PR #42 in acme/api, keep it lint clean. I'm worried about performance"
+        " | What is the branch name?: release/2.0"
+        " | What style guide should be followed?: "
+    )
+
+    slots = extractor.extract(text)
+
+    assert {field: (slot.status, slot.value, slot.source) for field, slot in slots.items()} == {
+        "pr_id": (RESOLVED, "42", "pattern"),
+        "repository": (RESOLVED, "acme/api", "pattern"),
+        "branch": (RESOLVED, "release/2.0", "answer"),
+        "concerns": (RESOLVED, "performance", "pattern"),
+        "style_guide": (AMBIGUOUS, None, None),  # an empty answer does not count, "lint" hints at the field
+        "test_requirements": (MISSING, None, None),
+    }
+
+
+def test_hints_are_only_read_from_the_users_own_text(extractor: SlotExtractor):
+    slots = extractor.extract("Review PR #42 | What is the repository name?: acme/test-coverage")
+
+    assert slots["repository"].source == "answer"
+    assert slots["test_requirements"].status == MISSING
+
+
+def test_patterns_are_only_matched_against_the_users_own_text(extractor: SlotExtractor):
+    slots = extractor.extract("Review my PR | What are your specific concerns?: the fix for issue #99 regresses login")
+
+    assert slots["concerns"].source == "answer"
+    assert slots["pr_id"].status == MISSING
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("my concerns are security and perf; PEP 8; 80% coverage", "security and perf"),
+    ("Concern: memory leaks. Also check the docs", "memory leaks"),
+    ("concerned about latency | What is the PR ID?: 42", "latency"),
+])
+def test_concerns(extractor: SlotExtractor, text, expected):
+    assert values(extractor, text, "concerns") == expected
+
+
+@pytest.mark.parametrize("text, answers, free_text", [
+    ("Review PR #42", {}, "Review PR #42"),
+    ("Review it | What is the PR ID?: 42", {"pr_id": "42"}, "Review it"),
+    ("What is the PR ID?:   | What is the branch name?: dev", {"branch": "dev"}, ""),
+    ("a | b", {}, "a | b"),
+])
+def test_split(extractor: SlotExtractor, text, answers, free_text):
+    assert extractor.split(text) == (answers, free_text)
+
+
+@pytest.mark.parametrize("value, status, expected", [
+    ("security and memory leaks", RESOLVED, "security and memory leaks"),
+    ("  PEP 8  ", RESOLVED, "PEP 8"),
+    ("null", MISSING, None),
+    ("Unknown", MISSING, None),
+    ("", MISSING, None),
+    (None, MISSING, None),
+    (["not", "a", "string"], MISSING, None),
+])
+def test_merge_applies_model_values_to_ambiguous_slots(extractor: SlotExtractor, value, status, expected):
+    slots = extractor.extract("Review PR #42, mind the security")
+    assert slots["concerns"].status == AMBIGUOUS
+
+    SlotExtractor.merge(slots, {"concerns": value, "pr_id": "7"})
+
+    assert (slots["concerns"].status, slots["concerns"].value) == (status, expected)
+    assert slots["concerns"].source == ("llm" if status == RESOLVED else None)
+    assert slots["pr_id"].value == "42"  # resolved slots are left alone
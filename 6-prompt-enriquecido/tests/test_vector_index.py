@@ -0,0 +1,131 @@
+"""
+Tests for the on-disk vector index and where it is allowed to write.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from vector_index import HashingEmbedder, VectorIndex, VectorRetriever, load_or_build_vectors
+
+
+@pytest.fixture
+def docs_dir(tmp_path: Path) -> Path:
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "langgraph.md").write_text("LangGraph checkpoints persist graph state.\n", encoding="utf-8")
+    (docs / "langchain.md").write_text("LangChain runnables compose chat models and prompts.\n", encoding="utf-8")
+    return docs
+
+
+def test_build_then_reload(docs_dir: Path, tmp_path: Path):
+    embedder = HashingEmbedder(dim=64)
+    directory = tmp_path / "vectors"
+
+    built, was_built = load_or_build_vectors(docs_dir, embedder, directory)
+    loaded, was_rebuilt = load_or_build_vectors(docs_dir, embedder, directory)
+
+    assert (was_built, was_rebuilt) == (True, False)
+    assert len(loaded) == len(built) == 2
+    assert VectorRetriever(loaded, embedder).search("checkpoints persist state", k=1)[0].passage.source == "langgraph.md"
+
+
+def test_an_outdated_index_is_replaced(docs_dir: Path, tmp_path: Path):
+    directory = tmp_path / "vectors"
+    directory.mkdir()
+    (directory / "meta.json").write_text(json.dumps({"format": 0, "dim": 8, "count": 0}), encoding="utf-8")
+    (directory / "vectors.f32").write_bytes(b"old")
+
+    index, built = load_or_build_vectors(docs_dir, HashingEmbedder(dim=64), directory)
+
+    assert built
+    assert index.dim == 64
+    assert VectorIndex.open(directory).count == 2
+
+
+def test_an_empty_directory_is_used(docs_dir: Path, tmp_path: Path):
+    directory = tmp_path / "vectors"
+    directory.mkdir()
+
+    _, built = load_or_build_vectors(docs_dir, HashingEmbedder(dim=64), directory)
+
+    assert built
+
+
+def test_a_directory_that_is_not_an_index_is_left_alone(docs_dir: Path):
+    # e.g. --index-path pointing at the documents themselves
+    before = sorted(path.name for path in docs_dir.iterdir())
+
+    with pytest.raises(FileExistsError, match="not a vector index"):
+        load_or_build_vectors(docs_dir, HashingEmbedder(dim=64), docs_dir)
+
+    assert sorted(path.name for path in docs_dir.iterdir()) == before
+
+
+def test_a_file_path_is_refused(docs_dir: Path, tmp_path: Path):
+    bm25_index = tmp_path / "bm25.pkl"
+    bm25_index.write_bytes(b"pickle")
+
+    with pytest.raises(FileExistsError, match="not a vector index"):
+        VectorIndex.create(bm25_index, dim=64)
+
+    assert bm25_index.read_bytes() == b"pickle"
+
+
+def brute_force(index: VectorIndex, queries: np.ndarray, k: int):
+    matrix = np.asarray(index.matrix())
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = queries @ matrix.T
+    rows = np.argsort(-scores, axis=1)[:, :k]
+    return rows, np.take_along_axis(scores, rows, axis=1)
+
+
+@pytest.mark.parametrize("block_rows", [1, 3, 7, 64])
+def test_search_matches_brute_force_across_blocks(tmp_path: Path, block_rows: int):
+    rng = np.random.default_rng(0)
+    index = VectorIndex.create(tmp_path / "vectors", dim=16)
+    vectors = rng.standard_normal((23, 16))
+    for start in range(0, len(vectors), 5):
+        chunk = vectors[start:start + 5]
+        index.add([f"v{start + i}" for i in range(len(chunk))], chunk)
+    queries = rng.standard_normal((4, 16))
+
+    rows, scores = index.search_vectors(queries, k=6, block_rows=block_rows)
+    expected_rows, expected_scores = brute_force(index, queries, k=6)
+
+    assert len(index) == 23
+    assert np.array_equal(rows, expected_rows)
+    assert np.allclose(scores, expected_scores, atol=1e-6)
+    assert [hit.id for hit in index.search(queries[:1], k=2)[0]] == [f"v{row}" for row in expected_rows[0, :2]]
+
+
+def test_add_drops_rows_left_by_an_interrupted_add(tmp_path: Path):
+    rng = np.random.default_rng(1)
+    index = VectorIndex.create(tmp_path / "vectors", dim=8)
+    index.add(["a", "b"], rng.standard_normal((2, 8)), [{"n": 0}, {"n": 1}])
+
+    # an add that wrote its rows but died before committing meta.json
+    with open(index.vectors_path, "ab") as f:
+        f.write(np.ones((3, 8), dtype="<f4").tobytes() + b"\x00\x01")
+    with open(index.records_path, "ab") as f:
+        garbage_start = f.tell()
+        f.write(b'{"id": "lost"}\n{"id": "half')
+    with open(index.offsets_path, "ab") as f:
+        f.write(np.array([garbage_start, garbage_start + 15], dtype="<u8").tobytes())
+
+    reopened = VectorIndex.open(tmp_path / "vectors")
+    new_vectors = rng.standard_normal((2, 8))
+    reopened.add(["c", "d"], new_vectors, [{"n": 2}, {"n": 3}])
+
+    assert len(reopened) == 4
+    assert reopened.vectors_path.stat().st_size == 4 * 8 * 4
+    assert reopened.offsets_path.stat().st_size == 4 * 8
+    assert [reopened.record(row)["id"] for row in range(4)] == ["a", "b", "c", "d"]
+    assert len(reopened.records_path.read_bytes().splitlines()) == 4
+    rows, _ = reopened.search_vectors(new_vectors, k=1)
+    assert rows[:, 0].tolist() == [2, 3]
@@ -0,0 +1,399 @@
+"""
+Dense vector index on disk for semantic retrieval.
+
+Embeddings are L2-normalized float32 rows appended to a raw file that is
+read through a NumPy memmap, so workers share the page cache instead of
+each loading the corpus into RAM. A sidecar table maps rows to ids and
+payloads (JSON lines plus a uint64 offset file), and only the rows of the
+hits are read back. Cosine top-k is a blocked matrix product of the query
+batch against the memmap.
+
+Index directory layout:
+    vectors.f32    count x dim float32, row-major
+    records.jsonl  one {"id": ..., **payload} per row
+    records.off    uint64 byte offset of each record
+    meta.json      format, dim, count, embedder name, docs fingerprint
+
+meta.json is written last, so rows appended by an interrupted add() are
+ignored by readers and truncated by the next add(). Readers opened before
+an append keep seeing the old count until they are reopened.
+
+Embedders are pluggable: anything with `name`, `dim` and
+`embed(texts) -> float32 array`. HashingEmbedder is deterministic and
+local (for offline tests); LangChainEmbedder wraps a LangChain Embeddings
+model such as "openai:text-embedding-3-small".
+
+Usage:
+    from vector_index import VectorRetriever, make_embedder, load_or_build_vectors
+    embedder = make_embedder("hashing")
+    index, built = load_or_build_vectors("repo_langchain_1.0", embedder)
+    for hit in VectorRetriever(index, embedder).search("checkpoint persistence", k=3):
+        print(hit.score, hit.passage.source)
+"""
+
+import hashlib
+import json
+import math
+import os
+import shutil
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from retrieval import (
+    DEFAULT_CACHE_DIR, Passage, SearchHit, fingerprint, iter_documents, load_or_build, split_passages, tokenize,
+)
+
+INDEX_FORMAT = 1
+BLOCK_ROWS = 65_536
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Rows scaled to unit length (zero rows stay zero)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+# ========= Embedders =========
+
+@lru_cache(maxsize=200_000)
+def _hash_slot(feature: str, dim: int) -> Tuple[int, float]:
+    value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    return value % dim, 1.0 if value >> 63 else -1.0
+
+
+class HashingEmbedder:
+    """Signed feature hashing of word unigrams and bigrams: deterministic, no model or network"""
+
+    def __init__(self, dim: int = 256, bigrams: bool = True):
+        self.dim = dim
+        self.bigrams = bigrams
+        self.name = f"hashing-{dim}" + ("-bigrams" if bigrams else "")
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            features = tokens + ([f"{a} {b}" for a, b in zip(tokens, tokens[1:])] if self.bigrams else [])
+            for feature, count in Counter(features).items():
+                slot, sign = _hash_slot(feature, self.dim)
+                vectors[row, slot] += sign * (1 + math.log(count))
+        return normalize(vectors)
+
+
+class LangChainEmbedder:
+    """Adapter for a LangChain Embeddings model"""
+
+    def __init__(self, embeddings, name: str, dim: Optional[int] = None):
+        self.embeddings = embeddings
+        self.name = name
+        self.dim = dim or len(embeddings.embed_query("dimension probe"))
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return normalize(np.asarray(self.embeddings.embed_documents(list(texts)), dtype=np.float32))
+
+
+def make_embedder(spec: str = "hashing"):
+    """Embedder for a spec: hashing, hashing:<dim>, or a LangChain embeddings id (openai:text-embedding-3-small)"""
+    if spec == "hashing" or spec.startswith("hashing:"):
+        return HashingEmbedder(int(spec.split(":", 1)[1])) if ":" in spec else HashingEmbedder()
+    from langchain.embeddings import init_embeddings
+
+    return LangChainEmbedder(init_embeddings(spec), spec)
+
+# ========= Vector Index =========
+
+@dataclass
+class VectorHit:
+    id: str
+    score: float
+    payload: Dict[str, Any] = field(default_factory=dict)
+
+
+class VectorIndex:
+    """Append-only memmap of normalized float32 vectors with a sidecar id/payload table"""
+
+    def __init__(self, directory: Path, dim: int, embedder: str = "", docs_fingerprint: str = ""):
+        self.directory = Path(directory)
+        self.dim = dim
+        self.embedder = embedder
+        self.fingerprint = docs_fingerprint
+        self.count = 0
+        self._matrix: Optional[np.memmap] = None
+        self._offsets: Optional[np.memmap] = None
+
+    @property
+    def vectors_path(self) -> Path:
+        return self.directory / "vectors.f32"
+
+    @property
+    def records_path(self) -> Path:
+        return self.directory / "records.jsonl"
+
+    @property
+    def offsets_path(self) -> Path:
+        return self.directory / "records.off"
+
+    @property
+    def meta_path(self) -> Path:
+        return self.directory / "meta.json"
+
+    @classmethod
+    def create(cls, directory: Path, dim: int, embedder: str = "", docs_fingerprint: str = "") -> "VectorIndex":
+        """
+        A new empty index; an existing index in the directory is replaced.
+
+        Raises:
+            FileExistsError if the path holds anything but an index (or an empty directory)
+        """
+        directory = Path(directory)
+        if cls.is_index(directory):
+            shutil.rmtree(directory)
+        elif directory.exists() and (not directory.is_dir() or any(directory.iterdir())):
+            raise FileExistsError(f"{directory} exists and is not a vector index; refusing to overwrite it")
+        directory.mkdir(parents=True, exist_ok=True)
+        index = cls(directory, dim, embedder, docs_fingerprint)
+        for path in (index.vectors_path, index.records_path, index.offsets_path):
+            path.touch()
+        index._write_meta()
+        return index
+
+    @staticmethod
+    def is_index(directory: Path) -> bool:
+        """Whether the directory holds an index of any format version (safe to replace)"""
+        try:
+            with open(Path(directory) / "meta.json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return isinstance(meta, dict) and "format" in meta and "dim" in meta
+
+    @classmethod
+    def open(cls, directory: Path) -> Optional["VectorIndex"]:
+        """Open a saved index; None if missing or written by another format version"""
+        try:
+            with open(Path(directory) / "meta.json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("format") != INDEX_FORMAT:
+            return None
+        index = cls(directory, meta["dim"], meta.get("embedder", ""), meta.get("fingerprint", ""))
+        index.count = meta["count"]
+        return index
+
+    def _write_meta(self) -> None:
+        tmp = self.meta_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "format": INDEX_FORMAT, "dim": self.dim, "count": self.count,
+                "embedder": self.embedder, "fingerprint": self.fingerprint,
+            }, f)
+        os.replace(tmp, self.meta_path)
+
+    def _truncate(self) -> None:
+        """Drop rows written after the last committed count (an interrupted add)"""
+        with open(self.vectors_path, "r+b") as f:
+            f.truncate(self.count * self.dim * 4)
+        with open(self.offsets_path, "r+b") as f:
+            f.seek(self.count * 8)
+            end = f.read(8)
+            f.truncate(self.count * 8)
+        if len(end) == 8:
+            with open(self.records_path, "r+b") as f:
+                f.truncate(int.from_bytes(end, "little"))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray, payloads: Optional[Sequence[Dict[str, Any]]] = None) -> None:
+        """Append rows; vectors are normalized here"""
+        vectors = normalize(np.atleast_2d(vectors))
+        if vectors.shape != (len(ids), self.dim):
+            raise ValueError(f"Expected {len(ids)} vectors of dimension {self.dim}, got shape {vectors.shape}")
+        if payloads is not None and len(payloads) != len(ids):
+            raise ValueError("payloads must match ids")
+        self._truncate()
+
+        with open(self.vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype="<f4").tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self.records_path, "ab") as records:
+            position = records.tell()
+            offsets = np.empty(len(ids), dtype="<u8")
+            for i, record_id in enumerate(ids):
+                line = json.dumps({"id": str(record_id), **(payloads[i] if payloads else {})}, ensure_ascii=False)
+                data = line.encode("utf-8") + b"\n"
+                offsets[i] = position
+                records.write(data)
+                position += len(data)
+            records.flush()
+            os.fsync(records.fileno())
+        with open(self.offsets_path, "ab") as f:
+            f.write(offsets.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.count += len(ids)
+        self._write_meta()
+        self._matrix = self._offsets = None
+
+    def matrix(self) -> np.ndarray:
+        """The vectors as a read-only memmap (count x dim)"""
+        if self.count == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        if self._matrix is None or self._matrix.shape[0] != self.count:
+            self._matrix = np.memmap(self.vectors_path, dtype="<f4", mode="r", shape=(self.count, self.dim))
+        return self._matrix
+
+    def record(self, row: int) -> Dict[str, Any]:
+        if self._offsets is None or self._offsets.shape[0] != self.count:
+            self._offsets = np.memmap(self.offsets_path, dtype="<u8", mode="r", shape=(self.count,))
+        with open(self.records_path, "rb") as f:
+            f.seek(int(self._offsets[row]))
+            return json.loads(f.readline())
+
+    def search_vectors(self, queries: np.ndarray, k: int = 5, block_rows: int = BLOCK_ROWS) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cosine top-k for a batch of query vectors.
+
+        Returns:
+            (rows, scores), each of shape (len(queries), min(k, count)), best first
+        """
+        queries = normalize(np.atleast_2d(queries))
+        k = min(k, self.count)
+        if k == 0:
+            empty = np.zeros((len(queries), 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+
+        matrix = self.matrix()
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), k), dtype=np.int64)
+        for start in range(0, self.count, block_rows):
+            scores = queries @ matrix[start:start + block_rows].T
+            if scores.shape[1] > k:
+                candidates = np.argpartition(scores, -k, axis=1)[:, -k:]
+            else:
+                candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+            merged_scores = np.concatenate([best_scores, np.take_along_axis(scores, candidates, axis=1)], axis=1)
+            merged_rows = np.concatenate([best_rows, candidates + start], axis=1)
+            keep = np.argpartition(merged_scores, -k, axis=1)[:, -k:]
+            best_scores = np.take_along_axis(merged_scores, keep, axis=1)
+            best_rows = np.take_along_axis(merged_rows, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def search(self, queries: np.ndarray, k: int = 5) -> List[List[VectorHit]]:
+        """Top-k hits with their ids and payloads for each query vector"""
+        rows, scores = self.search_vectors(queries, k)
+        results = []
+        for query_rows, query_scores in zip(rows, scores):
+            hits = []
+            for row, score in zip(query_rows, query_scores):
+                record = self.record(int(row))
+                hits.append(VectorHit(record.pop("id"), float(score), record))
+            results.append(hits)
+        return results
+
+# ========= Retrieval =========
+
+class VectorRetriever:
+    """Text search over a VectorIndex of passages, returning SearchHits like BM25Index"""
+
+    def __init__(self, index: VectorIndex, embedder):
+        if index.embedder and index.embedder != embedder.name:
+            raise ValueError(f"Index was built with embedder '{index.embedder}', not '{embedder.name}'")
+        self.index = index
+        self.embedder = embedder
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def search_many(self, queries: Sequence[str], k: int = 3) -> List[List[SearchHit]]:
+        """Embed and search a batch of queries in one matrix product"""
+        results = self.index.search(self.embedder.embed(queries), k)
+        return [
+            [SearchHit(Passage(hit.payload["source"], hit.payload["start_line"], hit.payload["text"]), hit.score) for hit in hits]
+            for hits in results
+        ]
+
+    def search(self, query: str, k: int = 3) -> List[SearchHit]:
+        return self.search_many([query], k)[0]
+
+
+def index_passages(index: VectorIndex, embedder, passages: Iterable[Passage], batch_size: int = 256) -> int:
+    """Embed passages in batches and append them; returns the number added"""
+    added = 0
+    batch: List[Passage] = []
+
+    def flush() -> None:
+        index.add(
+            [f"{p.source}:{p.start_line}" for p in batch],
+            embedder.embed([p.text for p in batch]),
+            [{"source": p.source, "start_line": p.start_line, "text": p.text} for p in batch],
+        )
+
+    for passage in passages:
+        batch.append(passage)
+        if len(batch) == batch_size:
+            flush()
+            added += len(batch)
+            batch = []
+    if batch:
+        flush()
+        added += len(batch)
+    return added
+
+
+def iter_passages(docs_dir: Path, max_chars: int = 1200) -> Iterable[Passage]:
+    for path in iter_documents(docs_dir):
+        try:
+            text = path.read_text(encoding="utf-8")
+        except (UnicodeDecodeError, OSError):
+            continue
+        yield from split_passages(text, str(path.relative_to(docs_dir)), max_chars)
+
+
+def default_vectors_path(docs_dir: Path, embedder) -> Path:
+    key = hashlib.sha256(str(Path(docs_dir).resolve()).encode()).hexdigest()[:16]
+    return DEFAULT_CACHE_DIR / f"vectors-{key}-{embedder.name.replace(':', '_').replace('/', '_')}"
+
+
+def load_or_build_vectors(
+    docs_dir: Path, embedder, directory: Optional[Path] = None, max_chars: int = 1200
+) -> Tuple[VectorIndex, bool]:
+    """Return (index, built); the saved index is reused while the documents and embedder are unchanged"""
+    docs_dir = Path(docs_dir)
+    if not docs_dir.is_dir():
+        raise FileNotFoundError(f"Documents directory not found: {docs_dir}")
+    directory = Path(directory) if directory else default_vectors_path(docs_dir, embedder)
+    current = fingerprint(docs_dir, max_chars=max_chars)
+
+    index = VectorIndex.open(directory)
+    if index is not None and index.fingerprint == current and index.embedder == embedder.name:
+        return index, False
+
+    # Fingerprint is recorded only once every passage is in
+    index = VectorIndex.create(directory, embedder.dim, embedder.name)
+    index_passages(index, embedder, iter_passages(docs_dir, max_chars))
+    index.fingerprint = current
+    index._write_meta()
+    return index, True
+
+
+def open_retriever(docs_dir: Path, backend: str = "bm25", embedder: str = "hashing", index_path: Optional[Path] = None):
+    """Load or build the local retriever for a documents directory; returns (retriever, description)"""
+    if backend == "vector":
+        model = make_embedder(embedder)
+        index, built = load_or_build_vectors(docs_dir, model, index_path)
+        return VectorRetriever(index, model), f"Vector index {'built' if built else 'loaded'}: {len(index)} passages from {docs_dir} ({model.name})"
+    if backend != "bm25":
+        raise ValueError(f"Unknown retriever '{backend}'. Expected 'bm25' or 'vector'")
+    index, built = load_or_build(docs_dir, index_path)
+    return index, f"BM25 index {'built' if built else 'loaded'}: {len(index.passages)} passages from {docs_dir}"